@@ -0,0 +1,99 @@
+import json
+from collections import OrderedDict as od
+
+from .run import timed
+
+# how much slower (or bigger) than the baseline a measurement can be before
+# it counts as a regression: timings are noisier than allocations
+DEFAULT_TOLERANCES = od(seconds=0.5, bytes=0.2)
+
+# below these, differences are mostly noise (a stage taking under a
+# millisecond can easily take twice as long on a busy machine), so nothing
+# under them counts as a regression
+DEFAULT_FLOORS = od(seconds=0.005)
+
+
+def calibration_workload():
+    # dict building, string formatting, sorting and attribute lookups, like
+    # inspection itself, but not depending on anything in the package
+    grouped = od()
+
+    for n in range(50000):
+        key = "key_{}".format(n % 5000)
+        grouped.setdefault(key, []).append((n, str(n)))
+    return sorted(grouped.items(), key=lambda x: x[0].upper())
+
+
+def calibration_seconds(repeat=10):
+    """
+    The best time of a fixed workload, which timings are measured against,
+    so that a baseline stored on one machine can be checked on another (or
+    on the same machine under a different load).
+    """
+    _, seconds = timed(calibration_workload, repeat)
+    return seconds
+
+
+def for_kind(name, values):
+    # the value for the kind of measurement name is, by its suffix
+    for suffix, value in values.items():
+        if name.endswith(suffix):
+            return value
+    return None
+
+
+def regressions(baseline, measured, calibration=None):
+    """
+    Describe each measurement that exceeds its baseline by more than the
+    tolerance for its kind, and by more than the floor for its kind.
+
+    Given the calibration_seconds() of the machine the measurements were
+    made on, baseline timings are first scaled by how much faster or
+    slower it is than the one the baseline was stored on.
+    """
+    tolerances = od(DEFAULT_TOLERANCES)
+    tolerances.update(baseline.get("tolerances", {}))
+    floors = od(DEFAULT_FLOORS)
+    floors.update(baseline.get("floors", {}))
+
+    expected = baseline["measurements"]
+
+    scale = 1
+    if calibration and baseline.get("calibration_seconds"):
+        scale = calibration / baseline["calibration_seconds"]
+
+    for name, value in measured.items():
+        tolerance = for_kind(name, tolerances)
+
+        if name not in expected or tolerance is None:
+            continue
+
+        baseline_value = expected[name]
+        if name.endswith("seconds"):
+            baseline_value *= scale
+
+        limit = max(baseline_value * (1 + tolerance), for_kind(name, floors) or 0)
+
+        if value > limit:
+            yield "{}: {:.4g}, more than {:.0%} over the baseline of {:.4g}".format(
+                name, value, tolerance, baseline_value
+            )
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f, object_pairs_hook=od)
+
+
+def save(path, parameters, measured, calibration=None, tolerances=None, floors=None):
+    baseline = od(
+        tolerances=tolerances or DEFAULT_TOLERANCES,
+        floors=floors or DEFAULT_FLOORS,
+        parameters=parameters,
+        calibration_seconds=calibration,
+        measurements=measured,
+    )
+
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,149 @@
+"""
+Record the results of an inspector's catalog queries, and replay them
+later without a database, so that building the inspected objects can be
+timed on its own.
+"""
+import json
+from collections import OrderedDict as od
+from collections import namedtuple
+
+from schemainspect.pg import PostgreSQL
+from schemainspect.timings import Timings
+
+from .run import peak_memory, timed
+
+
+class Catalog(object):
+    """
+    Catalog query results, keyed by query text.
+    """
+
+    def __init__(self, pg_version):
+        self.pg_version = pg_version
+        self.results = {}
+
+    def record(self, q, result):
+        keys = list(result.keys())
+        Row = namedtuple("Row", keys, rename=True)
+        rows = self.results[str(q)] = [Row(*row) for row in result]
+        return rows
+
+    def dump(self, path):
+        """
+        Write the catalog to path as JSON. Results are stored under the
+        names of the queries (with the default inspection options), so the
+        file still replays after a query's text is only reformatted.
+        """
+        names = {q: name for name, q in query_texts(self.pg_version).items()}
+
+        results = od(
+            (
+                names.get(q, q),
+                od(columns=rows[0]._fields if rows else [], rows=rows),
+            )
+            for q, rows in self.results.items()
+        )
+
+        with open(path, "w") as f:
+            json.dump(od(pg_version=self.pg_version, results=results), f, indent=1)
+            f.write("\n")
+
+    @classmethod
+    def load(cls, path):
+        """
+        A catalog written by dump().
+        """
+        with open(path) as f:
+            stored = json.load(f, object_pairs_hook=od)
+
+        catalog = cls(stored["pg_version"])
+        texts = query_texts(catalog.pg_version)
+
+        for name, result in stored["results"].items():
+            Row = namedtuple("Row", result["columns"], rename=True)
+            rows = [Row(*row) for row in result["rows"]]
+            catalog.results[texts.get(name, name)] = rows
+        return catalog
+
+
+def query_texts(pg_version):
+    """
+    The text of each catalog query an inspector runs on pg_version, by
+    name, with the default options.
+    """
+    i = PostgreSQL.__new__(PostgreSQL)
+    i.is_raw_psyco_connection = False
+    i.set_up(pg_version)
+
+    return {
+        name: str(q)
+        for name, q in vars(i).items()
+        if name.endswith("_QUERY") and q is not None
+    }
+
+
+class RecordingConnection(object):
+    def __init__(self, c):
+        self.c = c
+        self.dialect = c.dialect
+        self.engine = c.engine
+        self.catalog = Catalog(c.dialect.server_version_info[0])
+
+    def execute(self, q):
+        return self.catalog.record(q, self.c.execute(q))
+
+
+class ReplayedConnection(object):
+    def __init__(self, catalog):
+        from sqlalchemy.dialects.postgresql import psycopg2
+
+        self.catalog = catalog
+        self.dialect = psycopg2.dialect()
+        self.dialect.server_version_info = (catalog.pg_version,)
+        self.engine = self
+
+    def execute(self, q):
+        return self.catalog.results[str(q)]
+
+
+def record(c, **kwargs):
+    """
+    Inspect through connection c, returning the catalog recorded.
+    """
+    recording = RecordingConnection(c)
+    PostgreSQL(recording, **kwargs)
+    return recording.catalog
+
+
+def replayed(catalog, **kwargs):
+    """
+    An inspector built from a recorded catalog rather than a database.
+    """
+    return PostgreSQL(ReplayedConnection(catalog), **kwargs)
+
+
+def measure_key_paths(catalog, repeat=5):
+    """
+    The best times, out of repeat runs, and peak allocations of the key
+    inspection paths, on a replayed catalog.
+    """
+    results = od()
+    loads = []
+
+    for _ in range(repeat):
+        timings = Timings()
+        i = replayed(catalog, hooks=[timings])
+        loads.append({x.name: x for x in timings if x.kind == "load"})
+
+    results["load_all_relations_construction_seconds"] = min(
+        x["load_all_relations"].construction_seconds for x in loads
+    )
+    results["load_deps_all_seconds"] = min(x["load_deps_all"].seconds for x in loads)
+
+    _, results["as_dicts_seconds"] = timed(i._as_dicts, repeat)
+    _, results["dependency_order_seconds"] = timed(i.dependency_order, repeat)
+
+    results["load_all_peak_bytes"] = peak_memory(lambda: replayed(catalog))
+    results["as_dicts_peak_bytes"] = peak_memory(i._as_dicts)
+    results["dependency_order_peak_bytes"] = peak_memory(i.dependency_order)
+    return results
@@ -0,0 +1,193 @@
+"""
+Inspect a generated schema and record how long it takes, as JSON:
+
+    $ python -m benchmarks.run --tables 1000 --columns 30 -o results.json
+    $ python -m benchmarks.run --compare results.json
+
+By default the schema is created in a temporary database on localhost.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from collections import OrderedDict as od
+from time import perf_counter
+
+from sqlbag import S, temporary_database
+
+from schemainspect import get_inspector
+from schemainspect.timings import Timings
+
+from .schema import DEFAULTS, create_schema
+
+
+def timed(f, repeat=1):
+    """
+    The result of calling f, and the best time out of repeat calls.
+    """
+    best = None
+
+    for _ in range(repeat):
+        started = perf_counter()
+        result = f()
+        seconds = perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def peak_memory(f):
+    tracemalloc.start()
+
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def git_commit():
+    try:
+        out = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode().strip()
+
+
+def measure(db_url, repeat=3):
+    results = od()
+    timings = Timings()
+
+    with S(db_url) as s:
+        get_inspector(s, hooks=[timings])
+        i, results["inspect_seconds"] = timed(lambda: get_inspector(s), repeat)
+        results["inspect_peak_bytes"] = peak_memory(lambda: get_inspector(s))
+        pg_version = i.pg_version
+
+    results["loaders"] = od(
+        (x.name, od(seconds=x.seconds, construction_seconds=x.construction_seconds))
+        for x in timings
+        if x.kind == "load"
+    )
+    results["queries"] = od(
+        (x.name, od(seconds=x.seconds, rows=x.rows, bytes=x.bytes))
+        for x in timings
+        if x.kind == "query"
+    )
+
+    _, results["as_dicts_seconds"] = timed(i._as_dicts, repeat)
+    _, results["dependency_order_seconds"] = timed(i.dependency_order, repeat)
+
+    try:
+        import msgpack  # noqa
+    except ImportError:
+        pass
+    else:
+        with tempfile.NamedTemporaryFile() as f:
+            _, results["dump_seconds"] = timed(lambda: i.dump(f.name), repeat)
+
+    results["objects"] = od(
+        (name, len(getattr(i, name)))
+        for name in "tables views functions indexes constraints triggers".split()
+    )
+    results["columns"] = sum(len(t.columns) for t in i.relations.values())
+    return pg_version, results
+
+
+def run(parameters, db_url=None, repeat=3):
+    """
+    Create the schema described by parameters (in a temporary database,
+    unless db_url is given), and measure inspecting it.
+    """
+    if db_url is None:
+        with temporary_database(host="localhost") as db_url:
+            return run(parameters, db_url, repeat)
+
+    with S(db_url) as s:
+        create_schema(s, **parameters)
+
+    pg_version, results = measure(db_url, repeat)
+
+    return od(
+        commit=git_commit(),
+        python=platform.python_version(),
+        pg_version=pg_version,
+        parameters=parameters,
+        results=results,
+    )
+
+
+def flattened(d, prefix=""):
+    for k, v in d.items():
+        if isinstance(v, dict):
+            yield from flattened(v, prefix + k + ".")
+        else:
+            yield prefix + k, v
+
+
+def compare(old, new):
+    """
+    Lines comparing each timing and memory measurement of two runs.
+    """
+    if old["parameters"] != new["parameters"]:
+        yield "warning: runs have different parameters"
+
+    old_results = dict(flattened(old["results"]))
+
+    for k, v in flattened(new["results"]):
+        if not (k.endswith("seconds") or k.endswith("bytes")):
+            continue
+
+        before = old_results.get(k)
+
+        if before:
+            yield "{}\t{:.4g}\t{:.4g}\t{:+.1%}".format(k, before, v, v / before - 1)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Benchmark schema inspection")
+
+    for k, default in DEFAULTS.items():
+        option = "--" + k.replace("_", "-")
+
+        if isinstance(default, bool):
+            parser.add_argument(
+                "--no-" + k.replace("_", "-"), dest=k, action="store_false"
+            )
+        else:
+            parser.add_argument(option, type=int, default=default)
+
+    parser.add_argument("--url", help="Database to create the schema in")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file to compare with")
+    return parser.parse_args(args)
+
+
+def main(args):
+    args = parse_args(args)
+    parameters = od((k, getattr(args, k)) for k in DEFAULTS)
+
+    result = run(parameters, args.url, args.repeat)
+    out = json.dumps(result, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+
+        for line in compare(old, result):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main(sys.argv[1:])
@@ -0,0 +1,139 @@
+from collections import OrderedDict as od
+
+# the default size of a generated schema: roughly that of a mid-sized
+# application database
+DEFAULTS = od(
+    tables=200,
+    columns=20,
+    view_chains=20,
+    view_depth=5,
+    functions=20,
+    overloads=5,
+    partitions=20,
+    triggers=True,
+    policies=True,
+    fks=True,
+)
+
+
+def column_definitions(n):
+    types = ["text", "integer", "timestamptz default now()", "numeric(12, 2)", "jsonb"]
+
+    return ["c{} {}".format(i, types[i % len(types)]) for i in range(n)]
+
+
+def table_statements(n, columns, fks):
+    for i in range(n):
+        definitions = ["id bigserial primary key"]
+
+        if fks and i:
+            definitions.append("parent_id bigint references t{}(id)".format(i - 1))
+
+        definitions += column_definitions(columns)
+
+        yield "create table t{} ({});".format(i, ", ".join(definitions))
+        yield "create index on t{0} (c0);".format(i)
+
+
+def view_statements(chains, depth, tables):
+    for i in range(min(chains, tables)):
+        source = "t{}".format(i)
+
+        for level in range(depth):
+            name = "v{}_{}".format(i, level)
+            yield "create view {} as select * from {} where id > {};".format(
+                name, source, level
+            )
+            source = name
+
+
+def function_statements(functions, overloads):
+    types = ["integer", "bigint", "text", "numeric", "date", "boolean", "jsonb"]
+
+    for i in range(functions):
+        for overload in range(overloads):
+            arguments = ", ".join(
+                "a{} {}".format(n, types[(overload + n) % len(types)])
+                for n in range(overload + 1)
+            )
+            yield (
+                "create function f{}({}) returns text language sql immutable as "
+                "$$ select 'f{}_{}'::text $$;".format(i, arguments, i, overload)
+            )
+
+
+def partition_statements(partitions):
+    if not partitions:
+        return
+
+    yield (
+        "create table measurements (id bigint, logdate date not null, value numeric) "
+        "partition by range (logdate);"
+    )
+
+    for i in range(partitions):
+        yield (
+            "create table measurements_{0} partition of measurements "
+            "for values from ('{1}-01-01') to ('{2}-01-01');".format(
+                i, 2000 + i, 2001 + i
+            )
+        )
+
+
+def trigger_statements(tables):
+    yield """create function touch() returns trigger language plpgsql as $$
+begin
+    return new;
+end
+$$;"""
+
+    for i in range(tables):
+        yield (
+            "create trigger touch_t{0} before update on t{0} "
+            "for each row execute procedure touch();".format(i)
+        )
+
+
+def policy_statements(tables):
+    for i in range(tables):
+        yield "alter table t{} enable row level security;".format(i)
+        yield (
+            "create policy owner_t{0} on t{0} for select "
+            "using (id = current_setting('app.owner')::bigint);".format(i)
+        )
+
+
+def schema_statements(
+    tables=DEFAULTS["tables"],
+    columns=DEFAULTS["columns"],
+    view_chains=DEFAULTS["view_chains"],
+    view_depth=DEFAULTS["view_depth"],
+    functions=DEFAULTS["functions"],
+    overloads=DEFAULTS["overloads"],
+    partitions=DEFAULTS["partitions"],
+    triggers=DEFAULTS["triggers"],
+    policies=DEFAULTS["policies"],
+    fks=DEFAULTS["fks"],
+):
+    """
+    Yield the statements creating a synthetic schema: tables (each with an
+    index, and a foreign key to the previous table if fks is set), chains
+    of views on top of the first view_chains tables, overloaded functions,
+    a partitioned table, and a trigger and row level security policy on
+    each table.
+    """
+    yield from table_statements(tables, columns, fks)
+    yield from view_statements(view_chains, view_depth, tables)
+    yield from function_statements(functions, overloads)
+    yield from partition_statements(partitions)
+
+    if triggers:
+        yield from trigger_statements(tables)
+
+    if policies:
+        yield from policy_statements(tables)
+
+
+def create_schema(s, **parameters):
+    # one round trip, rather than one per statement
+    s.execute("\n".join(schema_statements(**parameters)))
@@ -1,8 +1,10 @@
 from . import pg
 from .command import do_command
+from .diff import diff
 from .get import get_inspector
 from .inspected import ColumnInfo, Inspected
 from .inspector import DBInspector, NullInspector, to_pytype
+from .snapshot import load
 
 try:
     from graphlib import TopologicalSorter  # noqa
@@ -19,4 +21,6 @@ __all__ = [
     "do_command",
     "pg",
     "NullInspector",
+    "load",
+    "diff",
 ]
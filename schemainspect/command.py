@@ -1,13 +1,20 @@
 import argparse
 import sys
 
+from .diff import Changes
 from .get import get_inspector
 from .misc import quoted_identifier
 from .tableformat import t
+from .timings import Timings
 
 
 def parse_args(args):
     parser = argparse.ArgumentParser(description="Inspect a schema")
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Report the time taken by each catalog query and loader to stderr",
+    )
 
     subparsers = parser.add_subparsers(help="sub-command help", dest="command")
 
@@ -18,15 +25,64 @@ def parse_args(args):
         "yaml", help="Export schema definition as YAML"
     )
     parser_deps2.add_argument("db_url", help="URL")
+    parser_deps2.add_argument(
+        "--exclude-ddl",
+        action="store_true",
+        help="Leave out generated statements and clauses",
+    )
+
+    parser_json = subparsers.add_parser("json", help="Export schema definition as JSON")
+    parser_json.add_argument("db_url", help="URL")
+    parser_json.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write one JSON object per line for each inspected object",
+    )
+    parser_json.add_argument(
+        "--exclude-ddl",
+        action="store_true",
+        help="Leave out generated statements and clauses",
+    )
+
+    parser_drift = subparsers.add_parser(
+        "drift", help="Report differences from a template schema"
+    )
+    parser_drift.add_argument("template_url", help="URL of the template database")
+    parser_drift.add_argument(
+        "target_urls",
+        nargs="*",
+        help="URLs of the databases to check (default: the template database)",
+    )
+    parser_drift.add_argument("--schema", help="Template schema")
+    parser_drift.add_argument(
+        "--target-schema",
+        action="append",
+        dest="target_schemas",
+        help="Schema to check against the template, can be given more than once "
+        "(default: the template schema)",
+    )
+
+    parser_indexes = subparsers.add_parser(
+        "indexes",
+        help="Report duplicate, redundant and unused indexes, and foreign keys "
+        "without indexes",
+    )
+    parser_indexes.add_argument("db_url", help="URL")
+    parser_indexes.add_argument(
+        "--no-stats",
+        dest="stats",
+        action="store_false",
+        help="Don't load index usage statistics (and so don't report unused indexes)",
+    )
 
     return parser.parse_args(args)
 
 
-def do_deps(db_url):
+def do_deps(db_url, hooks=()):
     from sqlbag import S
 
     with S(db_url) as s:
-        i = get_inspector(s)
+        i = get_inspector(s, hooks=hooks)
         deps = i.deps
 
     def process_row(dep):
@@ -52,12 +108,12 @@ def do_deps(db_url):
         print("No dependencies found.")
 
 
-def do_yaml(db_url):
+def do_yaml(db_url, exclude_ddl=False, hooks=()):
     from sqlbag import S
 
     with S(db_url) as s:
-        i = get_inspector(s)
-        defn = i.encodeable_definition()
+        i = get_inspector(s, hooks=hooks)
+        defn = i.encodeable_definition(include_derived=not exclude_ddl)
 
     from io import StringIO as sio
 
@@ -70,16 +126,189 @@ def do_yaml(db_url):
     print(x.getvalue())
 
 
+def do_json(db_url, stream=False, exclude_ddl=False, out=None, hooks=()):
+    import json
+
+    from sqlbag import S
+
+    out = out or sys.stdout
+
+    with S(db_url) as s:
+        i = get_inspector(s, hooks=hooks)
+
+    definitions = i.iter_definitions(include_derived=not exclude_ddl)
+
+    if stream:
+        for category, key, fields in definitions:
+            record = dict(category=category, key=key, fields=fields)
+            out.write(json.dumps(record, default=str))
+            out.write("\n")
+    else:
+        defn = {}
+
+        for category, key, fields in definitions:
+            key = key if isinstance(key, str) else str(key)
+            defn.setdefault(category, {})[key] = fields
+
+        json.dump(defn, out, default=str, indent=2)
+        out.write("\n")
+
+
+def do_drift(
+    template_url, target_urls=(), schema=None, target_schemas=None, out=None, hooks=()
+):
+    from sqlalchemy.engine.url import make_url
+    from sqlbag import S
+
+    from .drift import Template, catalog_fingerprints
+
+    out = out or sys.stdout
+
+    with S(template_url) as s:
+        template_i = get_inspector(s, hooks=hooks)
+        template_catalog = catalog_fingerprints(s)
+
+    template = Template(template_i, schema, template_catalog)
+    target_schemas = target_schemas or [schema]
+    drifted = False
+
+    for url in target_urls or [template_url]:
+        if url == template_url:
+            i, catalog = template_i, template_catalog
+        else:
+            with S(url) as s:
+                # targets whose catalogs match the template's aren't inspected
+                catalog = catalog_fingerprints(s)
+
+                if all(template.unchanged(catalog, x) for x in target_schemas):
+                    i = None
+                else:
+                    i = get_inspector(s, hooks=hooks)
+
+        database = make_url(url).database
+
+        for target_schema in target_schemas:
+            if template.unchanged(catalog, target_schema):
+                continue
+
+            if target_schema:
+                target = "{}:{}".format(database, target_schema)
+            else:
+                target = database
+
+            for category, changes in template.drift(i, target_schema).items():
+                drifted = True
+
+                for kind, things in zip(Changes._fields, changes):
+                    for key, x in things.items():
+                        if not isinstance(key, str):
+                            key = " ".join(map(str, key))
+
+                        fields = [target, category, kind, key]
+
+                        if kind == "changed":
+                            fields += template.changed_attributes(*x, target_schema)
+
+                        out.write("\t".join(fields))
+                        out.write("\n")
+
+    return 1 if drifted else 0
+
+
+def do_indexes(db_url, stats=True, out=None, hooks=()):
+    from sqlbag import S
+
+    from .indexing import index_findings, missing_fk_indexes
+
+    out = out or sys.stdout
+
+    with S(db_url) as s:
+        i = get_inspector(s, hooks=hooks)
+
+        if stats:
+            i.load_stats()
+
+    findings = index_findings(i)
+    missing = missing_fk_indexes(i)
+
+    if not (findings or missing):
+        out.write("No droppable or missing indexes found.\n")
+        return
+
+    def optional(x):
+        return "" if x is None else str(x)
+
+    sections = [
+        (
+            [
+                dict(
+                    index=x.index.quoted_full_name,
+                    table=x.index.quoted_full_table_name,
+                    kind=x.kind,
+                    reason=x.reason,
+                    size=optional(x.size),
+                )
+                for x in findings
+            ],
+            [x.drop_statement for x in findings],
+        ),
+        (
+            [
+                dict(
+                    foreign_key=x.constraint.name,
+                    table=x.table.quoted_full_name,
+                    columns=", ".join(x.columns),
+                    rows=optional(x.row_count_estimate),
+                )
+                for x in missing
+            ],
+            [x.create_statement for x in missing],
+        ),
+    ]
+
+    for rows, statements in sections:
+        if rows:
+            out.write(t(rows))
+            out.write("\n\n")
+            out.write("".join(statement + "\n" for statement in statements))
+            out.write("\n")
+
+
 def run(args):
+    timings = Timings()
+    hooks = [timings] if getattr(args, "timings", False) else []
+    status = None
+
     if args.command == "deps":
-        do_deps(args.db_url)
+        do_deps(args.db_url, hooks=hooks)
 
     elif args.command == "yaml":
-        do_yaml(args.db_url)
+        do_yaml(args.db_url, exclude_ddl=args.exclude_ddl, hooks=hooks)
+
+    elif args.command == "json":
+        do_json(
+            args.db_url, stream=args.stream, exclude_ddl=args.exclude_ddl, hooks=hooks
+        )
+
+    elif args.command == "drift":
+        status = do_drift(
+            args.template_url,
+            args.target_urls,
+            schema=args.schema,
+            target_schemas=args.target_schemas,
+            hooks=hooks,
+        )
+
+    elif args.command == "indexes":
+        do_indexes(args.db_url, stats=args.stats, hooks=hooks)
 
     else:
         raise ValueError("no such commend")
 
+    if timings:
+        print(timings.report(), file=sys.stderr)
+    return status
+
 
 def do_command():  # pragma: no cover
     args = parse_args(sys.argv[1:])
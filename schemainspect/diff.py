@@ -0,0 +1,126 @@
+from collections import OrderedDict as od
+from collections import namedtuple
+from copy import copy
+
+from .pg.obj import PROPS
+
+
+class Changes(namedtuple("Changes", "added removed changed renamed")):
+    """
+    The differences within one category: added and removed map keys to
+    objects, changed maps keys to (old, new) pairs, and renamed maps new
+    keys to (old, new) pairs of objects that were matched by oid. Renamed
+    objects that were also altered are in changed too, under their new key.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.renamed)
+
+
+# the parts of an object's name, which a rename can change
+NAME_ATTRIBUTES = "name schema table_name".split()
+
+
+def oid_of(x):
+    # privileges have no oids of their own
+    oid = getattr(x, "oid", None)
+
+    if oid is None:
+        return None
+
+    # oids are only unique within one system catalog, and selectables mixes
+    # relations (from pg_class) with functions (from pg_proc). Each class
+    # is loaded from a single catalog (lazily loaded snapshot objects are
+    # of a subclass with the same name)
+    return oid, type(x).__name__
+
+
+def same_apart_from_name(old, new):
+    # old given new's name, then compared with the class's own equality
+    renamed = copy(old)
+
+    for attribute in NAME_ATTRIBUTES:
+        if hasattr(new, attribute):
+            setattr(renamed, attribute, getattr(new, attribute))
+    return renamed == new
+
+
+def diff_category(a, b, match_oids=False):
+    matched = {}
+    renamed = od()
+
+    if match_oids:
+        keys_by_oid = {oid_of(x): k for k, x in a.items()}
+        keys_by_oid.pop(None, None)
+
+        for k, new in b.items():
+            try:
+                old_k = keys_by_oid[oid_of(new)]
+            except KeyError:
+                continue
+
+            matched[k] = old_k
+
+            if old_k != k:
+                renamed[k] = a[old_k], new
+
+    # objects not matched by oid are matched by key, if the key isn't
+    # already taken by a renamed object
+    claimed = set(matched.values())
+
+    for k in b:
+        if k not in matched and k in a and k not in claimed:
+            matched[k] = k
+
+    claimed.update(matched.values())
+
+    removed = od((k, v) for k, v in a.items() if k not in claimed)
+    added = od()
+    changed = od()
+
+    for k, new in b.items():
+        try:
+            old_k = matched[k]
+        except KeyError:
+            added[k] = new
+            continue
+
+        old = a[old_k]
+
+        if old_k != k:
+            if not same_apart_from_name(old, new):
+                changed[k] = old, new
+        elif old.content_hash != new.content_hash and old != new:
+            changed[k] = old, new
+
+    return Changes(added, removed, changed, renamed)
+
+
+def same_database(a, b):
+    a_id = getattr(a, "database_id", None)
+    return a_id is not None and a_id == getattr(b, "database_id", None)
+
+
+def diff(a, b, match_oids=None):
+    """
+    Compare two inspectors (or loaded snapshots), returning the Changes from
+    a to b for each category in PROPS, in an OrderedDict.
+
+    Objects are matched by key and compared by their content hashes, so
+    only objects whose hashes differ are compared field by field.
+
+    If both inspections are of the same database (or match_oids is set),
+    objects are matched by oid before key, so that renamed objects show up
+    as renamed rather than as removed and added. Renamed objects are
+    compared as if they had kept their old names, and are also reported
+    as changed if anything else about them differs.
+    """
+    if match_oids is None:
+        match_oids = same_database(a, b)
+
+    return od(
+        (name, diff_category(getattr(a, name), getattr(b, name), match_oids))
+        for name in PROPS.split()
+    )
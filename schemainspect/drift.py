@@ -0,0 +1,281 @@
+import re
+from collections import OrderedDict as od
+
+from .diff import Changes
+from .inspected import SCALAR_TYPES, Comparable, combined_hash
+from .misc import connection_from_s_or_c, quoted_identifier
+from .pg.obj import FINGERPRINTS_QUERY, PROPS
+
+SCHEMA_PLACEHOLDER = "{schema}"
+
+
+class Normalizer(object):
+    """
+    Hashes objects in a way that doesn't depend on which schema they are
+    in, so that objects in a per-tenant schema can be compared with those
+    in a template schema. Without a schema, these are just the objects'
+    own content hashes.
+    """
+
+    def __init__(self, schema=None):
+        self.schema = schema
+        self.hashes = {}
+
+        if schema is not None:
+            self.quoted_schema = quoted_identifier(schema)
+            prefixes = [self.quoted_schema, schema]
+            self.qualified = re.compile(
+                r'(?<![\w"$])(?:{})\.'.format("|".join(map(re.escape, prefixes)))
+            )
+
+    def text(self, s):
+        if self.schema is None:
+            return s
+        elif s == self.schema or s == self.quoted_schema:
+            return SCHEMA_PLACEHOLDER
+        return self.qualified.sub(SCHEMA_PLACEHOLDER + ".", s)
+
+    def value(self, x):
+        if type(x) is str:
+            return self.text(x)
+        elif type(x) in SCALAR_TYPES:
+            return x
+        elif isinstance(x, Comparable):
+            return "#", self.hash(x)
+        elif isinstance(x, dict):
+            return "{", [(self.value(k), self.value(v)) for k, v in x.items()]
+        elif isinstance(x, (list, tuple)):
+            return "[", [self.value(v) for v in x]
+        return x
+
+    def key(self, k):
+        if self.schema is None:
+            return k
+        elif isinstance(k, tuple):
+            return tuple(self.value(v) for v in k)
+        return self.value(k)
+
+    def hash(self, x):
+        if self.schema is None:
+            return x.content_hash
+
+        try:
+            return self.hashes[id(x)][1]
+        except KeyError:
+            pass
+
+        name, values_of = x.equality_values_getter()
+        h = combined_hash([name] + [self.value(v) for v in values_of(x)])
+        # keep a reference, so that the id can't be reused by a later object
+        self.hashes[id(x)] = x, h
+        return h
+
+
+def by_schema(inspector):
+    """
+    The (key, object) pairs of each category in PROPS, grouped by schema.
+    """
+    grouped = {}
+
+    for name in PROPS.split():
+        for k, x in getattr(inspector, name).items():
+            categories = grouped.setdefault(x.schema, od())
+            categories.setdefault(name, []).append((k, x))
+    return grouped
+
+
+def fingerprint(inspector, schema=None, grouped=None):
+    """
+    For each category in PROPS, an OrderedDict of normalized key to
+    (normalized hash, object). With a schema, only the objects in that
+    schema are included, so one inspection of a database can be
+    fingerprinted once per tenant schema (passing the by_schema() grouping
+    of the inspector saves going through every object each time).
+    """
+    normalizer = Normalizer(schema)
+    result = od()
+
+    if schema is not None:
+        grouped = grouped or by_schema(inspector)
+        categories = grouped.get(schema, {})
+
+    for name in PROPS.split():
+        if schema is None:
+            things = getattr(inspector, name).items()
+        else:
+            things = categories.get(name, [])
+
+        result[name] = od(
+            (normalizer.key(k), (normalizer.hash(x), x)) for k, x in things
+        )
+    return result
+
+
+def catalog_fingerprints(s):
+    """
+    A digest of everything in each schema of a database, keyed by schema
+    name, computed by the database itself in a single query. References to
+    a schema in its own objects' definitions are normalized, as they are
+    by Normalizer, so that a tenant schema's digest can be compared with
+    the template schema's.
+
+    The digests cover everything drift() compares, and some things it
+    doesn't (such as grants to the owner), so a target with the same
+    digest as the template can't have drifted, and needn't be inspected.
+
+    Works with a session or connection, or a raw psycopg2 connection or
+    cursor. None if the digests can't be computed (before PostgreSQL 10,
+    or if the query fails, which leaves any transaction as it was), so
+    that targets are inspected in full instead.
+    """
+    c = connection_from_s_or_c(s)
+
+    try:
+        pg_version = c.dialect.server_version_info[0]
+        raw = False
+    except AttributeError:
+        connection = getattr(c, "connection", c)
+        pg_version = int(str(connection.server_version)[:-4])
+        raw = True
+
+    if pg_version < 10:
+        return None
+
+    q = FINGERPRINTS_QUERY
+    q = q.replace("-- 12_ONLY" if pg_version >= 12 else "-- PRE_12", "")
+    q = q.replace("-- 11_AND_LATER" if pg_version >= 11 else "-- 10_AND_EARLIER", "")
+
+    if raw:
+        rows = raw_fingerprint_rows(connection, q)
+    else:
+        rows = fingerprint_rows(c, q)
+
+    if rows is None:
+        return None
+    return {schema: fingerprint for schema, fingerprint in rows}
+
+
+def fingerprint_rows(c, q):
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+
+    try:
+        with c.begin_nested():
+            return c.execute(text(q)).fetchall()
+    except DBAPIError:
+        return None
+
+
+def raw_fingerprint_rows(connection, q):
+    # outside of autocommit, a failed query would abort the caller's
+    # transaction, so it's run in a savepoint
+    savepoint = not connection.autocommit
+
+    with connection.cursor() as cursor:
+        if savepoint:
+            cursor.execute("savepoint schemainspect_fingerprints")
+
+        try:
+            cursor.execute(q)
+            rows = cursor.fetchall()
+        except connection.Error:
+            if savepoint:
+                cursor.execute("rollback to savepoint schemainspect_fingerprints")
+            return None
+
+        if savepoint:
+            cursor.execute("release savepoint schemainspect_fingerprints")
+        return rows
+
+
+class Template(object):
+    """
+    A reference schema to check any number of targets against. The
+    template is fingerprinted once, and each target is compared with it by
+    normalized key and hash, so only mismatching objects are looked at any
+    further.
+
+    Given the template database's catalog_fingerprints(), targets can be
+    checked with unchanged() before inspecting them at all.
+    """
+
+    def __init__(self, inspector, schema=None, catalog=None):
+        self.schema = schema
+        self.fingerprint = fingerprint(inspector, schema)
+        self.catalog = catalog
+        self.grouped = None, None
+
+    def unchanged(self, catalog, schema=None):
+        """
+        Whether a target database's catalog_fingerprints() show that it (or
+        the given schema in it) can't have drifted from the template, so
+        that there's no need to inspect it. False if either has no
+        fingerprints.
+        """
+        if self.catalog is None or catalog is None:
+            return False
+        elif self.schema is None and schema is None:
+            return catalog == self.catalog
+        elif self.schema is None or schema is None:
+            return False
+        return catalog.get(schema) == self.catalog.get(self.schema)
+
+    def grouped_by_schema(self, target):
+        # targets are often checked one schema after another
+        last_target, grouped = self.grouped
+
+        if last_target is not target:
+            grouped = by_schema(target)
+            self.grouped = target, grouped
+        return grouped
+
+    def drift(self, target, schema=None):
+        """
+        The deviations of target from the template: an OrderedDict of
+        category to Changes, for categories with any. Keys are normalized,
+        and changed pairs are (template object, target object).
+        """
+        if schema is None:
+            target_fingerprint = fingerprint(target)
+        else:
+            target_fingerprint = fingerprint(
+                target, schema, self.grouped_by_schema(target)
+            )
+        exact = self.schema is None and schema is None
+        deviations = od()
+
+        for name, expected in self.fingerprint.items():
+            actual = target_fingerprint[name]
+
+            missing = od((k, x) for k, (_, x) in expected.items() if k not in actual)
+            extra = od()
+            changed = od()
+
+            for k, (h, x) in actual.items():
+                try:
+                    expected_h, expected_x = expected[k]
+                except KeyError:
+                    extra[k] = x
+                    continue
+
+                if h != expected_h and not (exact and expected_x == x):
+                    changed[k] = expected_x, x
+
+            changes = Changes(extra, missing, changed, od())
+
+            if changes:
+                deviations[name] = changes
+        return deviations
+
+    def changed_attributes(self, expected, actual, schema=None):
+        """
+        The names of the equality attributes that differ between a template
+        object and the corresponding target object.
+        """
+        a, b = Normalizer(self.schema), Normalizer(schema)
+
+        return [
+            name
+            for name in expected.equality_attributes
+            if a.value(getattr(expected, name)) != b.value(getattr(actual, name))
+        ]
@@ -5,7 +5,7 @@ from .pg import PostgreSQL
 SUPPORTED = {"postgresql": PostgreSQL}
 
 
-def get_inspector(x, schema=None, exclude_schema=None):
+def get_inspector(x, schema=None, exclude_schema=None, **kwargs):
     if schema and exclude_schema:
         raise ValueError("Cannot provide both schema and exclude_schema")
     if x is None:
@@ -19,7 +19,7 @@ def get_inspector(x, schema=None, exclude_schema=None):
     except AttributeError:
         ic = SUPPORTED["postgresql"]
 
-    inspected = ic(c)
+    inspected = ic(c, **kwargs)
     if schema:
         inspected.one_schema(schema)
     elif exclude_schema:
@@ -0,0 +1,282 @@
+from collections import OrderedDict as od
+from collections import namedtuple
+
+from .misc import quoted_identifier
+from .statements import SHARE, SHARE_UPDATE_EXCLUSIVE, Statement
+
+# postgres's default page size, for turning page counts into bytes
+BLOCK_SIZE = 8192
+
+# the longest identifier postgres keeps (NAMEDATALEN - 1)
+MAX_NAME_LENGTH = 63
+
+
+def can_drop(index):
+    # indexes backing a constraint can only go with the constraint
+    return not (index.is_pk or index.is_exclusion or index.constraint)
+
+
+def index_size(index):
+    """
+    The size of an index in bytes: exact if stats are loaded, otherwise
+    estimated from its page count as of the last vacuum or analyze.
+    """
+    if index.stats:
+        return index.stats["size"]
+    elif index.page_size_estimate is not None:
+        return index.page_size_estimate * BLOCK_SIZE
+
+
+def numbers(vector):
+    # int2vector and oidvector columns come back as space-separated strings
+    return tuple((vector or "").split())
+
+
+def index_signature(index):
+    """
+    What an index is on, and how: indexes with the same signature (and
+    included columns) can answer exactly the same queries.
+    """
+    return (
+        index.algorithm,
+        tuple(index.key_columns or ()),
+        index.key_expressions,
+        numbers(index.key_options),
+        numbers(index.key_collations),
+        index.partial_predicate,
+    )
+
+
+def is_prefix(short, long):
+    return len(short) < len(long) and long[: len(short)] == short
+
+
+def covers(index, other):
+    """
+    Whether other can be used for every query that index can: an index
+    whose key is a prefix of other's, on the same table with the same
+    predicate, and whose included columns other also has.
+    """
+    if index.algorithm != "btree" or other.algorithm != "btree":
+        return False
+
+    if index.key_expressions or other.key_expressions or not index.key_columns:
+        return False
+
+    if index.partial_predicate != other.partial_predicate:
+        return False
+
+    key, other_key = index_signature(index)[1], index_signature(other)[1]
+
+    if not is_prefix(key, other_key):
+        return False
+
+    n = len(key)
+
+    if numbers(index.key_options) != numbers(other.key_options)[:n]:
+        return False
+
+    if numbers(index.key_collations) != numbers(other.key_collations)[:n]:
+        return False
+
+    other_columns = set(other_key) | set(other.included_columns or ())
+    return set(index.included_columns or ()) <= other_columns
+
+
+class IndexFinding(namedtuple("IndexFinding", "kind index covered_by")):
+    """
+    An index that could be dropped: a duplicate of another index, redundant
+    because another index's key starts with its key (covered_by being the
+    index to keep in both cases), or unused since the stats were reset.
+    """
+
+    __slots__ = ()
+
+    @property
+    def size(self):
+        return index_size(self.index)
+
+    @property
+    def reason(self):
+        if self.kind == "duplicate":
+            return "duplicate of {}".format(self.covered_by.quoted_full_name)
+        elif self.kind == "redundant":
+            return "key is a prefix of {}".format(self.covered_by.quoted_full_name)
+        return "no scans"
+
+    @property
+    def drop_statement(self):
+        return self.index.drop_statement_concurrently
+
+
+def by_table(inspector):
+    tables = od()
+
+    for index in inspector.indexes.values():
+        tables.setdefault(index.quoted_full_table_name, []).append(index)
+    return tables
+
+
+def keep_first(index):
+    # which of a set of duplicates to keep: one that can't be dropped, then
+    # a unique one, then the most used, then the first by name
+    scans = (index.stats or {}).get("idx_scan") or 0
+    return (can_drop(index), not index.is_unique, -scans, index.name)
+
+
+def duplicate_indexes(indexes, skipped):
+    groups = od()
+
+    for index in indexes:
+        signature = index_signature(index), frozenset(index.included_columns or ())
+        groups.setdefault(signature, []).append(index)
+
+    for group in groups.values():
+        keep, *others = sorted(group, key=keep_first)
+
+        for index in others:
+            # a unique index only duplicates another unique index
+            if can_drop(index) and (keep.is_unique or not index.is_unique):
+                yield IndexFinding("duplicate", index, keep)
+
+
+def droppable(indexes, skipped):
+    for index in indexes:
+        if id(index) not in skipped and not index.is_unique and can_drop(index):
+            yield index
+
+
+def redundant_indexes(indexes, skipped):
+    # the longest covering index is kept, so that in a chain of prefixes
+    # every index is reported as covered by the last one
+    longest_first = sorted(indexes, key=lambda x: -len(x.key_columns or ()))
+
+    for index in droppable(indexes, skipped):
+        for other in longest_first:
+            if id(other) not in skipped and covers(index, other):
+                yield IndexFinding("redundant", index, other)
+                break
+
+
+def unused_indexes(indexes, skipped):
+    for index in droppable(indexes, skipped):
+        if index.stats and index.stats["idx_scan"] == 0:
+            yield IndexFinding("unused", index, None)
+
+
+def index_findings(inspector):
+    """
+    The indexes that could be dropped, as a list of IndexFinding: duplicate
+    indexes, indexes whose key is a prefix of another index on the same
+    table, and (if inspector.load_stats() has been called) indexes that
+    have never been scanned. Each index is reported once, and the index
+    another is reported as covered by is never reported itself.
+    """
+    findings = []
+
+    for indexes in by_table(inspector).values():
+        # ids of the indexes already reported, or to be kept
+        skipped = set()
+
+        for find in (duplicate_indexes, redundant_indexes, unused_indexes):
+            found = list(find(indexes, skipped))
+
+            for finding in found:
+                skipped.add(id(finding.index))
+                skipped.add(id(finding.covered_by))
+            findings += found
+    return findings
+
+
+def supports_fk(index, columns):
+    """
+    Whether index can be used to find the referencing rows for a foreign
+    key on columns, in any order: that is, whether its leading key columns
+    are those columns.
+    """
+    if index.algorithm != "btree" or index.partial_predicate:
+        return False
+
+    if index.key_expressions or not index.key_columns:
+        return False
+
+    return set(index.key_columns[: len(columns)]) == set(columns)
+
+
+def truncated_name(name, suffix=""):
+    name = name.encode("utf-8")[: MAX_NAME_LENGTH - len(suffix)]
+    return name.decode("utf-8", "ignore") + suffix
+
+
+def index_name(inspector, table, columns):
+    """
+    A name for a new index, following postgres's own naming for unnamed
+    indexes, and numbered if needed to not clash with another relation.
+    """
+    taken = set(inspector.indexes) | set(inspector.relations)
+    taken.update(inspector.sequences)
+
+    base = "_".join([table.name] + list(columns))
+
+    for n in range(len(taken) + 1):
+        name = truncated_name(base, "_idx{}".format(n or ""))
+
+        if quoted_identifier(name, table.schema) not in taken:
+            return name
+
+
+class MissingFKIndex(namedtuple("MissingFKIndex", "constraint table index_name")):
+    """
+    A foreign key whose referencing columns no index on the referencing
+    table leads with, so that deleting or updating a referenced row scans
+    the whole referencing table.
+    """
+
+    __slots__ = ()
+
+    @property
+    def columns(self):
+        return self.constraint.fk_columns_local
+
+    @property
+    def row_count_estimate(self):
+        return self.table.row_count_estimate
+
+    @property
+    def create_statement(self):
+        # indexes on partitioned tables can't be created concurrently
+        if self.table.is_partitioned:
+            create, lock = "create index", SHARE
+        else:
+            create, lock = "create index concurrently", SHARE_UPDATE_EXCLUSIVE
+
+        statement = "{} if not exists {} on {} ({});".format(
+            create,
+            quoted_identifier(self.index_name),
+            self.table.quoted_full_name,
+            ", ".join(quoted_identifier(c) for c in self.columns),
+        )
+        return Statement(statement).locking(lock, self.table.quoted_full_name)
+
+
+def missing_fk_indexes(inspector):
+    """
+    The foreign keys without an index on their referencing columns, as a
+    list of MissingFKIndex, largest referencing tables (by the planner's
+    row count estimate) first.
+    """
+    missing = []
+
+    for constraint in inspector.constraints.values():
+        if not constraint.is_fk:
+            continue
+
+        table = inspector.relations[constraint.quoted_full_table_name]
+        columns = constraint.fk_columns_local
+
+        if not any(supports_fk(x, columns) for x in table.indexes.values()):
+            name = index_name(inspector, table, columns)
+            missing.append(MissingFKIndex(constraint, table, name))
+
+    missing.sort(key=lambda x: -(x.row_count_estimate or 0))
+    return missing
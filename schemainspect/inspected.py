@@ -1,10 +1,179 @@
 from collections import OrderedDict as od
+from hashlib import blake2b
+from operator import attrgetter
 
-from .misc import AutoRepr, quoted_identifier, unquoted_identifier
+from .misc import AutoRepr, keyed_property, quoted_identifier, unquoted_identifier
+from .statements import (
+    ACCESS_EXCLUSIVE,
+    CATALOG,
+    REWRITE,
+    SCAN,
+    Statement,
+    is_volatile_default,
+    type_change_effect,
+)
 
 
-class Inspected(AutoRepr):
-    @property
+class Deferred(object):
+    """
+    Placeholder for an attribute value that hasn't been fetched yet. The
+    loader fetches every value it has handed out a placeholder for in one go,
+    the first time any of them is resolved.
+    """
+
+    def __init__(self, loader, oid, field):
+        self.loader = loader
+        self.oid = oid
+        self.field = field
+
+    def resolve(self):
+        return self.loader.get(self.oid, self.field)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "Deferred({}, {})".format(self.oid, self.field)
+
+
+def resolved(value):
+    if isinstance(value, Deferred):
+        return value.resolve()
+    return value
+
+
+SCALAR_TYPES = {str, int, float, bool, type(None)}
+
+# per class: name to hash it under, and a function returning a tuple of
+# the values of its equality attributes
+EQUALITY_VALUES = {}
+
+
+def hashable_value(x):
+    if type(x) in SCALAR_TYPES:
+        return x
+    # nested comparable objects are represented by their own hashes
+    elif isinstance(x, Comparable):
+        return "#", x.content_hash
+    elif isinstance(x, dict):
+        return "{", [(k, hashable_value(v)) for k, v in x.items()]
+    elif isinstance(x, (list, tuple)):
+        return "[", [hashable_value(v) for v in x]
+    return x
+
+
+def digest(hashable):
+    # reprs of the scalar values stored by the inspector distinguish both
+    # type and value
+    return blake2b(repr(hashable).encode(), digest_size=16).hexdigest()
+
+
+def combined_hash(values):
+    return digest([hashable_value(v) for v in values])
+
+
+# cached hashes are only current if computed in the current generation
+hash_generation = 0
+
+
+def cached_hash(f):
+    """
+    A read-only property cached on the instance until the next call to
+    invalidate() on any Comparable.
+    """
+    cache_name = "_cached_" + f.__name__
+
+    def get(self):
+        try:
+            generation, value = self.__dict__[cache_name]
+            if generation == hash_generation:
+                return value
+        except KeyError:
+            pass
+        value = f(self)
+        self.__dict__[cache_name] = hash_generation, value
+        return value
+
+    return property(get, doc=f.__doc__)
+
+
+def equality_values_getter(cls):
+    name = "{}.{}".format(cls.__module__, cls.__qualname__)
+    attributes = tuple(cls.equality_attributes)
+
+    if len(attributes) > 1:
+        values_of = attrgetter(*attributes)
+    else:
+        getters = [attrgetter(a) for a in attributes]
+
+        def values_of(x):
+            return tuple(get(x) for get in getters)
+
+    return name, values_of
+
+
+class Comparable(object):
+    """
+    Objects compared by the values of their equality_attributes.
+
+    content_hash is a digest of those values, where nested comparable
+    objects contribute their own content_hash, for comparing objects from
+    different inspections (or whole categories at once). Equality itself
+    compares the values, as different hashes don't always mean different
+    objects (eg. dicts that compare equal regardless of order).
+
+    Hashes are cached, and once computed are returned without looking at
+    the values again. Inspected objects aren't normally changed once
+    loaded, so rather than every attribute assignment checking for cached
+    hashes (which doubles the time taken to build them), anything that
+    changes an object after hashing it calls invalidate().
+    """
+
+    equality_attributes = ()
+
+    def equality_values(self):
+        return self.equality_values_getter()[1](self)
+
+    def equality_values_getter(self):
+        cls = type(self)
+        try:
+            return EQUALITY_VALUES[cls]
+        except KeyError:
+            getter = EQUALITY_VALUES[cls] = equality_values_getter(cls)
+            return getter
+
+    @cached_hash
+    def content_hash(self):
+        name, values_of = self.equality_values_getter()
+        return digest([name] + [hashable_value(v) for v in values_of(self)])
+
+    def invalidate(self):
+        """
+        Clear every cached hash, after changing an object that has been
+        hashed (those of the objects it's nested in depend on it too).
+        """
+        global hash_generation
+        hash_generation += 1
+
+    def same_content(self, other):
+        try:
+            return self.content_hash == other.content_hash
+        except AttributeError:
+            return False
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+
+        values_of = self.equality_values_getter()[1]
+        try:
+            return values_of(self) == values_of(other)
+        except AttributeError:
+            return False
+
+
+class Inspected(AutoRepr, Comparable):
+    @keyed_property("name", "schema")
     def quoted_full_name(self):
         return quoted_identifier(self.name, schema=self.schema)
 
@@ -29,14 +198,14 @@ class Inspected(AutoRepr):
 
 
 class TableRelated(object):
-    @property
+    @keyed_property("schema", "table_name")
     def quoted_full_table_name(self):
         return "{}.{}".format(
             quoted_identifier(self.schema), quoted_identifier(self.table_name)
         )
 
 
-class ColumnInfo(AutoRepr):
+class ColumnInfo(AutoRepr, Comparable):
     def __init__(
         self,
         name,
@@ -53,6 +222,8 @@ class ColumnInfo(AutoRepr):
         is_generated=False,
         is_inherited=False,
         can_drop_generated=False,
+        fast_default=False,
+        volatile_default=None,
     ):
         self.name = name or ""
         self.dbtype = dbtype
@@ -68,21 +239,14 @@ class ColumnInfo(AutoRepr):
         self.is_generated = is_generated
         self.is_inherited = is_inherited
         self.can_drop_generated = can_drop_generated
+        self.fast_default = fast_default
 
-    def __eq__(self, other):
-        return (
-            self.name == other.name
-            and self.dbtype == other.dbtype
-            and self.dbtypestr == other.dbtypestr
-            and self.default == other.default
-            and self.not_null == other.not_null
-            and self.enum == other.enum
-            and self.collation == other.collation
-            and self.is_identity == other.is_identity
-            and self.is_identity_always == other.is_identity_always
-            and self.is_generated == other.is_generated
-            and self.is_inherited == other.is_inherited
-        )
+        # whether the default calls a volatile function, when known from
+        # the catalog, otherwise guessed from the expression
+        self.volatile_default = volatile_default
+
+    equality_attributes = """name dbtype dbtypestr default not_null enum collation
+    is_identity is_identity_always is_generated is_inherited""".split()
 
     def alter_clauses(self, other):
 
@@ -126,58 +290,86 @@ class ColumnInfo(AutoRepr):
             if self.is_enum and other.is_enum:
                 clauses.append(self.alter_enum_type_clause)
             else:
-                clauses.append(self.alter_data_type_clause)
+                clause = self.alter_data_type_clause
+                clauses.append(Statement(clause, self.type_change_effect(other)))
 
         return clauses
 
+    def type_change_effect(self, other):
+        """
+        What changing other's type to this column's does to the table.
+        """
+        if self.dbtypestr == other.dbtypestr:
+            # a new collation: indexes on the column are rebuilt
+            return SCAN
+        return type_change_effect(other.dbtypestr, self.dbtypestr)
+
     def change_enum_to_string_statement(self, table_name):
         if self.is_enum:
-            return "alter table {} alter column {} set data type varchar using {}::varchar;".format(
-                table_name, self.quoted_name, self.quoted_name
-            )
+            return Statement(
+                "alter table {} alter column {} set data type varchar using {}::varchar;".format(
+                    table_name, self.quoted_name, self.quoted_name
+                ),
+                REWRITE,
+            ).locking(ACCESS_EXCLUSIVE, table_name)
 
         else:
             raise ValueError
 
     def change_string_to_enum_statement(self, table_name):
         if self.is_enum:
-            return (
+            return Statement(
                 "alter table {} alter column {} set data type {} using {}::{};".format(
                     table_name,
                     self.quoted_name,
                     self.dbtypestr,
                     self.quoted_name,
                     self.dbtypestr,
-                )
-            )
+                ),
+                REWRITE,
+            ).locking(ACCESS_EXCLUSIVE, table_name)
         else:
             raise ValueError
 
     def change_enum_statement(self, table_name):
         if self.is_enum:
-            return "alter table {} alter column {} type {} using {}::text::{};".format(
-                table_name,
-                self.name,
-                self.enum.quoted_full_name,
-                self.name,
-                self.enum.quoted_full_name,
-            )
+            return Statement(
+                "alter table {} alter column {} type {} using {}::text::{};".format(
+                    table_name,
+                    self.name,
+                    self.enum.quoted_full_name,
+                    self.name,
+                    self.enum.quoted_full_name,
+                ),
+                REWRITE,
+            ).locking(ACCESS_EXCLUSIVE, table_name)
         else:
             raise ValueError
 
     def drop_default_statement(self, table_name):
-        return "alter table {} alter column {} drop default;".format(
-            table_name, self.quoted_name
-        )
+        return Statement(
+            "alter table {} alter column {} drop default;".format(
+                table_name, self.quoted_name
+            ),
+            CATALOG,
+        ).locking(ACCESS_EXCLUSIVE, table_name)
 
     def add_default_statement(self, table_name):
-        return "alter table {} alter column {} set default {};".format(
-            table_name, self.quoted_name, self.default
-        )
+        return Statement(
+            "alter table {} alter column {} set default {};".format(
+                table_name, self.quoted_name, self.default
+            ),
+            CATALOG,
+        ).locking(ACCESS_EXCLUSIVE, table_name)
 
     def alter_table_statements(self, other, table_name):
         prefix = "alter table {}".format(table_name)
-        return ["{} {};".format(prefix, c) for c in self.alter_clauses(other)]
+        return [
+            c.annotated("{} {};".format(prefix, c)).locking(
+                ACCESS_EXCLUSIVE, table_name
+            )
+            for c in self.alter_clauses(other)
+        ]
 
     @property
     def quoted_name(self):
@@ -199,16 +391,35 @@ class ColumnInfo(AutoRepr):
 
     @property
     def add_column_clause(self):
-        return "add column {}{}".format(self.creation_clause, self.collation_subclause)
+        # since postgres 11 (fast_default), a column with a default that's
+        # the same for every row is added without touching existing rows
+        volatile = self.volatile_default
+        if volatile is None:
+            volatile = is_volatile_default(self.default)
+
+        if self.is_generated or self.is_identity or volatile:
+            effect = REWRITE
+        elif self.default and not self.fast_default:
+            effect = REWRITE
+        else:
+            effect = CATALOG
+
+        return Statement(
+            "add column {}{}".format(self.creation_clause, self.collation_subclause),
+            effect,
+        )
 
     @property
     def drop_column_clause(self):
-        return "drop column {k}".format(k=self.quoted_name)
+        return Statement("drop column {k}".format(k=self.quoted_name), CATALOG)
 
     @property
     def alter_not_null_clause(self):
         keyword = "set" if self.not_null else "drop"
-        return "alter column {} {} not null".format(self.quoted_name, keyword)
+        return Statement(
+            "alter column {} {} not null".format(self.quoted_name, keyword),
+            SCAN if self.not_null else CATALOG,
+        )
 
     @property
     def alter_default_clause(self):
@@ -218,7 +429,7 @@ class ColumnInfo(AutoRepr):
             )
         else:
             alter = "alter column {} drop default".format(self.quoted_name)
-        return alter
+        return Statement(alter, CATALOG)
 
     def alter_default_clause_or_generated(self, other):
         if self.default:
@@ -229,7 +440,7 @@ class ColumnInfo(AutoRepr):
             alter = "alter column {} drop expression".format(self.quoted_name)
         else:
             alter = "alter column {} drop default".format(self.quoted_name)
-        return alter
+        return Statement(alter, CATALOG)
 
     def alter_identity_clause(self, other):
         if self.is_identity:
@@ -244,7 +455,7 @@ class ColumnInfo(AutoRepr):
                 )
         else:
             alter = "alter column {} drop identity".format(self.quoted_name)
-        return alter
+        return Statement(alter, CATALOG)
 
     @property
     def collation_subclause(self):
@@ -256,22 +467,29 @@ class ColumnInfo(AutoRepr):
 
     @property
     def alter_data_type_clause(self):
-        return "alter column {} set data type {}{} using {}::{}".format(
-            self.quoted_name,
-            self.dbtypestr,
-            self.collation_subclause,
-            self.quoted_name,
-            self.dbtypestr,
+        # without the old type, a type change has to be assumed to rewrite
+        return Statement(
+            "alter column {} set data type {}{} using {}::{}".format(
+                self.quoted_name,
+                self.dbtypestr,
+                self.collation_subclause,
+                self.quoted_name,
+                self.dbtypestr,
+            ),
+            REWRITE,
         )
 
     @property
     def alter_enum_type_clause(self):
-        return "alter column {} set data type {}{} using {}::text::{}".format(
-            self.quoted_name,
-            self.dbtypestr,
-            self.collation_subclause,
-            self.quoted_name,
-            self.dbtypestr,
+        return Statement(
+            "alter column {} set data type {}{} using {}::text::{}".format(
+                self.quoted_name,
+                self.dbtypestr,
+                self.collation_subclause,
+                self.quoted_name,
+                self.dbtypestr,
+            ),
+            REWRITE,
         )
 
 
@@ -292,9 +510,17 @@ class InspectedSelectable(Inspected):
         rowsecurity=False,
         forcerowsecurity=False,
         persistence=None,
+        oid=None,
+        page_size_estimate=None,
+        row_count_estimate=None,
+        total_size=None,
+        toast_size=None,
+        pg_version=None,
     ):
         self.name = name
         self.schema = schema
+        self.oid = oid
+        self.pg_version = pg_version
         self.inputs = inputs or []
         self.columns = columns
         self.definition = definition
@@ -312,6 +538,44 @@ class InspectedSelectable(Inspected):
         self.forcerowsecurity = forcerowsecurity
         self.persistence = persistence
 
+        # planner statistics as of the last vacuum or analyze: pg_class's
+        # relpages and reltuples
+        self.page_size_estimate = page_size_estimate
+        if row_count_estimate is not None and row_count_estimate >= 0:
+            row_count_estimate = int(row_count_estimate)
+        else:
+            # never vacuumed or analyzed (or not a table)
+            row_count_estimate = None
+        self.row_count_estimate = row_count_estimate
+
+        # in bytes, only fetched when the inspector is asked for
+        # relation_sizes: total_size includes indexes and TOAST
+        self.total_size = total_size
+        self.toast_size = toast_size
+
+        # set by load_stats()
+        self.stats = None
+
+    @property
+    def definition(self):
+        self._definition = resolved(self._definition)
+        return self._definition
+
+    @definition.setter
+    def definition(self, value):
+        self._definition = value
+
+    equality_attributes = """relationtype name schema columns inputs definition
+    parent_table partition_def rowsecurity persistence""".split()
+
+    @cached_hash
+    def subtree_hash(self):
+        """
+        content_hash combined with those of the indexes and constraints on
+        this selectable.
+        """
+        return combined_hash((self.content_hash, self.indexes, self.constraints))
+
     def __eq__(self, other):
         equalities = (
             type(self) == type(other),
@@ -1,7 +1,21 @@
 from collections import OrderedDict as od
 
+# typename -> python type lookups, shared by every inspector using the same
+# dialect class
+PYTYPES = {}
+
 
 def to_pytype(sqla_dialect, typename):
+    key = type(sqla_dialect), typename
+
+    try:
+        return PYTYPES[key]
+    except KeyError:
+        pytype = PYTYPES[key] = _to_pytype(sqla_dialect, typename)
+        return pytype
+
+
+def _to_pytype(sqla_dialect, typename):
     try:
         sqla_obj = sqla_dialect.ischema_names[typename]()
     except KeyError:
@@ -1,4 +1,6 @@
 import inspect
+import sys
+from operator import attrgetter
 from reprlib import recursive_repr
 
 from pkg_resources import resource_stream as pkg_resource_stream
@@ -16,19 +18,28 @@ def connection_from_s_or_c(s_or_c):  # pragma: no cover
             return s_or_c
 
 
+# attributes used to compare inspected objects, rather than describing them
+COMPARISON_ATTRIBUTES = {"equality_attributes", "content_hash", "subtree_hash"}
+
+
 class AutoRepr:  # pragma: no cover
     @recursive_repr()
     def __repr__(self):
-        done = set()
+        # keeps references, so that the ids of values computed by properties
+        # can't be reused by later ones
+        done = {}
 
         cname = self.__class__.__name__
 
         vals = []
         for k in sorted(dir(self)):
+            if k in COMPARISON_ATTRIBUTES:
+                continue
+
             v = getattr(self, k)
 
             if not k.startswith("_") and (not callable(v)) and id(v) not in done:
-                done.add(id(v))
+                done[id(v)] = v
 
                 attr = "{}={}".format(k, repr(v))
 
@@ -42,6 +53,46 @@ class AutoRepr:  # pragma: no cover
         return not self == other
 
 
+def keyed_property(*attributes):
+    """
+    A read-only property whose value is cached on the instance, and only
+    recomputed when one of the named attributes it depends on has changed.
+    """
+    key_of = attrgetter(*attributes)
+
+    def decorator(f):
+        cache_name = "_cached_" + f.__name__
+
+        def get(self):
+            key = key_of(self)
+            try:
+                cached_key, value = self.__dict__[cache_name]
+                if cached_key == key:
+                    return value
+            except KeyError:
+                pass
+            value = f(self)
+            self.__dict__[cache_name] = key, value
+            return value
+
+        return property(get, doc=f.__doc__)
+
+    return decorator
+
+
+def row_as_dict(row):
+    try:
+        return row._asdict()
+    except AttributeError:
+        return dict(row.items())
+
+
+def interned(s):
+    if type(s) is not str:
+        return s
+    return sys.intern(s)
+
+
 def unquoted_identifier(identifier, *, schema=None, identity_arguments=None):
     if identifier is None and schema is not None:
         return schema
@@ -1,24 +1,49 @@
+import re
 import textwrap
 from collections import OrderedDict as od
 from itertools import groupby
+from time import perf_counter
 
-from ..inspected import ColumnInfo, Inspected
+from ..inspected import ColumnInfo, Deferred, Inspected
 from ..inspected import InspectedSelectable as BaseInspectedSelectable
-from ..inspected import TableRelated
+from ..inspected import TableRelated, combined_hash, resolved
 from ..inspector import DBInspector
-from ..misc import quoted_identifier, resource_text
+from ..misc import (
+    COMPARISON_ATTRIBUTES,
+    interned,
+    keyed_property,
+    quoted_identifier,
+    resource_text,
+    row_as_dict,
+)
+from ..statements import (
+    ACCESS_EXCLUSIVE,
+    ACCESS_SHARE,
+    CATALOG,
+    REWRITE,
+    ROW_SHARE,
+    SCAN,
+    SHARE,
+    SHARE_ROW_EXCLUSIVE,
+    SHARE_UPDATE_EXCLUSIVE,
+    Statement,
+)
+from ..timings import TimedResult, timed_load
 
 CREATE_TABLE = """create {}table {} ({}
 ){}{};
 """
 CREATE_TABLE_SUBCLASS = """create {}table {} partition of {} {};
 """
+CREATE_INDEX = re.compile(r"^(CREATE (?:UNIQUE )?INDEX) ")
 CREATE_FUNCTION_FORMAT = """create or replace function {signature}
 returns {result_string} as
 $${definition}$$
 language {language} {volatility} {strictness} {security_type};"""
 ALL_RELATIONS_QUERY = resource_text("sql/relations.sql")
 ALL_RELATIONS_QUERY_9 = resource_text("sql/relations9.sql")
+ATTRIBUTES_QUERY = resource_text("sql/attributes.sql")
+ATTRIBUTES_QUERY_9 = resource_text("sql/attributes9.sql")
 SCHEMAS_QUERY = resource_text("sql/schemas.sql")
 INDEXES_QUERY = resource_text("sql/indexes.sql")
 SEQUENCES_QUERY = resource_text("sql/sequences.sql")
@@ -34,6 +59,13 @@ TRIGGERS_QUERY = resource_text("sql/triggers.sql")
 COLLATIONS_QUERY = resource_text("sql/collations.sql")
 COLLATIONS_QUERY_9 = resource_text("sql/collations9.sql")
 RLSPOLICIES_QUERY = resource_text("sql/rlspolicies.sql")
+DATABASE_QUERY = resource_text("sql/database.sql")
+VIEW_DEFINITIONS_QUERY = resource_text("sql/viewdefinitions.sql")
+FUNCTION_DEFINITIONS_QUERY = resource_text("sql/functiondefinitions.sql")
+TABLE_STATS_QUERY = resource_text("sql/tablestats.sql")
+INDEX_STATS_QUERY = resource_text("sql/indexstats.sql")
+STATS_RESET_QUERY = resource_text("sql/statsreset.sql")
+FINGERPRINTS_QUERY = resource_text("sql/fingerprints.sql")
 
 
 class InspectedSelectable(BaseInspectedSelectable):
@@ -120,7 +152,14 @@ class InspectedSelectable(BaseInspectedSelectable):
             create_statement = "create type {} as ({});".format(n, colspec)
         else:
             raise NotImplementedError  # pragma: no cover
-        return create_statement
+
+        statement = Statement(create_statement).locking(ACCESS_EXCLUSIVE, n)
+
+        if self.is_partitioning_child_table:
+            return statement.locking(ACCESS_EXCLUSIVE, self.parent_table)
+        elif self.is_table and self.parent_table:
+            return statement.locking(SHARE_UPDATE_EXCLUSIVE, self.parent_table)
+        return statement
 
     @property
     def drop_statement(self):
@@ -136,7 +175,12 @@ class InspectedSelectable(BaseInspectedSelectable):
         else:
             raise NotImplementedError  # pragma: no cover
 
-        return drop_statement
+        statement = Statement(drop_statement).locking(ACCESS_EXCLUSIVE, n)
+
+        # dropping an inheritance child doesn't lock its parent
+        if self.is_partitioning_child_table:
+            return statement.locking(ACCESS_EXCLUSIVE, self.parent_table)
+        return statement
 
     def alter_table_statement(self, clause):
         if self.is_alterable:
@@ -144,7 +188,13 @@ class InspectedSelectable(BaseInspectedSelectable):
         else:
             raise NotImplementedError  # pragma: no cover
 
-        return alter
+        if isinstance(clause, Statement):
+            statement = clause.annotated(alter)
+        else:
+            statement = Statement(alter)
+        return statement.estimated(self).locking(
+            ACCESS_EXCLUSIVE, self.quoted_full_name
+        )
 
     @property
     def is_partitioned(self):
@@ -188,25 +238,50 @@ class InspectedSelectable(BaseInspectedSelectable):
     @property
     def attach_statement(self):
         if self.parent_table:
+            parent_lock = SHARE_UPDATE_EXCLUSIVE
+
             if self.partition_def:
-                return "alter table {} attach partition {} {};".format(
-                    self.quoted_full_name, self.parent_table, self.partition_spec
+                statement = Statement(
+                    "alter table {} attach partition {} {};".format(
+                        self.parent_table, self.quoted_full_name, self.partition_def
+                    )
                 )
+                # before postgres 12, attaching a partition blocks queries
+                # on the parent
+                if self.pg_version and self.pg_version < 12:
+                    parent_lock = ACCESS_EXCLUSIVE
             else:
-                return "alter table {} inherit {}".format(
-                    self.quoted_full_name, self.parent_table
+                statement = Statement(
+                    "alter table {} inherit {}".format(
+                        self.quoted_full_name, self.parent_table
+                    )
                 )
+            return statement.locking(parent_lock, self.parent_table).locking(
+                ACCESS_EXCLUSIVE, self.quoted_full_name
+            )
 
     @property
     def detach_statement(self):
         if self.parent_table:
             if self.partition_def:
-                return "alter table {} detach partition {};".format(
-                    self.parent_table, self.quoted_full_name
+                return (
+                    Statement(
+                        "alter table {} detach partition {};".format(
+                            self.parent_table, self.quoted_full_name
+                        )
+                    )
+                    .locking(ACCESS_EXCLUSIVE, self.parent_table)
+                    .locking(ACCESS_EXCLUSIVE, self.quoted_full_name)
                 )
             else:
-                return "alter table {} no inherit {}".format(
-                    self.quoted_full_name, self.parent_table
+                return (
+                    Statement(
+                        "alter table {} no inherit {}".format(
+                            self.quoted_full_name, self.parent_table
+                        )
+                    )
+                    .locking(ACCESS_SHARE, self.parent_table)
+                    .locking(ACCESS_EXCLUSIVE, self.quoted_full_name)
                 )
 
     def attach_detach_statements(self, before):
@@ -221,7 +296,7 @@ class InspectedSelectable(BaseInspectedSelectable):
     @property
     def alter_rls_clause(self):
         keyword = "enable" if self.rowsecurity else "disable"
-        return "{} row level security".format(keyword)
+        return Statement("{} row level security".format(keyword), CATALOG)
 
     @property
     def alter_rls_statement(self):
@@ -230,7 +305,7 @@ class InspectedSelectable(BaseInspectedSelectable):
     @property
     def alter_unlogged_statement(self):
         keyword = "unlogged" if self.is_unlogged else "logged"
-        return self.alter_table_statement("set {}".format(keyword))
+        return self.alter_table_statement(Statement("set {}".format(keyword), REWRITE))
 
 
 class InspectedFunction(InspectedSelectable):
@@ -251,6 +326,7 @@ class InspectedFunction(InspectedSelectable):
         comment,
         returntype,
         kind,
+        oid=None,
     ):
         self.identity_arguments = identity_arguments
         self.result_string = result_string
@@ -270,20 +346,30 @@ class InspectedFunction(InspectedSelectable):
             definition=definition,
             relationtype="f",
             comment=comment,
+            oid=oid,
         )
 
+    @property
+    def full_definition(self):
+        self._full_definition = resolved(self._full_definition)
+        return self._full_definition
+
+    @full_definition.setter
+    def full_definition(self, value):
+        self._full_definition = value
+
     @property
     def returntype_is_table(self):
         if self.returntype:
             return "." in self.returntype
 
-    @property
+    @keyed_property("name", "schema", "identity_arguments")
     def signature(self):
         return "{}({})".format(self.quoted_full_name, self.identity_arguments)
 
     @property
     def create_statement(self):
-        return self.full_definition + ";"
+        return Statement(self.full_definition + ";")
         """
         return CREATE_FUNCTION_FORMAT.format(
             signature=self.signature,
@@ -303,7 +389,10 @@ class InspectedFunction(InspectedSelectable):
 
     @property
     def drop_statement(self):
-        return "drop {} if exists {};".format(self.thing, self.signature)
+        return Statement("drop {} if exists {};".format(self.thing, self.signature))
+
+    equality_attributes = """signature result_string definition language volatility
+    strictness security_type kind""".split()
 
     def __eq__(self, other):
         return (
@@ -320,7 +409,15 @@ class InspectedFunction(InspectedSelectable):
 
 class InspectedTrigger(Inspected):
     def __init__(
-        self, name, schema, table_name, proc_schema, proc_name, enabled, full_definition
+        self,
+        name,
+        schema,
+        table_name,
+        proc_schema,
+        proc_name,
+        enabled,
+        full_definition,
+        oid=None,
     ):
         (
             self.name,
@@ -331,6 +428,7 @@ class InspectedTrigger(Inspected):
             self.enabled,
             self.full_definition,
         ) = (name, schema, table_name, proc_schema, proc_name, enabled, full_definition)
+        self.oid = oid
 
         self.dependent_on = [self.quoted_full_selectable_name]
         self.dependents = []
@@ -339,7 +437,7 @@ class InspectedTrigger(Inspected):
     def signature(self):
         return self.quoted_full_name
 
-    @property
+    @keyed_property("name", "schema", "table_name")
     def quoted_full_name(self):
         return "{}.{}.{}".format(
             quoted_identifier(self.schema),
@@ -355,9 +453,11 @@ class InspectedTrigger(Inspected):
 
     @property
     def drop_statement(self):
-        return 'drop trigger if exists "{}" on "{}"."{}";'.format(
-            self.name, self.schema, self.table_name
-        )
+        return Statement(
+            'drop trigger if exists "{}" on "{}"."{}";'.format(
+                self.name, self.schema, self.table_name
+            )
+        ).locking(ACCESS_EXCLUSIVE, self.quoted_full_selectable_name)
 
     @property
     def create_statement(self):
@@ -372,25 +472,17 @@ class InspectedTrigger(Inspected):
         trigger_name = quoted_identifier(self.name)
         if self.enabled in ("D", "R", "A"):
             table_alter = f"ALTER TABLE {schema}.{table} {status_sql[self.enabled]} {trigger_name}"
-            return self.full_definition + ";\n" + table_alter + ";"
+            statement = self.full_definition + ";\n" + table_alter + ";"
         else:
-            return self.full_definition + ";"
+            statement = self.full_definition + ";"
 
-    def __eq__(self, other):
-        """
-        :type other: InspectedTrigger
-        :rtype: bool
-        """
-        return (
-            self.name == other.name
-            and self.schema == other.schema
-            and self.table_name == other.table_name
-            and self.proc_schema == other.proc_schema
-            and self.proc_name == other.proc_name
-            and self.enabled == other.enabled
-            and self.full_definition == other.full_definition
+        return Statement(statement).locking(
+            SHARE_ROW_EXCLUSIVE, self.quoted_full_selectable_name
         )
 
+    equality_attributes = """name schema table_name proc_schema proc_name enabled
+    full_definition""".split()
+
 
 class InspectedIndex(Inspected, TableRelated):
     def __init__(
@@ -414,9 +506,13 @@ class InspectedIndex(Inspected, TableRelated):
         constraint=None,
         index_columns=None,
         included_columns=None,
+        oid=None,
+        is_partitioned=False,
+        page_size_estimate=None,
     ):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.definition = definition
         self.table_name = table_name
         self.key_columns = key_columns
@@ -434,89 +530,122 @@ class InspectedIndex(Inspected, TableRelated):
         self.constraint = constraint
         self.index_columns = index_columns
         self.included_columns = included_columns
+        self.is_partitioned = is_partitioned
+        self.page_size_estimate = page_size_estimate
+        self.stats = None
 
     @property
     def drop_statement(self):
         statement = "drop index if exists {};".format(self.quoted_full_name)
 
         if self.is_exclusion_constraint:
-            return "select 1; " + textwrap.indent(statement, "-- ")
-        return statement
+            return Statement("select 1; " + textwrap.indent(statement, "-- "))
+        return Statement(statement).locking(
+            ACCESS_EXCLUSIVE, self.quoted_full_table_name, self.quoted_full_name
+        )
 
     @property
     def create_statement(self):
         statement = "{};".format(self.definition)
         if self.is_exclusion_constraint:
-            return "select 1; " + textwrap.indent(statement, "-- ")
-        return statement
+            return Statement("select 1; " + textwrap.indent(statement, "-- "))
+        return Statement(statement).locking(SHARE, self.quoted_full_table_name)
 
     @property
-    def is_exclusion_constraint(self):
-        return self.constraint and self.constraint.constraint_type == "EXCLUDE"
+    def can_be_concurrent(self):
+        # exclusion constraints build their own index, and indexes on
+        # partitioned tables can't be built or dropped concurrently
+        return not (self.is_exclusion_constraint or self.is_partitioned)
 
-    def __eq__(self, other):
+    @property
+    def drop_statement_concurrently(self):
         """
-        :type other: InspectedIndex
-        :rtype: bool
+        drop_statement, without blocking queries on the table. Like any
+        concurrent statement, it can't be run inside a transaction.
+        """
+        if not self.can_be_concurrent:
+            return self.drop_statement
+
+        statement = "drop index concurrently if exists {};".format(
+            self.quoted_full_name
+        )
+        return Statement(statement).locking(
+            SHARE_UPDATE_EXCLUSIVE, self.quoted_full_table_name, self.quoted_full_name
+        )
+
+    @property
+    def create_statement_concurrently(self):
         """
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.table_name == other.table_name,
-            self.key_columns == other.key_columns,
-            self.included_columns == other.included_columns,
-            self.key_options == other.key_options,
-            self.num_att == other.num_att,
-            self.is_unique == other.is_unique,
-            self.is_pk == other.is_pk,
-            self.is_exclusion == other.is_exclusion,
-            self.is_immediate == other.is_immediate,
-            self.is_clustered == other.is_clustered,
-            self.key_expressions == other.key_expressions,
-            self.partial_predicate == other.partial_predicate,
-            self.algorithm == other.algorithm,
+        create_statement, building the index without blocking writes to the
+        table. An index backing a primary key or unique constraint is built
+        the same way, and the constraint then added using it, as its
+        create_statement does.
+        """
+        if not self.can_be_concurrent:
+            return self.create_statement
+
+        statement = CREATE_INDEX.sub(r"\1 CONCURRENTLY ", self.definition, count=1)
+        return Statement("{};".format(statement)).locking(
+            SHARE_UPDATE_EXCLUSIVE, self.quoted_full_table_name
         )
-        return all(equalities)
+
+    @property
+    def is_exclusion_constraint(self):
+        return self.constraint and self.constraint.constraint_type == "EXCLUDE"
+
+    equality_attributes = """name schema table_name key_columns included_columns
+    key_options num_att is_unique is_pk is_exclusion is_immediate is_clustered
+    key_expressions partial_predicate algorithm""".split()
 
 
 class InspectedSequence(Inspected):
-    def __init__(self, name, schema, table_name=None, column_name=None):
+    def __init__(self, name, schema, table_name=None, column_name=None, oid=None):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.table_name = table_name
         self.column_name = column_name
 
     @property
     def drop_statement(self):
-        return "drop sequence if exists {};".format(self.quoted_full_name)
+        return Statement(
+            "drop sequence if exists {};".format(self.quoted_full_name)
+        ).locking(ACCESS_EXCLUSIVE, self.quoted_full_name)
 
     @property
     def create_statement(self):
-        return "create sequence {};".format(self.quoted_full_name)
+        return Statement("create sequence {};".format(self.quoted_full_name))
 
     @property
     def create_statement_with_ownership(self):
         t_col_name = self.quoted_table_and_column_name
 
         if self.table_name and self.column_name:
-            return "create sequence {} owned by {};".format(
-                self.quoted_full_name, t_col_name
-            )
+            return Statement(
+                "create sequence {} owned by {};".format(
+                    self.quoted_full_name, t_col_name
+                )
+            ).locking(ACCESS_SHARE, self.quoted_full_table_name)
         else:
-            return "create sequence {};".format(self.quoted_full_name)
+            return self.create_statement
 
     @property
     def alter_ownership_statement(self):
         t_col_name = self.quoted_table_and_column_name
 
         if t_col_name is not None:
-            return "alter sequence {} owned by {};".format(
-                self.quoted_full_name, t_col_name
-            )
+            statement = Statement(
+                "alter sequence {} owned by {};".format(
+                    self.quoted_full_name, t_col_name
+                )
+            ).locking(ACCESS_SHARE, self.quoted_full_table_name)
         else:
-            return "alter sequence {} owned by none;".format(self.quoted_full_name)
+            statement = Statement(
+                "alter sequence {} owned by none;".format(self.quoted_full_name)
+            )
+        return statement.locking(SHARE_ROW_EXCLUSIVE, self.quoted_full_name)
 
-    @property
+    @keyed_property("schema", "table_name")
     def quoted_full_table_name(self):
         if self.table_name is not None:
             return quoted_identifier(self.table_name, self.schema)
@@ -528,19 +657,16 @@ class InspectedSequence(Inspected):
                 self.quoted_full_table_name + "." + quoted_identifier(self.column_name)
             )
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.quoted_table_and_column_name == other.quoted_table_and_column_name,
-        )
-        return all(equalities)
+    equality_attributes = "name schema quoted_table_and_column_name".split()
 
 
 class InspectedCollation(Inspected):
-    def __init__(self, name, schema, provider, encoding, lc_collate, lc_ctype, version):
+    def __init__(
+        self, name, schema, provider, encoding, lc_collate, lc_ctype, version, oid=None
+    ):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.provider = provider
         self.lc_collate = lc_collate
         self.lc_ctype = lc_ctype
@@ -553,29 +679,24 @@ class InspectedCollation(Inspected):
 
     @property
     def drop_statement(self):
-        return "drop collation if exists {};".format(self.quoted_full_name)
+        return Statement("drop collation if exists {};".format(self.quoted_full_name))
 
     @property
     def create_statement(self):
-        return "create collation if not exists {} (provider = '{}', locale = '{}');".format(
-            self.quoted_full_name, self.provider, self.locale
+        return Statement(
+            "create collation if not exists {} (provider = '{}', locale = '{}');".format(
+                self.quoted_full_name, self.provider, self.locale
+            )
         )
 
-    def __eq__(self, other):
-
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.provider == other.provider,
-            self.locale == other.locale,
-        )
-        return all(equalities)
+    equality_attributes = "name schema provider locale".split()
 
 
 class InspectedEnum(Inspected):
-    def __init__(self, name, schema, elements, pg_version=None):
+    def __init__(self, name, schema, elements, pg_version=None, oid=None):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.elements = elements
         self.pg_version = pg_version
         self.dependents = []
@@ -583,12 +704,14 @@ class InspectedEnum(Inspected):
 
     @property
     def drop_statement(self):
-        return "drop type {};".format(self.quoted_full_name)
+        return Statement("drop type {};".format(self.quoted_full_name))
 
     @property
     def create_statement(self):
-        return "create type {} as enum ({});".format(
-            self.quoted_full_name, self.quoted_elements
+        return Statement(
+            "create type {} as enum ({});".format(
+                self.quoted_full_name, self.quoted_elements
+            )
         )
 
     @property
@@ -599,14 +722,16 @@ class InspectedEnum(Inspected):
     def alter_rename_statement(self, new_name):
         name = new_name
 
-        return "alter type {} rename to {};".format(
-            self.quoted_full_name, quoted_identifier(name)
+        return Statement(
+            "alter type {} rename to {};".format(
+                self.quoted_full_name, quoted_identifier(name)
+            )
         )
 
     def drop_statement_with_rename(self, new_name):
         name = new_name
         new_name = quoted_identifier(name, self.schema)
-        return "drop type {};".format(new_name)
+        return Statement("drop type {};".format(new_name))
 
     def change_statements(self, new):
         if not self.can_be_changed_to(new):
@@ -626,7 +751,7 @@ class InspectedEnum(Inspected):
                     s = "alter type {} add value '{}' after '{}';".format(
                         self.quoted_full_name, c, previous
                     )
-                statements.append(s)
+                statements.append(Statement(s))
             previous = c
         return statements
 
@@ -639,27 +764,22 @@ class InspectedEnum(Inspected):
         # new must already have the existing items from old, in the same order
         return [e for e in new.elements if e in old] == old
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.elements == other.elements,
-        )
-        return all(equalities)
+    equality_attributes = "name schema elements".split()
 
 
 class InspectedSchema(Inspected):
-    def __init__(self, schema):
+    def __init__(self, schema, oid=None):
         self.schema = schema
         self.name = None
+        self.oid = oid
 
     @property
     def create_statement(self):
-        return "create schema if not exists {};".format(self.quoted_schema)
+        return Statement("create schema if not exists {};".format(self.quoted_schema))
 
     @property
     def drop_statement(self):
-        return "drop schema if exists {};".format(self.quoted_schema)
+        return Statement("drop schema if exists {};".format(self.quoted_schema))
 
     @property
     def quoted_full_name(self):
@@ -669,19 +789,19 @@ class InspectedSchema(Inspected):
     def quoted_name(self):
         return quoted_identifier(self.schema)
 
-    def __eq__(self, other):
-        return self.schema == other.schema
+    equality_attributes = ["schema"]
 
 
 class InspectedType(Inspected):
-    def __init__(self, name, schema, columns):
+    def __init__(self, name, schema, columns, oid=None):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.columns = columns
 
     @property
     def drop_statement(self):
-        return "drop type {};".format(self.signature)
+        return Statement("drop type {};".format(self.signature))
 
     @property
     def create_statement(self):
@@ -695,14 +815,9 @@ class InspectedType(Inspected):
 
         sql += ",\n".join(typespec)
         sql += "\n);"
-        return sql
+        return Statement(sql)
 
-    def __eq__(self, other):
-        return (
-            self.schema == other.schema
-            and self.name == other.name
-            and self.columns == other.columns
-        )
+    equality_attributes = "schema name columns".split()
 
 
 class InspectedDomain(Inspected):
@@ -716,9 +831,11 @@ class InspectedDomain(Inspected):
         not_null,
         default,
         check,
+        oid=None,
     ):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.data_type = data_type
         self.collation = collation
         self.constraint_name = constraint_name
@@ -728,7 +845,7 @@ class InspectedDomain(Inspected):
 
     @property
     def drop_statement(self):
-        return "drop domain {};".format(self.signature)
+        return Statement("drop domain {};".format(self.signature))
 
     @property
     def create_statement(self):
@@ -747,7 +864,7 @@ as {_type}
             nullable=self.nullable_clause,
         )
 
-        return sql
+        return Statement(sql)
 
     @property
     def check_clause(self):
@@ -781,27 +898,17 @@ as {_type}
         "schema name data_type collation default constraint_name not_null check".split()
     )
 
-    def __eq__(self, other):
-        try:
-            return all(
-                [
-                    getattr(self, a) == getattr(other, a)
-                    for a in self.equality_attributes
-                ]
-            )
-        except AttributeError:
-            return False
-
 
 class InspectedExtension(Inspected):
-    def __init__(self, name, schema, version=None):
+    def __init__(self, name, schema, version=None, oid=None):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.version = version
 
     @property
     def drop_statement(self):
-        return "drop extension if exists {};".format(self.quoted_name)
+        return Statement("drop extension if exists {};".format(self.quoted_name))
 
     @property
     def create_statement(self):
@@ -810,28 +917,24 @@ class InspectedExtension(Inspected):
         else:
             version_clause = ""
 
-        return "create extension if not exists {} with schema {}{};".format(
-            self.quoted_name, self.quoted_schema, version_clause
+        return Statement(
+            "create extension if not exists {} with schema {}{};".format(
+                self.quoted_name, self.quoted_schema, version_clause
+            )
         )
 
     @property
     def update_statement(self):
         if not self.version:
             return None
-        return "alter extension {} update to '{}';".format(
-            self.quoted_name, self.version
+        return Statement(
+            "alter extension {} update to '{}';".format(self.quoted_name, self.version)
         )
 
     def alter_statements(self, other=None):
         return [self.update_statement]
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.version == other.version,
-        )
-        return all(equalities)
+    equality_attributes = "name schema version".split()
 
     def unversioned_copy(self):
         return InspectedExtension(self.name, self.schema)
@@ -849,9 +952,13 @@ class InspectedConstraint(Inspected, TableRelated):
         is_fk=False,
         is_deferrable=False,
         initially_deferred=False,
+        oid=None,
+        pg_version=None,
     ):
         self.name = name
         self.schema = schema
+        self.oid = oid
+        self.pg_version = pg_version
         self.constraint_type = constraint_type
         self.table_name = table_name
         self.definition = definition
@@ -867,9 +974,20 @@ class InspectedConstraint(Inspected, TableRelated):
 
     @property
     def drop_statement(self):
-        return "alter table {} drop constraint {};".format(
-            self.quoted_full_table_name, self.quoted_name
-        )
+        # dropping a foreign key drops its triggers on the referenced table
+        return Statement(
+            "alter table {} drop constraint {};".format(
+                self.quoted_full_table_name, self.quoted_name
+            )
+        ).locking(ACCESS_EXCLUSIVE, *self.quoted_full_table_names)
+
+    @property
+    def quoted_full_table_names(self):
+        names = [self.quoted_full_table_name]
+
+        if self.is_fk and self.quoted_full_foreign_table_name not in names:
+            names.append(self.quoted_full_foreign_table_name)
+        return names
 
     @property
     def deferrable_subclause(self):
@@ -903,7 +1021,14 @@ class InspectedConstraint(Inspected, TableRelated):
 
         USING = "alter table {} add constraint {} {};"
 
-        return USING.format(self.quoted_full_table_name, self.quoted_name, using_clause)
+        statement = Statement(
+            USING.format(self.quoted_full_table_name, self.quoted_name, using_clause)
+        )
+
+        # foreign keys add triggers to both tables, which only blocks writes
+        if self.is_fk and not self.index:
+            return statement.locking(SHARE_ROW_EXCLUSIVE, *self.quoted_full_table_names)
+        return statement.locking(ACCESS_EXCLUSIVE, self.quoted_full_table_name)
 
     @property
     def can_use_not_valid(self):
@@ -913,7 +1038,17 @@ class InspectedConstraint(Inspected, TableRelated):
     def validate_statement(self):
         if self.can_use_not_valid:
             VALIDATE = "alter table {} validate constraint {};"
-            return VALIDATE.format(self.quoted_full_table_name, self.quoted_name)
+
+            statement = Statement(
+                VALIDATE.format(self.quoted_full_table_name, self.quoted_name)
+            ).locking(SHARE_UPDATE_EXCLUSIVE, self.quoted_full_table_name)
+
+            # the referenced rows are checked with select ... for key share
+            if self.is_fk and (
+                self.quoted_full_foreign_table_name != self.quoted_full_table_name
+            ):
+                return statement.locking(ROW_SHARE, self.quoted_full_foreign_table_name)
+            return statement
 
     @property
     def safer_create_statements(self):
@@ -923,6 +1058,59 @@ class InspectedConstraint(Inspected, TableRelated):
         return [self.get_create_statement(set_not_valid=True), self.validate_statement]
 
     @property
+    def safer_create_statements_concurrently(self):
+        """
+        safer_create_statements, but for a primary key or unique constraint,
+        first building its index concurrently, so that the constraint is then
+        added using it with only a brief ACCESS EXCLUSIVE lock. The index
+        build can't run inside a transaction.
+
+        Adding a primary key also makes its columns not null, which scans
+        the table under that lock. Since postgres 12 the scan is skipped if
+        a valid check constraint shows the columns have no nulls, so one is
+        added as not valid and validated first (which doesn't block reads
+        or writes), and dropped once the key is added. Before 12 the scan
+        can't be avoided, and the statement adding the key is a SCAN.
+
+        Constraints on partitioned tables can't be added using an index, so
+        for those this is the same as safer_create_statements.
+        """
+        if not (self.index and self.index.can_be_concurrent):
+            return self.safer_create_statements
+
+        build = self.index.create_statement_concurrently
+        add = self.create_statement
+
+        if self.constraint_type != "PRIMARY KEY":
+            return [build, Statement(add, CATALOG, locks=add.locks)]
+        elif self.pg_version and self.pg_version < 12:
+            return [build, Statement(add, SCAN, locks=add.locks)]
+
+        table = self.quoted_full_table_name
+        check = quoted_identifier(self.name + "_not_null")
+        not_null = " and ".join(
+            "{} is not null".format(quoted_identifier(c))
+            for c in self.index.key_columns
+        )
+
+        return [
+            build,
+            Statement(
+                "alter table {} add constraint {} check ({}) not valid;".format(
+                    table, check, not_null
+                ),
+                CATALOG,
+            ).locking(ACCESS_EXCLUSIVE, table),
+            Statement(
+                "alter table {} validate constraint {};".format(table, check), SCAN
+            ).locking(SHARE_UPDATE_EXCLUSIVE, table),
+            Statement(add, CATALOG, locks=add.locks),
+            Statement(
+                "alter table {} drop constraint {};".format(table, check), CATALOG
+            ).locking(ACCESS_EXCLUSIVE, table),
+        ]
+
+    @keyed_property("name", "schema", "table_name")
     def quoted_full_name(self):
         return "{}.{}.{}".format(
             quoted_identifier(self.schema),
@@ -930,23 +1118,14 @@ class InspectedConstraint(Inspected, TableRelated):
             quoted_identifier(self.name),
         )
 
-    @property
+    @keyed_property("schema", "table_name")
     def quoted_full_table_name(self):
         return "{}.{}".format(
             quoted_identifier(self.schema), quoted_identifier(self.table_name)
         )
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.table_name == other.table_name,
-            self.definition == other.definition,
-            self.index == other.index,
-            self.is_deferrable == other.is_deferrable,
-            self.initially_deferred == other.initially_deferred,
-        )
-        return all(equalities)
+    equality_attributes = """name schema table_name definition index is_deferrable
+    initially_deferred""".split()
 
 
 class InspectedPrivilege(Inspected):
@@ -963,31 +1142,27 @@ class InspectedPrivilege(Inspected):
 
     @property
     def drop_statement(self):
-        return "revoke {} on {} {} from {};".format(
-            self.privilege,
-            self.object_type,
-            self.quoted_full_name,
-            self.quoted_target_user,
+        return Statement(
+            "revoke {} on {} {} from {};".format(
+                self.privilege,
+                self.object_type,
+                self.quoted_full_name,
+                self.quoted_target_user,
+            )
         )
 
     @property
     def create_statement(self):
-        return "grant {} on {} {} to {};".format(
-            self.privilege,
-            self.object_type,
-            self.quoted_full_name,
-            self.quoted_target_user,
+        return Statement(
+            "grant {} on {} {} to {};".format(
+                self.privilege,
+                self.object_type,
+                self.quoted_full_name,
+                self.quoted_target_user,
+            )
         )
 
-    def __eq__(self, other):
-        equalities = (
-            self.schema == other.schema,
-            self.object_type == other.object_type,
-            self.name == other.name,
-            self.privilege == other.privilege,
-            self.target_user == other.target_user,
-        )
-        return all(equalities)
+    equality_attributes = "schema object_type name privilege target_user".split()
 
     @property
     def key(self):
@@ -1006,10 +1181,20 @@ COMMANDTYPES = {"*": "all", "r": "select", "a": "insert", "w": "update", "d": "d
 
 class InspectedRowPolicy(Inspected, TableRelated):
     def __init__(
-        self, name, schema, table_name, commandtype, permissive, roles, qual, withcheck
+        self,
+        name,
+        schema,
+        table_name,
+        commandtype,
+        permissive,
+        roles,
+        qual,
+        withcheck,
+        oid=None,
     ):
         self.name = name
         self.schema = schema
+        self.oid = oid
         self.table_name = table_name
         self.commandtype = commandtype
         self.permissive = permissive
@@ -1043,41 +1228,118 @@ class InspectedRowPolicy(Inspected, TableRelated):
 
         roleslist = ", ".join(self.roles)
 
-        return RLS_POLICY_CREATE.format(
-            name=self.quoted_name,
-            table_name=self.quoted_full_table_name,
-            permissiveness=self.permissiveness,
-            commandtype_keyword=self.commandtype_keyword,
-            roleslist=roleslist,
-            qual_clause=qual_clause,
-            withcheck_clause=withcheck_clause,
-        )
+        return Statement(
+            RLS_POLICY_CREATE.format(
+                name=self.quoted_name,
+                table_name=self.quoted_full_table_name,
+                permissiveness=self.permissiveness,
+                commandtype_keyword=self.commandtype_keyword,
+                roleslist=roleslist,
+                qual_clause=qual_clause,
+                withcheck_clause=withcheck_clause,
+            )
+        ).locking(ACCESS_EXCLUSIVE, self.quoted_full_table_name)
 
     @property
     def drop_statement(self):
-        return "drop policy {} on {};".format(
-            self.quoted_name, self.quoted_full_table_name
-        )
+        return Statement(
+            "drop policy {} on {};".format(
+                self.quoted_name, self.quoted_full_table_name
+            )
+        ).locking(ACCESS_EXCLUSIVE, self.quoted_full_table_name)
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == self.name,
-            self.schema == other.schema,
-            self.permissiveness == other.permissiveness,
-            self.commandtype == other.commandtype,
-            self.permissive == other.permissive,
-            self.roles == other.roles,
-            self.qual == other.qual,
-            self.withcheck == other.withcheck,
-        )
-        return all(equalities)
+    equality_attributes = """name schema permissiveness commandtype permissive roles
+    qual withcheck""".split()
+
+
+DEFAULT_FETCH_SIZE = 10000
+
+
+class DeferredDefinitions(object):
+    def __init__(self, inspector, query, name):
+        self.inspector = inspector
+        self.query = query
+        self.name = name
+        self.oids = set()
+        self.values = None
+
+    def defer(self, oid, field):
+        self.oids.add(oid)
+        return Deferred(self, oid, field)
+
+    def get(self, oid, field):
+        if self.values is None:
+            self.load()
+
+        # dropped since it was inspected
+        if oid not in self.values:
+            return None
+        return getattr(self.values[oid], field)
+
+    def load(self):
+        oids = ",".join(str(int(oid)) for oid in sorted(self.oids))
+        q = self.inspector.processed(self.query.replace("OIDS", oids))
+        rows = self.inspector.execute(q, query_name=self.name)
+        self.values = {row.oid: row for row in rows}
+
+
+def stats_from_row(row):
+    return od((k, v) for k, v in row_as_dict(row).items() if k != "oid")
 
 
 PROPS = "schemas relations tables views functions selectables sequences constraints indexes enums extensions privileges collations triggers rlspolicies"
 
 
+SERIALIZED_FIELDS = {}
+
+
+def is_ddl_field(name):
+    return "_statement" in name or name.endswith("clause")
+
+
+def serialized_fields(x, include_derived=True):
+    """
+    The public attribute names serialized for an inspected object, in the
+    same (sorted) order as dir(x), worked out once per class: its
+    properties, and the attributes its constructor sets (which every
+    instance of the class has) rather than calling dir() on every object.
+    """
+    # reading __dict__ first decodes a lazily loaded object, which makes
+    # it an instance of its actual class
+    attributes = x.__dict__
+    cls = type(x)
+
+    try:
+        return SERIALIZED_FIELDS[cls][include_derived]
+    except KeyError:
+        pass
+
+    names = set(k for k in dir(cls) if not callable(getattr(cls, k)))
+    names.update(attributes)
+    names = [
+        k
+        for k in sorted(names)
+        if not k.startswith("_") and k not in COMPARISON_ATTRIBUTES
+    ]
+
+    SERIALIZED_FIELDS[cls] = {
+        True: names,
+        False: [k for k in names if not is_ddl_field(k)],
+    }
+    return SERIALIZED_FIELDS[cls][include_derived]
+
+
 class PostgreSQL(DBInspector):
-    def __init__(self, c, include_internal=False):
+    def __init__(
+        self,
+        c,
+        include_internal=False,
+        stream_results=False,
+        fetch_size=DEFAULT_FETCH_SIZE,
+        lazy_definitions=False,
+        relation_sizes=False,
+        hooks=(),
+    ):
         self.is_raw_psyco_connection = False
 
         try:
@@ -1086,6 +1348,38 @@ class PostgreSQL(DBInspector):
             pg_version = int(str(c.connection.server_version)[:-4])
             self.is_raw_psyco_connection = True
 
+        self.set_up(
+            pg_version,
+            include_internal=include_internal,
+            stream_results=stream_results,
+            fetch_size=fetch_size,
+            lazy_definitions=lazy_definitions,
+            relation_sizes=relation_sizes,
+            hooks=hooks,
+        )
+        super(PostgreSQL, self).__init__(c, include_internal)
+
+    def set_up(
+        self,
+        pg_version,
+        include_internal=False,
+        stream_results=False,
+        fetch_size=DEFAULT_FETCH_SIZE,
+        lazy_definitions=False,
+        relation_sizes=False,
+        hooks=(),
+    ):
+        """
+        Set the options and the catalog queries for pg_version, without
+        inspecting anything. Inspectors loaded from snapshots are set up
+        the same way, so they have all the attributes of a live one.
+        """
+        self.stream_results = stream_results
+        self.fetch_size = fetch_size
+        self.lazy_definitions = lazy_definitions
+        self.relation_sizes = relation_sizes
+        self.stats_reset = None
+        self.cursors_opened = 0
         self.pg_version = pg_version
 
         def processed(q):
@@ -1095,6 +1389,14 @@ class PostgreSQL(DBInspector):
                 q = q.replace("-- 11_AND_LATER", "")
             else:
                 q = q.replace("-- 10_AND_EARLIER", "")
+            if self.lazy_definitions:
+                q = q.replace("-- LAZY_DEFINITIONS", "")
+            else:
+                q = q.replace("-- EAGER_DEFINITIONS", "")
+            if self.relation_sizes:
+                q = q.replace("-- RELATION_SIZES", "")
+            else:
+                q = q.replace("-- NO_RELATION_SIZES", "")
 
             if not self.is_raw_psyco_connection:
                 from sqlalchemy import text
@@ -1105,22 +1407,28 @@ class PostgreSQL(DBInspector):
                 q = q.replace(r"\:", ":")
             return q
 
+        self.processed = processed
+
         if pg_version <= 9:
             self.ALL_RELATIONS_QUERY = processed(ALL_RELATIONS_QUERY_9)
+            self.ATTRIBUTES_QUERY = processed(ATTRIBUTES_QUERY_9)
             self.COLLATIONS_QUERY = processed(COLLATIONS_QUERY_9)
             self.RLSPOLICIES_QUERY = None
+            self.DATABASE_QUERY = None
         else:
-            all_relations_query = ALL_RELATIONS_QUERY
+            attributes_query = ATTRIBUTES_QUERY
 
             if pg_version >= 12:
                 replace = "-- 12_ONLY"
             else:
                 replace = "-- PRE_12"
 
-            all_relations_query = all_relations_query.replace(replace, "")
-            self.ALL_RELATIONS_QUERY = processed(all_relations_query)
+            attributes_query = attributes_query.replace(replace, "")
+            self.ALL_RELATIONS_QUERY = processed(ALL_RELATIONS_QUERY)
+            self.ATTRIBUTES_QUERY = processed(attributes_query)
             self.COLLATIONS_QUERY = processed(COLLATIONS_QUERY)
             self.RLSPOLICIES_QUERY = processed(RLSPOLICIES_QUERY)
+            self.DATABASE_QUERY = processed(DATABASE_QUERY)
 
         self.INDEXES_QUERY = processed(INDEXES_QUERY)
         self.SEQUENCES_QUERY = processed(SEQUENCES_QUERY)
@@ -1134,10 +1442,52 @@ class PostgreSQL(DBInspector):
         self.SCHEMAS_QUERY = processed(SCHEMAS_QUERY)
         self.PRIVILEGES_QUERY = processed(PRIVILEGES_QUERY)
         self.TRIGGERS_QUERY = processed(TRIGGERS_QUERY)
+        self.TABLE_STATS_QUERY = processed(TABLE_STATS_QUERY)
+        self.INDEX_STATS_QUERY = processed(INDEX_STATS_QUERY)
+        self.STATS_RESET_QUERY = processed(STATS_RESET_QUERY)
 
-        super(PostgreSQL, self).__init__(c, include_internal)
+        self.view_definitions = DeferredDefinitions(
+            self, VIEW_DEFINITIONS_QUERY, "VIEW_DEFINITIONS_QUERY"
+        )
+        self.function_definitions = DeferredDefinitions(
+            self, FUNCTION_DEFINITIONS_QUERY, "FUNCTION_DEFINITIONS_QUERY"
+        )
+
+        # callables passed a Timing for each catalog query and loader
+        self.hooks = list(hooks)
+        self.query_seconds = 0.0
+        self.query_names = {
+            id(q): k
+            for k, q in vars(self).items()
+            if k.endswith("_QUERY") and q is not None
+        }
+
+    hooks = ()
+
+    def notify(self, timing):
+        for hook in self.hooks:
+            hook(timing)
+
+    def timed(self, execute, q, query_name=None):
+        if not self.hooks:
+            return execute(q)
+
+        name = query_name or self.query_names.get(id(q), "query")
+        started = perf_counter()
+        rows = execute(q)
+        return TimedResult(rows, self, name, perf_counter() - started)
+
+    def execute(self, q, *args, query_name=None, **kwargs):
+        if args or kwargs:
+            return self._execute(q, *args, **kwargs)
+        return self.timed(self._execute, q, query_name)
+
+    def _execute(self, *args, **kwargs):
+        if self.c is None:
+            raise ValueError(
+                "no database connection: this inspector was loaded from a snapshot"
+            )
 
-    def execute(self, *args, **kwargs):
         result = self.c.execute(*args, **kwargs)
 
         if result is None:
@@ -1145,7 +1495,47 @@ class PostgreSQL(DBInspector):
         else:
             return result
 
+    def execute_streamed(self, q):
+        # for the largest catalog queries: when stream_results is enabled,
+        # rows are fetched from a server-side cursor fetch_size at a time
+        # rather than materialized up front
+        if not self.stream_results:
+            return self.execute(q)
+
+        return self.timed(self._execute_streamed, q)
+
+    def _execute_streamed(self, q):
+        if self.is_raw_psyco_connection:
+            return self._raw_streamed(q)
+
+        # sqlalchemy's server-side cursors can't be held open outside of a
+        # transaction, so on autocommit connections results are fetched
+        # client-side
+        if self.c.connection.connection.autocommit:
+            return self.c.execute(q)
+
+        q = q.execution_options(stream_results=True, max_row_buffer=self.fetch_size)
+        return self.c.execute(q)
+
+    def _raw_streamed(self, q):
+        self.cursors_opened += 1
+        name = "schemainspect_{}".format(self.cursors_opened)
+
+        # outside of a transaction, the cursor has to be declared "with hold"
+        # to outlive the statement declaring it
+        connection = self.c.connection
+        cursor = connection.cursor(
+            name=name, cursor_factory=type(self.c), withhold=connection.autocommit
+        )
+        cursor.itersize = self.fetch_size
+
+        with cursor:
+            cursor.execute(q)
+            yield from cursor
+
+    @timed_load
     def load_all(self):
+        self.load_database()
         self.load_schemas()
         self.load_all_relations()
         self.load_functions()
@@ -1164,11 +1554,24 @@ class PostgreSQL(DBInspector):
         self.load_deps()
         self.load_deps_all()
 
+    @timed_load
+    def load_database(self):
+        # identifies the database across inspections, so that oids from
+        # different inspections can be known to refer to the same objects
+        if self.pg_version <= 9:
+            self.database_id = None
+            return
+
+        d = list(self.execute(self.DATABASE_QUERY))[0]
+        self.database_id = "{}:{}".format(d.system_identifier, d.oid)
+
+    @timed_load
     def load_schemas(self):
         q = self.execute(self.SCHEMAS_QUERY)
-        schemas = [InspectedSchema(schema=each.schema) for each in q]
+        schemas = [InspectedSchema(schema=each.schema, oid=each.oid) for each in q]
         self.schemas = od((schema.schema, schema) for schema in schemas)
 
+    @timed_load
     def load_rlspolicies(self):
         if self.pg_version <= 9:
             self.rlspolicies = od()
@@ -1186,12 +1589,14 @@ class PostgreSQL(DBInspector):
                 roles=p.roles,
                 qual=p.qual,
                 withcheck=p.withcheck,
+                oid=p.oid,
             )
             for p in q
         ]
 
         self.rlspolicies = od((p.key, p) for p in rlspolicies)
 
+    @timed_load
     def load_collations(self):
         q = self.execute(self.COLLATIONS_QUERY)
         collations = [
@@ -1203,11 +1608,13 @@ class PostgreSQL(DBInspector):
                 lc_collate=i.lc_collate,
                 lc_ctype=i.lc_ctype,
                 version=i.version,
+                oid=i.oid,
             )
             for i in q
         ]
         self.collations = od((i.quoted_full_name, i) for i in collations)
 
+    @timed_load
     def load_privileges(self):
         q = self.execute(self.PRIVILEGES_QUERY)
         privileges = [
@@ -1222,6 +1629,7 @@ class PostgreSQL(DBInspector):
         ]
         self.privileges = od((i.key, i) for i in privileges)
 
+    @timed_load
     def load_deps(self):
         q = self.execute(self.DEPS_QUERY)
 
@@ -1274,6 +1682,7 @@ class PostgreSQL(DBInspector):
             except KeyError:
                 continue
 
+    @timed_load
     def load_deps_all(self):
         def get_related_for_item(item, att):
             related = [self.get_dependency_by_signature(_) for _ in getattr(item, att)]
@@ -1374,6 +1783,7 @@ class PostgreSQL(DBInspector):
     def tables_not_using_partitioning(self):
         return od((k, v) for k, v in self.tables.items() if not v.uses_partitioning)
 
+    @timed_load
     def load_all_relations(self):
         self.tables = od()
         self.views = od()
@@ -1383,70 +1793,90 @@ class PostgreSQL(DBInspector):
         q = self.execute(self.ENUMS_QUERY)
         enumlist = [
             InspectedEnum(
-                name=i.name,
-                schema=i.schema,
+                name=interned(i.name),
+                schema=interned(i.schema),
                 elements=i.elements,
                 pg_version=self.pg_version,
+                oid=i.oid,
             )
             for i in q
         ]
         self.enums = od((i.quoted_full_name, i) for i in enumlist)
-        q = self.execute(self.ALL_RELATIONS_QUERY)
 
-        for _, g in groupby(q, lambda x: (x.relationtype, x.schema, x.name)):
-            clist = list(g)
-            f = clist[0]
+        def get_enum(name, schema):
+            if not name and not schema:
+                return None
+
+            quoted_full_name = "{}.{}".format(
+                quoted_identifier(schema), quoted_identifier(name)
+            )
 
-            def get_enum(name, schema):
-                if not name and not schema:
-                    return None
+            return self.enums.get(quoted_full_name)
 
-                quoted_full_name = "{}.{}".format(
-                    quoted_identifier(schema), quoted_identifier(name)
-                )
+        # columns are fetched separately from the relation-level data, so the
+        # (potentially large) relation payload isn't repeated for each column
+        q = self.execute_streamed(self.ATTRIBUTES_QUERY)
 
-                return self.enums.get(quoted_full_name)
+        columns_by_oid = {}
 
+        for oid, g in groupby(q, lambda x: x.oid):
             columns = [
                 ColumnInfo(
                     name=c.attname,
-                    dbtype=c.datatype,
-                    dbtypestr=c.datatypestring,
+                    dbtype=interned(c.datatype),
+                    dbtypestr=interned(c.datatypestring),
                     pytype=self.to_pytype(c.datatype),
                     default=c.defaultdef,
+                    volatile_default=c.volatile_default,
                     not_null=c.not_null,
                     is_enum=c.is_enum,
                     enum=get_enum(c.enum_name, c.enum_schema),
-                    collation=c.collation,
+                    collation=interned(c.collation),
                     is_identity=c.is_identity,
                     is_identity_always=c.is_identity_always,
                     is_generated=c.is_generated,
                     can_drop_generated=self.pg_version >= 13,
+                    fast_default=self.pg_version >= 11,
                 )
-                for c in clist
-                if c.position_number
+                for c in g
             ]
+            columns_by_oid[oid] = od((c.name, c) for c in columns)
+
+        RELATIONTYPES = {
+            "r": "tables",
+            "v": "views",
+            "m": "materialized_views",
+            "c": "composite_types",
+            "p": "tables",
+        }
+
+        q = self.execute_streamed(self.ALL_RELATIONS_QUERY)
+
+        for f in q:
+            if self.lazy_definitions and f.relationtype in ("v", "m"):
+                definition = self.view_definitions.defer(f.oid, "definition")
+            else:
+                definition = f.definition
 
             s = InspectedSelectable(
                 name=f.name,
-                schema=f.schema,
-                columns=od((c.name, c) for c in columns),
+                schema=interned(f.schema),
+                columns=columns_by_oid.pop(f.oid, od()),
                 relationtype=f.relationtype,
-                definition=f.definition,
+                definition=definition,
                 comment=f.comment,
                 parent_table=f.parent_table,
                 partition_def=f.partition_def,
                 rowsecurity=f.rowsecurity,
                 forcerowsecurity=f.forcerowsecurity,
                 persistence=f.persistence,
+                oid=f.oid,
+                page_size_estimate=f.page_size_estimate,
+                row_count_estimate=f.row_count_estimate,
+                total_size=f.total_size,
+                toast_size=f.toast_size,
+                pg_version=self.pg_version,
             )
-            RELATIONTYPES = {
-                "r": "tables",
-                "v": "views",
-                "m": "materialized_views",
-                "c": "composite_types",
-                "p": "tables",
-            }
             att = getattr(self, RELATIONTYPES[f.relationtype])
             att[s.quoted_full_name] = s
 
@@ -1464,9 +1894,9 @@ class PostgreSQL(DBInspector):
         indexlist = [
             InspectedIndex(
                 name=i.name,
-                schema=i.schema,
+                schema=interned(i.schema),
                 definition=i.definition,
-                table_name=i.table_name,
+                table_name=interned(i.table_name),
                 key_columns=i.key_columns,
                 index_columns=i.index_columns,
                 included_columns=i.included_columns,
@@ -1481,6 +1911,9 @@ class PostgreSQL(DBInspector):
                 key_expressions=i.key_expressions,
                 partial_predicate=i.partial_predicate,
                 algorithm=i.algorithm,
+                oid=i.oid,
+                is_partitioned=i.is_partitioned,
+                page_size_estimate=i.page_size_estimate,
             )
             for i in q
         ]
@@ -1490,9 +1923,10 @@ class PostgreSQL(DBInspector):
         sequencelist = [
             InspectedSequence(
                 name=i.name,
-                schema=i.schema,
-                table_name=i.table_name,
+                schema=interned(i.schema),
+                table_name=interned(i.table_name),
                 column_name=i.column_name,
+                oid=i.oid,
             )
             for i in q
         ]
@@ -1504,14 +1938,16 @@ class PostgreSQL(DBInspector):
         for i in q:
             constraint = InspectedConstraint(
                 name=i.name,
-                schema=i.schema,
-                constraint_type=i.constraint_type,
-                table_name=i.table_name,
+                schema=interned(i.schema),
+                constraint_type=interned(i.constraint_type),
+                table_name=interned(i.table_name),
                 definition=i.definition,
                 index=getattr(i, "index"),
                 is_fk=i.is_fk,
                 is_deferrable=i.is_deferrable,
                 initially_deferred=i.initially_deferred,
+                oid=i.oid,
+                pg_version=self.pg_version,
             )
             if constraint.index:
                 index_name = quoted_identifier(constraint.index, schema=i.schema)
@@ -1532,7 +1968,9 @@ class PostgreSQL(DBInspector):
 
         q = self.execute(self.EXTENSIONS_QUERY)
         extensionlist = [
-            InspectedExtension(name=i.name, schema=i.schema, version=i.version)
+            InspectedExtension(
+                name=i.name, schema=i.schema, version=i.version, oid=i.oid
+            )
             for i in q
         ]
         # extension names are unique per-database rather than per-schema like other things (even though extensions are assigned to a particular schema)
@@ -1547,13 +1985,21 @@ class PostgreSQL(DBInspector):
             n = each.quoted_full_name
             self.relations[t].constraints[n] = each
 
+    def resolve_definitions(self):
+        # fetch any lazily loaded definitions now, while the connection is open
+        for x in self.selectables.values():
+            x.definition
+            if x.relationtype == "f":
+                x.full_definition
+
     @property
     def extensions_without_versions(self):
         return {k: v.unversioned_copy() for k, v in self.extensions.items()}
 
+    @timed_load
     def load_functions(self):
         self.functions = od()
-        q = self.execute(self.FUNCTIONS_QUERY)
+        q = self.execute_streamed(self.FUNCTIONS_QUERY)
         for _, g in groupby(q, lambda x: (x.schema, x.name, x.identity_arguments)):
             clist = list(g)
             f = clist[0]
@@ -1561,7 +2007,7 @@ class PostgreSQL(DBInspector):
             columns = [
                 ColumnInfo(
                     name=c.parameter_name,
-                    dbtype=c.data_type,
+                    dbtype=interned(c.data_type),
                     pytype=self.to_pytype(c.data_type),
                 )
                 for c in outs
@@ -1570,7 +2016,7 @@ class PostgreSQL(DBInspector):
                 columns = [
                     ColumnInfo(
                         name=c.parameter_name,
-                        dbtype=c.data_type,
+                        dbtype=interned(c.data_type),
                         pytype=self.to_pytype(c.data_type),
                     )
                     for c in outs
@@ -1579,7 +2025,7 @@ class PostgreSQL(DBInspector):
                 columns = [
                     ColumnInfo(
                         name=f.name,
-                        dbtype=f.data_type,
+                        dbtype=interned(f.data_type),
                         pytype=self.to_pytype(f.returntype),
                         default=f.parameter_default,
                     )
@@ -1587,34 +2033,46 @@ class PostgreSQL(DBInspector):
             plist = [
                 ColumnInfo(
                     name=c.parameter_name,
-                    dbtype=c.data_type,
+                    dbtype=interned(c.data_type),
                     pytype=self.to_pytype(c.data_type),
                     default=c.parameter_default,
                 )
                 for c in clist
                 if c.parameter_mode == "IN"
             ]
+
+            if self.lazy_definitions:
+                definition = self.function_definitions.defer(f.oid, "definition")
+                full_definition = self.function_definitions.defer(
+                    f.oid, "full_definition"
+                )
+            else:
+                definition = f.definition
+                full_definition = f.full_definition
+
             s = InspectedFunction(
-                schema=f.schema,
+                schema=interned(f.schema),
                 name=f.name,
                 columns=od((c.name, c) for c in columns),
                 inputs=plist,
                 identity_arguments=f.identity_arguments,
-                result_string=f.result_string,
-                language=f.language,
-                definition=f.definition,
-                strictness=f.strictness,
-                security_type=f.security_type,
-                volatility=f.volatility,
-                full_definition=f.full_definition,
+                result_string=interned(f.result_string),
+                language=interned(f.language),
+                definition=definition,
+                strictness=interned(f.strictness),
+                security_type=interned(f.security_type),
+                volatility=interned(f.volatility),
+                full_definition=full_definition,
                 comment=f.comment,
-                returntype=f.returntype,
+                returntype=interned(f.returntype),
                 kind=f.kind,
+                oid=f.oid,
             )
 
             identity_arguments = "({})".format(s.identity_arguments)
             self.functions[s.quoted_full_name + identity_arguments] = s
 
+    @timed_load
     def load_triggers(self):
         q = self.execute(self.TRIGGERS_QUERY)
         triggers = [
@@ -1626,11 +2084,13 @@ class PostgreSQL(DBInspector):
                 i.proc_name,
                 i.enabled,
                 i.full_definition,
+                oid=i.oid,
             )
             for i in q
         ]  # type: list[InspectedTrigger]
         self.triggers = od((t.signature, t) for t in triggers)
 
+    @timed_load
     def load_types(self):
         q = self.execute(self.TYPES_QUERY)
 
@@ -1638,10 +2098,12 @@ class PostgreSQL(DBInspector):
             return defn["attribute"], defn["type"]
 
         types = [
-            InspectedType(i.name, i.schema, dict(col(_) for _ in i.columns)) for i in q
+            InspectedType(i.name, i.schema, dict(col(_) for _ in i.columns), oid=i.oid)
+            for i in q
         ]  # type: list[InspectedType]
         self.types = od((t.signature, t) for t in types)
 
+    @timed_load
     def load_domains(self):
         q = self.execute(self.DOMAINS_QUERY)
 
@@ -1658,11 +2120,45 @@ class PostgreSQL(DBInspector):
                 i.not_null,
                 i.default,
                 i.check,
+                oid=i.oid,
             )
             for i in q
         ]  # type: list[InspectedType]
         self.domains = od((t.signature, t) for t in domains)
 
+    @timed_load
+    def load_stats(self):
+        """
+        Attach the cumulative statistics views' counts (scans, tuples,
+        dead tuples, vacuum and analyze times) to each table and
+        materialized view, and index scan counts and sizes to each index,
+        as an OrderedDict at their stats attribute. These are counts since
+        stats_reset. Not loaded by default: they change all the time, and
+        aren't part of the schema.
+        """
+        by_oid = {x.oid: x for x in self.relations.values()}
+
+        for row in self.execute(self.TABLE_STATS_QUERY):
+            try:
+                x = by_oid[row.oid]
+            except KeyError:
+                continue
+            x.stats = stats_from_row(row)
+
+        by_oid = {x.oid: x for x in self.indexes.values()}
+
+        for row in self.execute(self.INDEX_STATS_QUERY):
+            try:
+                x = by_oid[row.oid]
+            except KeyError:
+                continue
+            x.stats = stats_from_row(row)
+
+        self.stats_reset = None
+
+        for row in self.execute(self.STATS_RESET_QUERY):
+            self.stats_reset = row.stats_reset
+
     def filter_schema(self, schema=None, exclude_schema=None):
         if schema and exclude_schema:
             raise ValueError("Can only have schema or exclude schema, not both")
@@ -1685,50 +2181,58 @@ class PostgreSQL(DBInspector):
             filtered = {k: v for k, v in att.items() if comparator(v)}
             setattr(self, prop, filtered)
 
-    def _as_dicts(self):
+    def iter_definitions(self, include_derived=True):
+        """
+        Yield (category, key, fields) for each inspected object, serializing
+        each object only when it is reached.
+        """
+        # only inspected objects are shared (a table's indexes are also in
+        # self.indexes, say), so only they are tracked: the inspector keeps
+        # them alive, so their ids can't be reused, and everything built
+        # while serializing is freed as soon as each object is yielded
         done = set()
 
         def obj_to_d(x, k=None):
-            if id(x) in done:
-                if isinstance(x, (str, bool, int)):
-                    return x
-                elif hasattr(x, "quoted_full_name"):
-                    return x.quoted_full_name
-                return "..."
-            done.add(id(x))
-
             if isinstance(x, dict):
                 return {k: obj_to_d(v, k) for k, v in x.items()}
 
             elif isinstance(x, (ColumnInfo, Inspected)):
+                # columns are only reached through their table or function
+                if isinstance(x, Inspected):
+                    if id(x) in done:
+                        return x.quoted_full_name
+                    done.add(id(x))
 
-                def safe_getattr(x, k):
+                d = {}
+
+                for k in serialized_fields(x, include_derived):
                     try:
-                        return getattr(x, k)
+                        v = getattr(x, k)
                     except NotImplementedError:
-                        return "NOT IMPLEMENTED"
+                        v = "NOT IMPLEMENTED"
 
-                return {
-                    k: obj_to_d(safe_getattr(x, k), k)
-                    for k in dir(x)
-                    if not k.startswith("_") and not callable(safe_getattr(x, k))
-                }
+                    if not callable(v):
+                        d[k] = obj_to_d(v, k)
+                return d
             else:
                 return str(x)
 
-        d = {}
-
         for prop in PROPS.split():
             att = getattr(self, prop)
 
-            _d = {k: obj_to_d(v) for k, v in att.items()}
+            for k, v in att.items():
+                yield prop, k, obj_to_d(v)
+
+    def _as_dicts(self, include_derived=True):
+        d = {prop: {} for prop in PROPS.split()}
 
-            d[prop] = _d
+        for prop, k, fields in self.iter_definitions(include_derived):
+            d[prop][k] = fields
 
         return d
 
-    def encodeable_definition(self):
-        return self._as_dicts()
+    def encodeable_definition(self, include_derived=True):
+        return self._as_dicts(include_derived=include_derived)
 
     def as_yaml(self):
         from io import StringIO as sio
@@ -1741,12 +2245,27 @@ class PostgreSQL(DBInspector):
 
         return s.getvalue()
 
+    def dump(self, path):
+        from ..snapshot import dump
+
+        dump(self, path)
+
     def one_schema(self, schema):
         self.filter_schema(schema=schema)
 
     def exclude_schema(self, schema):
         self.filter_schema(exclude_schema=schema)
 
+    def category_hash(self, name):
+        """
+        A hash of everything in one category (eg. "tables"), that is equal
+        for two inspectors when that category is unchanged between them.
+        """
+        return combined_hash([getattr(self, name)])
+
+    def category_hashes(self):
+        return od((name, self.category_hash(name)) for name in PROPS.split())
+
     def __eq__(self, other):
         """
         :type other: PostgreSQL
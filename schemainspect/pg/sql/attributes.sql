@@ -0,0 +1,76 @@
+with extension_oids as (
+  select
+      objid
+  from
+      pg_depend d
+  WHERE
+      d.refclassid = 'pg_extension'::regclass and
+      d.classid = 'pg_class'::regclass
+), enums as (
+
+  SELECT
+    t.oid as enum_oid,
+    n.nspname as "schema",
+    t.typname as name
+  FROM pg_catalog.pg_type t
+       LEFT JOIN pg_catalog.pg_namespace n ON n.oid = t.typnamespace
+       left outer join extension_oids e
+         on t.oid = e.objid
+  WHERE
+    t.typcategory = 'E'
+    and e.objid is null
+    -- SKIP_INTERNAL and n.nspname not in ('pg_catalog', 'information_schema', 'pg_toast')
+    -- SKIP_INTERNAL and n.nspname not like 'pg_temp_%' and n.nspname not like 'pg_toast_temp_%'
+  ORDER BY 1, 2
+),
+r as (
+    select
+        c.oid as oid
+    from
+        pg_catalog.pg_class c
+        inner join pg_catalog.pg_namespace n
+          ON n.oid = c.relnamespace
+        left outer join extension_oids e
+          on c.oid = e.objid
+    where c.relkind in ('r', 'v', 'm', 'c', 'p')
+    -- SKIP_INTERNAL and e.objid is null
+    -- SKIP_INTERNAL and n.nspname not in ('pg_catalog', 'information_schema', 'pg_toast')
+    -- SKIP_INTERNAL and n.nspname not like 'pg_temp_%' and n.nspname not like 'pg_toast_temp_%'
+)
+select
+    r.oid as oid,
+    a.attnum as position_number,
+    a.attname as attname,
+    a.attnotnull as not_null,
+    a.atttypid::regtype AS datatype,
+    a.attidentity != '' as is_identity,
+    a.attidentity = 'a' as is_identity_always,
+    -- PRE_12 false as is_generated,
+    -- 12_ONLY a.attgenerated != '' as is_generated,
+    (SELECT c.collname FROM pg_catalog.pg_collation c, pg_catalog.pg_type t
+     WHERE c.oid = a.attcollation AND t.oid = a.atttypid AND a.attcollation <> t.typcollation) AS collation,
+    pg_get_expr(ad.adbin, ad.adrelid) as defaultdef,
+    -- whether the default calls a volatile function, which postgres checks
+    -- (as here, from the functions in the expression tree) to decide if
+    -- adding the column has to fill in every row
+    exists (
+      select 1
+      from regexp_matches(ad.adbin::text, '[:](funcid|opfuncid) ([0-9]+)', 'g') f
+      join pg_catalog.pg_proc p on p.oid = f[2]::oid
+      where p.provolatile = 'v'
+    ) as volatile_default,
+    format_type(atttypid, atttypmod) AS datatypestring,
+    e.enum_oid is not null as is_enum,
+    e.name as enum_name,
+    e.schema as enum_schema
+FROM
+    r
+    join pg_catalog.pg_attribute a
+        on r.oid = a.attrelid and a.attnum > 0
+    left join pg_catalog.pg_attrdef ad
+        on a.attrelid = ad.adrelid
+        and a.attnum = ad.adnum
+    left join enums e
+      on a.atttypid = e.enum_oid
+where not a.attisdropped
+order by r.oid, position_number;
@@ -1,6 +1,7 @@
 select
   collname as name,
   n.nspname as schema,
+  c.oid as oid,
   case collprovider
     when 'd' then 'database default'
     when 'i' then 'icu'
@@ -1,6 +1,7 @@
 select
   collname as name,
   n.nspname as schema,
+  c.oid as oid,
   'd' as provider,
   collencoding as encoding,
   collcollate as lc_collate,
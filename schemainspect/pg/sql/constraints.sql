@@ -74,6 +74,7 @@ select
     nspname as schema,
     conname as name,
     relname as table_name,
+    pg_constraint.oid as oid,
     pg_get_constraintdef(pg_constraint.oid) as definition,
     case contype
         when 'c' then 'CHECK'
@@ -0,0 +1,7 @@
+select
+  (select system_identifier from pg_control_system())::text as system_identifier,
+  d.oid as oid
+from
+  pg_database d
+where
+  d.datname = current_database();
@@ -9,6 +9,7 @@ with extension_oids as (
 )
 SELECT n.nspname as "schema",
        t.typname as "name",
+       t.oid as "oid",
        pg_catalog.format_type(t.typbasetype, t.typtypmod) as "data_type",
        (SELECT c.collname FROM pg_catalog.pg_collation c, pg_catalog.pg_type bt
         WHERE c.oid = t.typcollation AND bt.oid = t.typbasetype AND t.typcollation <> bt.typcollation) as "collation",
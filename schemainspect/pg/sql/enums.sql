@@ -10,6 +10,7 @@ with extension_oids as (
 SELECT
   n.nspname as "schema",
   t.typname as "name",
+  t.oid as oid,
   ARRAY(
      SELECT e.enumlabel
       FROM pg_catalog.pg_enum e
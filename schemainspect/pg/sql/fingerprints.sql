@@ -0,0 +1,235 @@
+-- one digest per schema of everything in it that drift compares (and more),
+-- with qualified references to the schema itself normalized
+with schemas as (
+  select
+      n.oid,
+      n.nspname,
+      -- qualified references to the schema itself, quoted or not
+      '(?<![[:alnum:]_"$])('
+        || regexp_replace('"' || replace(n.nspname, '"', '""') || '"', '([^[:alnum:]_])', '\\\1', 'g')
+        || '|'
+        || regexp_replace(n.nspname, '([^[:alnum:]_])', '\\\1', 'g')
+        || ')\.' as pattern
+  from
+      pg_namespace n
+  where
+      n.nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
+      and n.nspname not like 'pg_temp_%' and n.nspname not like 'pg_toast_temp_%'
+),
+objects as (
+  select
+      n.oid as namespace,
+      'schema' as kind,
+      '' as name,
+      '' as detail
+  from
+      schemas n
+
+  union all
+
+  select
+      c.relnamespace,
+      'relation',
+      c.relname,
+      row(
+        c.relkind,
+        c.relpersistence,
+        c.relrowsecurity,
+        c.relforcerowsecurity,
+        pg_get_expr(c.relpartbound, c.oid, true),
+        case when c.relkind = 'p' then pg_get_partkeydef(c.oid) end,
+        case when c.relkind in ('v', 'm') then pg_get_viewdef(c.oid) end,
+        (select
+            string_agg(quote_ident(pn.nspname) || '.' || quote_ident(p.relname), ',' order by i.inhseqno)
+          from pg_inherits i
+          join pg_class p on p.oid = i.inhparent
+          join pg_namespace pn on pn.oid = p.relnamespace
+          where i.inhrelid = c.oid),
+        (select
+            string_agg(
+              row(
+                a.attname,
+                format_type(a.atttypid, a.atttypmod),
+                a.attnotnull,
+                a.attislocal,
+                a.attidentity,
+                -- 12_ONLY a.attgenerated,
+                -- PRE_12 null,
+                pg_get_expr(ad.adbin, ad.adrelid),
+                co.collname
+              )::text,
+              ',' order by a.attnum)
+          from pg_attribute a
+          left join pg_attrdef ad on ad.adrelid = a.attrelid and ad.adnum = a.attnum
+          left join pg_collation co on co.oid = a.attcollation
+          where a.attrelid = c.oid and a.attnum > 0 and not a.attisdropped),
+        -- sequences are compared by the column that owns them
+        (select
+            quote_ident(tn.nspname) || '.' || quote_ident(t.relname) || '.' || quote_ident(a.attname)
+          from pg_depend d
+          join pg_class t on t.oid = d.refobjid
+          join pg_namespace tn on tn.oid = t.relnamespace
+          join pg_attribute a on a.attrelid = d.refobjid and a.attnum = d.refobjsubid
+          where d.classid = 'pg_class'::regclass and d.objid = c.oid
+          and d.refclassid = 'pg_class'::regclass and d.deptype in ('a', 'i')),
+        c.relacl
+      )::text
+  from
+      pg_class c
+  where
+      c.relkind in ('r', 'v', 'm', 'c', 'p', 'S')
+
+  union all
+
+  select
+      ic.relnamespace,
+      'index',
+      ic.relname,
+      row(
+        pg_get_indexdef(i.indexrelid),
+        i.indisprimary,
+        i.indisexclusion,
+        i.indisclustered,
+        i.indimmediate
+      )::text
+  from
+      pg_index i
+      join pg_class ic on ic.oid = i.indexrelid
+
+  union all
+
+  select
+      con.connamespace,
+      'constraint',
+      coalesce(t.relname, ty.typname) || '.' || con.conname,
+      row(
+        con.contype,
+        pg_get_constraintdef(con.oid),
+        con.condeferrable,
+        con.condeferred
+      )::text
+  from
+      pg_constraint con
+      left join pg_class t on t.oid = con.conrelid
+      left join pg_type ty on ty.oid = con.contypid
+
+  union all
+
+  select
+      p.pronamespace,
+      'function',
+      p.proname || '(' || pg_get_function_identity_arguments(p.oid) || ')',
+      row(
+        pg_get_function_arguments(p.oid),
+        pg_get_function_result(p.oid),
+        p.prosrc,
+        l.lanname,
+        p.provolatile,
+        p.proisstrict,
+        p.prosecdef,
+        -- 11_AND_LATER p.prokind,
+        -- 10_AND_EARLIER p.proisagg,
+        p.proconfig
+      )::text
+  from
+      pg_proc p
+      join pg_language l on l.oid = p.prolang
+
+  union all
+
+  select
+      t.typnamespace,
+      'type',
+      t.typname,
+      row(
+        t.typtype,
+        format_type(t.typbasetype, t.typtypmod),
+        t.typdefault,
+        t.typnotnull,
+        co.collname,
+        array(select e.enumlabel from pg_enum e where e.enumtypid = t.oid order by e.enumsortorder)
+      )::text
+  from
+      pg_type t
+      left join pg_collation co on co.oid = t.typcollation
+  where
+      t.typtype in ('d', 'e')
+
+  union all
+
+  select
+      tc.relnamespace,
+      'trigger',
+      tc.relname || '.' || tg.tgname,
+      row(
+        pg_get_triggerdef(tg.oid),
+        tg.tgenabled
+      )::text
+  from
+      pg_trigger tg
+      join pg_class tc on tc.oid = tg.tgrelid
+  where
+      not tg.tgisinternal
+
+  union all
+
+  select
+      pc.relnamespace,
+      'policy',
+      pc.relname || '.' || pol.polname,
+      row(
+        pol.polcmd,
+        pol.polpermissive,
+        array(select pg_get_userbyid(r) from unnest(pol.polroles) r order by 1),
+        pg_get_expr(pol.polqual, pol.polrelid),
+        pg_get_expr(pol.polwithcheck, pol.polrelid)
+      )::text
+  from
+      pg_policy pol
+      join pg_class pc on pc.oid = pol.polrelid
+
+  union all
+
+  select
+      co.collnamespace,
+      'collation',
+      co.collname,
+      row(
+        co.collprovider,
+        co.collcollate,
+        co.collctype,
+        -- the locale of icu collations, which has moved between versions
+        to_jsonb(co) ->> 'colliculocale',
+        to_jsonb(co) ->> 'colllocale'
+      )::text
+  from
+      pg_collation co
+
+  union all
+
+  select
+      e.extnamespace,
+      'extension',
+      e.extname,
+      e.extversion
+  from
+      pg_extension e
+)
+select
+    n.nspname as schema,
+    md5(string_agg(x.line, E'\n' order by x.line)) as fingerprint
+from
+    schemas n
+    cross join lateral (
+      select
+          regexp_replace(
+            o.kind || ' ' || o.name || ' ' || coalesce(o.detail, ''),
+            n.pattern, '{schema}.', 'g'
+          ) as line
+      from
+          objects o
+      where
+          o.namespace = n.oid
+    ) x
+group by n.nspname
+order by n.nspname;
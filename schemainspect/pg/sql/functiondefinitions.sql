@@ -0,0 +1,10 @@
+select
+    p.oid as oid,
+    case when pg_has_role(p.proowner, 'USAGE'::text) then
+      p.prosrc
+    else null end
+      as definition,
+    pg_get_functiondef(p.oid) as full_definition
+from
+    pg_catalog.pg_proc p
+where p.oid = any('{OIDS}'::oid[]);
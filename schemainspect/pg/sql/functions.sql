@@ -196,8 +196,10 @@ unnested as (
             p.parameter_mode as parameter_mode,
             p.parameter_default as parameter_default,
             p.position_number as position_number,
-            p.definition as definition,
-            pg_get_functiondef(p.oid) as full_definition,
+            -- EAGER_DEFINITIONS p.definition as definition,
+            -- EAGER_DEFINITIONS pg_get_functiondef(p.oid) as full_definition,
+            -- LAZY_DEFINITIONS null as definition,
+            -- LAZY_DEFINITIONS null as full_definition,
             p.external_language as language,
             p.strictness as strictness,
             p.security_type as security_type,
@@ -49,7 +49,9 @@ extension_relations as (
        indcollation key_collations,
        pg_get_expr(indexprs, indrelid) key_expressions,
        pg_get_expr(indpred, indrelid) partial_predicate,
-       amname algorithm
+       amname algorithm,
+       i.relkind = 'I' is_partitioned,
+       i.relpages page_size_estimate
   FROM pg_index x
     JOIN pg_class c ON c.oid = x.indrelid
     JOIN pg_class i ON i.oid = x.indexrelid
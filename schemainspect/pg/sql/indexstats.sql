@@ -0,0 +1,8 @@
+select
+  indexrelid as oid,
+  idx_scan,
+  idx_tup_read,
+  idx_tup_fetch,
+  pg_relation_size(indexrelid) as size
+from
+  pg_stat_user_indexes;
@@ -6,22 +6,6 @@ with extension_oids as (
   WHERE
       d.refclassid = 'pg_extension'::regclass and
       d.classid = 'pg_class'::regclass
-), enums as (
-
-  SELECT
-    t.oid as enum_oid,
-    n.nspname as "schema",
-    t.typname as name
-  FROM pg_catalog.pg_type t
-       LEFT JOIN pg_catalog.pg_namespace n ON n.oid = t.typnamespace
-       left outer join extension_oids e
-         on t.oid = e.objid
-  WHERE
-    t.typcategory = 'E'
-    and e.objid is null
-    -- SKIP_INTERNAL and n.nspname not in ('pg_catalog', 'information_schema', 'pg_toast')
-    -- SKIP_INTERNAL and n.nspname not like 'pg_temp_%' and n.nspname not like 'pg_toast_temp_%'
-  ORDER BY 1, 2
 ),
 r as (
     select
@@ -29,10 +13,8 @@ r as (
         n.nspname as schema,
         c.relkind as relationtype,
         c.oid as oid,
-        case when c.relkind in ('m', 'v') then
-          pg_get_viewdef(c.oid)
-        else null end
-          as definition,
+        -- EAGER_DEFINITIONS case when c.relkind in ('m', 'v') then pg_get_viewdef(c.oid) else null end as definition,
+        -- LAZY_DEFINITIONS null as definition,
         (SELECT
               '"' || nmsp_parent.nspname || '"."' || parent.relname || '"' as parent
           FROM pg_inherits
@@ -52,7 +34,11 @@ r as (
         c.relforcerowsecurity::boolean as forcerowsecurity,
         c.relpersistence as persistence,
         c.relpages as page_size_estimate,
-        c.reltuples as row_count_estimate
+        c.reltuples as row_count_estimate,
+        -- RELATION_SIZES case when c.relkind in ('r', 'm') then pg_total_relation_size(c.oid) end as total_size,
+        -- RELATION_SIZES case when c.reltoastrelid <> 0 then pg_total_relation_size(c.reltoastrelid) end as toast_size
+        -- NO_RELATION_SIZES null::bigint as total_size,
+        -- NO_RELATION_SIZES null::bigint as toast_size
     from
         pg_catalog.pg_class c
         inner join pg_catalog.pg_namespace n
@@ -68,23 +54,8 @@ select
     r.relationtype,
     r.schema,
     r.name,
-    r.definition as definition,
-    a.attnum as position_number,
-    a.attname as attname,
-    a.attnotnull as not_null,
-    a.atttypid::regtype AS datatype,
-    a.attidentity != '' as is_identity,
-    a.attidentity = 'a' as is_identity_always,
-    -- PRE_12 false as is_generated,
-    -- 12_ONLY a.attgenerated != '' as is_generated,
-    (SELECT c.collname FROM pg_catalog.pg_collation c, pg_catalog.pg_type t
-     WHERE c.oid = a.attcollation AND t.oid = a.atttypid AND a.attcollation <> t.typcollation) AS collation,
-    pg_get_expr(ad.adbin, ad.adrelid) as defaultdef,
-    r.oid as oid,
-    format_type(atttypid, atttypmod) AS datatypestring,
-    e.enum_oid is not null as is_enum,
-    e.name as enum_name,
-    e.schema as enum_schema,
+    r.oid,
+    r.definition,
     pg_catalog.obj_description(r.oid) as comment,
     r.parent_table,
     r.partition_def,
@@ -92,17 +63,9 @@ select
     r.forcerowsecurity,
     r.persistence,
     r.page_size_estimate,
-    r.row_count_estimate
+    r.row_count_estimate,
+    r.total_size,
+    r.toast_size
 FROM
     r
-    left join pg_catalog.pg_attribute a
-        on r.oid = a.attrelid and a.attnum > 0
-    left join pg_catalog.pg_attrdef ad
-        on a.attrelid = ad.adrelid
-        and a.attnum = ad.adnum
-    left join enums e
-      on a.atttypid = e.enum_oid
-where a.attisdropped is not true
--- SKIP_INTERNAL and r.schema not in ('pg_catalog', 'information_schema', 'pg_toast')
--- SKIP_INTERNAL and r.schema not like 'pg_temp_%' and r.schema not like 'pg_toast_temp_%'
-order by relationtype, r.schema, r.name, position_number;
+order by relationtype, r.schema, r.name;
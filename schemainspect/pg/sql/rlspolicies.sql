@@ -2,6 +2,7 @@ select
   p.polname as name,
   n.nspname as schema,
   c.relname as table_name,
+  p.oid as oid,
   p.polcmd as commandtype,
   p.polpermissive as permissive,
   (
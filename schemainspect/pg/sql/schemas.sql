@@ -7,7 +7,8 @@ with extension_oids as (
       d.refclassid = 'pg_extension'::regclass
       and d.classid = 'pg_namespace'::regclass
 ) select
-    nspname as schema
+    nspname as schema,
+    pg_namespace.oid as oid
 from
     pg_catalog.pg_namespace
     left outer join extension_oids e
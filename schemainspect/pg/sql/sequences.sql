@@ -11,6 +11,7 @@ extension_objids as (
     select
         n.nspname as schema,
         c.relname as name,
+        c.oid as oid,
         c_ref.relname as table_name,
         a.attname as column_name,
         --a.attname is not null as has_table_owner,
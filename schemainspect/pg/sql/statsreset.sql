@@ -0,0 +1,6 @@
+select
+  stats_reset
+from
+  pg_stat_database
+where
+  datname = current_database();
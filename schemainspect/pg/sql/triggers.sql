@@ -11,6 +11,7 @@ select
     tg.tgname "name",
     nsp.nspname "schema",
     cls.relname table_name,
+    tg.oid as oid,
     pg_get_triggerdef(tg.oid) full_definition,
     proc.proname proc_name,
     nspp.nspname proc_schema,
@@ -12,6 +12,7 @@ SELECT
   n.nspname AS schema,
   pg_catalog.format_type (t.oid, NULL) AS name,
   t.typname AS internal_name,
+  t.oid AS oid,
   CASE
     WHEN t.typrelid != 0
       THEN CAST ( 'tuple' AS pg_catalog.text )
@@ -0,0 +1,6 @@
+select
+    c.oid as oid,
+    pg_get_viewdef(c.oid) as definition
+from
+    pg_catalog.pg_class c
+where c.oid = any('{OIDS}'::oid[]);
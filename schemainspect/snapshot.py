@@ -0,0 +1,398 @@
+import importlib
+import mmap
+import struct
+from collections import OrderedDict as od
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy.types import TypeEngine
+
+from .inspected import ColumnInfo, Deferred, Inspected
+from .misc import interned, row_as_dict
+from .pg import PostgreSQL
+
+MAGIC = b"SCHEMAINSPECT"
+HEADER = struct.Struct(">{}sH".format(len(MAGIC)))
+FORMAT_VERSION = 2
+
+# the header is followed by the offset and length of the msgpack metadata
+# (settings, categories, class and layout names), the offset of the object
+# table, and the number of objects
+INDEX = struct.Struct(">QQQQ")
+
+# one per object: offset and length of its packed attribute values, class
+# and layout numbers
+ENTRY = struct.Struct(">QLHH")
+
+# inspector attributes that hold inspected objects
+CATEGORIES = """schemas tables views materialized_views composite_types relations enums
+indexes sequences constraints extensions functions selectables privileges triggers
+collations rlspolicies types domains""".split()
+
+SETTINGS = """pg_version include_internal database_id relation_sizes
+stats_reset""".split()
+
+EXT_REF = 1
+EXT_TUPLE = 2
+EXT_ODICT = 3
+EXT_TYPE = 4
+EXT_DATETIME = 5
+
+
+def qualified_name(cls):
+    return "{}:{}".format(cls.__module__, cls.__qualname__)
+
+
+def class_from_name(name):
+    module_name, qualname = name.split(":")
+
+    x = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        x = getattr(x, part)
+    return x
+
+
+# the python types of columns (see to_pytype): those of sqlalchemy's
+# postgres types, or otherwise the sqlalchemy type itself
+PYTYPES = {
+    qualified_name(x): x
+    for x in [
+        type(None),
+        bool,
+        bytes,
+        date,
+        datetime,
+        Decimal,
+        dict,
+        float,
+        int,
+        list,
+        str,
+        time,
+        timedelta,
+        UUID,
+    ]
+}
+
+
+def checked_type(name):
+    try:
+        return PYTYPES[name]
+    except KeyError:
+        pass
+
+    if name.startswith("sqlalchemy."):
+        x = class_from_name(name)
+        if isinstance(x, type) and issubclass(x, TypeEngine):
+            return x
+    raise ValueError("unexpected type in snapshot: {}".format(name))
+
+
+def inspected_state(x):
+    return {
+        k: v.resolve() if isinstance(v, Deferred) else v
+        for k, v in x.__dict__.items()
+        if not k.startswith("_cached_")
+    }
+
+
+class Encoder(object):
+    def __init__(self):
+        import msgpack
+
+        self.msgpack = msgpack
+        self.objects = []
+        self.refs = {}
+        # class names and attribute name lists are stored once each, and
+        # referred to by position from each object
+        self.classes = {}
+        self.layouts = {}
+
+    def packb(self, x):
+        return self.msgpack.packb(x, default=self.default, strict_types=True)
+
+    def ref(self, x):
+        try:
+            return self.refs[id(x)]
+        except KeyError:
+            pass
+
+        n = self.refs[id(x)] = len(self.objects)
+        entry = [self.position(self.classes, qualified_name(type(x))), None, None]
+        self.objects.append(entry)
+
+        state = inspected_state(x)
+        entry[1] = self.position(self.layouts, tuple(state))
+        entry[2] = self.packb(list(state.values()))
+        return n
+
+    def position(self, table, value):
+        try:
+            return table[value]
+        except KeyError:
+            n = table[value] = len(table)
+            return n
+
+    def default(self, x):
+        ExtType = self.msgpack.ExtType
+
+        if isinstance(x, (Inspected, ColumnInfo)):
+            return ExtType(EXT_REF, self.packb(self.ref(x)))
+        elif isinstance(x, tuple):
+            return ExtType(EXT_TUPLE, self.packb(list(x)))
+        elif isinstance(x, od):
+            return ExtType(EXT_ODICT, self.packb([[k, v] for k, v in x.items()]))
+        elif isinstance(x, type):
+            name = qualified_name(x)
+            # fail now rather than when loading
+            checked_type(name)
+            return ExtType(EXT_TYPE, self.packb(name))
+        elif isinstance(x, datetime):
+            return ExtType(EXT_DATETIME, self.packb(x.isoformat()))
+        elif isinstance(x, str):
+            return str(x)
+        elif isinstance(x, Deferred):
+            return x.resolve()
+        raise TypeError("cannot snapshot {!r}".format(x))
+
+
+LAZY = "_snapshot_position"
+
+
+class Reader(object):
+    """
+    Decodes objects from a snapshot buffer. If lazy, objects start out as
+    empty placeholders that decode themselves from the buffer the first
+    time they are used, and then become ordinary instances of their class.
+    """
+
+    def __init__(self, buffer, lazy=False):
+        import msgpack
+
+        self.msgpack = msgpack
+        self.buffer = memoryview(buffer)
+        read_header(self.buffer)
+
+        meta_offset, meta_length, self.table_offset, count = INDEX.unpack_from(
+            self.buffer, HEADER.size
+        )
+        self.meta = self.unpackb(self.chunk(meta_offset, meta_length))
+        self.classes = [self.checked_class(name) for name in self.meta["classes"]]
+        self.layouts = [tuple(map(interned, x)) for x in self.meta["layouts"]]
+        self.decoded = [None] * count
+
+        if lazy:
+            self.placeholders = [self.placeholder_class(c) for c in self.classes]
+        else:
+            self.placeholders = None
+
+    def checked_class(self, name):
+        if not name.startswith("schemainspect."):
+            raise ValueError("unexpected class in snapshot: {}".format(name))
+        return class_from_name(name)
+
+    def placeholder_class(self, cls):
+        reader = self
+
+        def __getattribute__(x, name):
+            reader.fill(x)
+            return getattr(x, name)
+
+        def __setattr__(x, name, value):
+            reader.fill(x)
+            setattr(x, name, value)
+
+        def __delattr__(x, name):
+            reader.fill(x)
+            delattr(x, name)
+
+        # a subclass's comparison methods take priority over the other
+        # operand's, so this also covers comparing a decoded object with
+        # one still waiting to be decoded
+        def __eq__(x, other):
+            reader.fill(x)
+            return x == other
+
+        def __ne__(x, other):
+            return not __eq__(x, other)
+
+        return type(
+            cls.__name__,
+            (cls,),
+            dict(
+                __module__=cls.__module__,
+                __qualname__=cls.__qualname__,
+                __getattribute__=__getattribute__,
+                __setattr__=__setattr__,
+                __delattr__=__delattr__,
+                __eq__=__eq__,
+                __ne__=__ne__,
+                __hash__=None,
+            ),
+        )
+
+    def chunk(self, offset, length):
+        # slicing a memoryview doesn't copy
+        return self.buffer[offset:][:length]
+
+    def entry(self, n):
+        return ENTRY.unpack_from(self.buffer, self.table_offset + n * ENTRY.size)
+
+    def unpackb(self, data):
+        return self.msgpack.unpackb(data, ext_hook=self.ext_hook, strict_map_key=False)
+
+    def ext_hook(self, code, data):
+        if code == EXT_REF:
+            return self.get(self.unpackb(data))
+        elif code == EXT_TUPLE:
+            return tuple(self.unpackb(data))
+        elif code == EXT_ODICT:
+            return od((k, v) for k, v in self.unpackb(data))
+        elif code == EXT_TYPE:
+            return checked_type(self.unpackb(data))
+        elif code == EXT_DATETIME:
+            return datetime.fromisoformat(self.unpackb(data))
+        return self.msgpack.ExtType(code, data)
+
+    def get(self, n):
+        x = self.decoded[n]
+
+        if x is None:
+            class_n = self.entry(n)[2]
+
+            if self.placeholders:
+                cls = self.placeholders[class_n]
+                x = self.decoded[n] = cls.__new__(cls)
+                object.__getattribute__(x, "__dict__")[LAZY] = n
+            else:
+                cls = self.classes[class_n]
+                x = self.decoded[n] = cls.__new__(cls)
+                self.decode(x, n)
+        return x
+
+    def fill(self, x):
+        state = object.__getattribute__(x, "__dict__")
+        n = state.pop(LAZY, None)
+
+        if n is not None:
+            object.__setattr__(x, "__class__", self.classes[self.entry(n)[2]])
+            self.decode(x, n)
+
+    def decode(self, x, n):
+        offset, length, _, layout_n = self.entry(n)
+        values = self.unpackb(self.chunk(offset, length))
+        x.__dict__.update(zip(self.layouts[layout_n], map(interned, values)))
+
+    def inspector(self):
+        meta = self.meta
+
+        settings = meta["settings"]
+
+        # set up like a live inspector, but with no connection to run the
+        # catalog queries on
+        i = PostgreSQL.__new__(PostgreSQL)
+        i.c = None
+        i.engine = None
+        i.dialect = "postgresql"
+        i.is_raw_psyco_connection = False
+        i.set_up(
+            settings["pg_version"],
+            include_internal=settings["include_internal"],
+            relation_sizes=settings["relation_sizes"],
+        )
+
+        for k, v in settings.items():
+            setattr(i, k, v)
+
+        for name, data in meta["categories"].items():
+            setattr(i, name, self.unpackb(data))
+
+        deps = meta["deps"]
+
+        if deps:
+            Dependency = namedtuple("Dependency", list(deps[0]))
+            deps = [Dependency(**d) for d in deps]
+
+        i.deps = deps
+        return i
+
+
+def dump(inspector, path):
+    """
+    Write a snapshot of an inspector to path, from which an equivalent
+    inspector can be rebuilt with load(), without a database connection.
+    """
+    encoder = Encoder()
+
+    categories = {
+        name: encoder.packb(getattr(inspector, name))
+        for name in CATEGORIES
+        if hasattr(inspector, name)
+    }
+
+    meta = dict(
+        settings={k: getattr(inspector, k, None) for k in SETTINGS},
+        categories=categories,
+        deps=[row_as_dict(row) for row in getattr(inspector, "deps", [])],
+        classes=list(encoder.classes),
+        layouts=[list(layout) for layout in encoder.layouts],
+    )
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        f.write(INDEX.pack(0, 0, 0, 0))
+
+        table = []
+
+        for class_n, layout_n, values in encoder.objects:
+            table.append(ENTRY.pack(f.tell(), len(values), class_n, layout_n))
+            f.write(values)
+
+        table_offset = f.tell()
+        f.write(b"".join(table))
+
+        meta_offset = f.tell()
+        meta_length = f.write(encoder.packb(meta))
+
+        f.seek(HEADER.size)
+        f.write(INDEX.pack(meta_offset, meta_length, table_offset, len(table)))
+
+
+def read_header(buffer):
+    try:
+        magic, version = HEADER.unpack_from(buffer)
+    except struct.error:
+        magic, version = None, None
+
+    if magic != MAGIC:
+        raise ValueError("not a schemainspect snapshot")
+
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            "unsupported snapshot version: {} (expected {})".format(
+                version, FORMAT_VERSION
+            )
+        )
+
+
+def load(path, lazy=False):
+    """
+    Rebuild an inspector from a snapshot written by dump().
+
+    With lazy=True, the file is memory-mapped rather than read, and each
+    inspected object is only decoded the first time it is used. Processes
+    forked after loading share the mapped file, so this suits running many
+    workers against the same large snapshot.
+    """
+    with open(path, "rb") as f:
+        if lazy:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                buffer = b""
+        else:
+            buffer = f.read()
+
+    return Reader(buffer, lazy=lazy).inspector()
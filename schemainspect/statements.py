@@ -0,0 +1,297 @@
+import re
+from collections import OrderedDict as od
+
+# what running a statement does to the table it alters
+CATALOG = "catalog"  # only the system catalogs are changed
+SCAN = "scan"  # the whole table is read (to validate, or to rebuild indexes)
+REWRITE = "rewrite"  # the whole table and its indexes are rewritten
+
+EFFECTS = [CATALOG, SCAN, REWRITE]
+
+# postgres's table-level lock modes, weakest first
+ACCESS_SHARE = "ACCESS SHARE"
+ROW_SHARE = "ROW SHARE"
+ROW_EXCLUSIVE = "ROW EXCLUSIVE"
+SHARE_UPDATE_EXCLUSIVE = "SHARE UPDATE EXCLUSIVE"
+SHARE = "SHARE"
+SHARE_ROW_EXCLUSIVE = "SHARE ROW EXCLUSIVE"
+EXCLUSIVE = "EXCLUSIVE"
+ACCESS_EXCLUSIVE = "ACCESS EXCLUSIVE"
+
+LOCK_MODES = [
+    ACCESS_SHARE,
+    ROW_SHARE,
+    ROW_EXCLUSIVE,
+    SHARE_UPDATE_EXCLUSIVE,
+    SHARE,
+    SHARE_ROW_EXCLUSIVE,
+    EXCLUSIVE,
+    ACCESS_EXCLUSIVE,
+]
+
+
+class Statement(str):
+    """
+    A generated statement or clause: a plain string of SQL, which also
+    carries what running it does to the table it alters (effect, one of
+    CATALOG, SCAN or REWRITE), and once known, that table and its row and
+    page estimates.
+
+    It also carries the table-level locks it takes (locks, a tuple of
+    (relation, lock mode) pairs, relations being quoted full names), so that
+    statements can be batched by relation. Statements on objects that
+    aren't relations (functions, types, schemas...) take no such locks.
+
+    Formatting or concatenating a Statement gives a plain string, so
+    annotations are carried over explicitly, with annotated().
+    """
+
+    effect = None
+    table = None
+    rows = None
+    pages = None
+    locks = ()
+
+    def __new__(cls, text, effect=None, table=None, rows=None, pages=None, locks=()):
+        x = super(Statement, cls).__new__(cls, text)
+        x.effect = effect
+        x.table = table
+        x.rows = rows
+        x.pages = pages
+        x.locks = tuple(locks)
+        return x
+
+    def annotated(self, text):
+        """
+        A new Statement of text, with the same annotations as this one.
+        """
+        return Statement(
+            text, self.effect, self.table, self.rows, self.pages, self.locks
+        )
+
+    def locking(self, mode, *relations):
+        """
+        This statement, also taking a lock of mode on each of relations.
+        """
+        locks = self.locks + tuple((r, mode) for r in relations)
+        return Statement(self, self.effect, self.table, self.rows, self.pages, locks)
+
+    def estimated(self, selectable):
+        """
+        This statement, with the table and estimates of the selectable it
+        alters.
+        """
+        return Statement(
+            self,
+            self.effect,
+            selectable.quoted_full_name,
+            getattr(selectable, "row_count_estimate", None),
+            getattr(selectable, "page_size_estimate", None),
+            self.locks,
+        )
+
+    @property
+    def lock(self):
+        """
+        The strongest lock mode this statement takes (None if it takes none).
+        """
+        return strongest_lock(mode for _, mode in self.locks)
+
+    @property
+    def relations(self):
+        return list(od((r, None) for r, _ in self.locks))
+
+    def lock_on(self, relation):
+        return strongest_lock(mode for r, mode in self.locks if r == relation)
+
+    @property
+    def blocks_reads(self):
+        return self.lock == ACCESS_EXCLUSIVE
+
+    @property
+    def blocks_writes(self):
+        # every mode from SHARE up conflicts with the ROW EXCLUSIVE lock
+        # that inserts, updates and deletes take
+        return self.lock is not None and LOCK_MODES.index(
+            self.lock
+        ) >= LOCK_MODES.index(SHARE)
+
+    @property
+    def rewrites(self):
+        return self.effect == REWRITE
+
+    @property
+    def scans(self):
+        return self.effect in (SCAN, REWRITE)
+
+
+def strongest_lock(modes):
+    return max(modes, key=LOCK_MODES.index, default=None)
+
+
+def effect_of(x):
+    return getattr(x, "effect", None)
+
+
+def worst_effect(effects):
+    """
+    The most disruptive of some effects (None if unknown).
+    """
+    effects = list(effects)
+
+    if None in effects:
+        return None
+    return max(effects, key=EFFECTS.index, default=CATALOG)
+
+
+# types whose values can be reinterpreted as another type without any
+# conversion, so that changing a column's type between them is catalog-only
+BINARY_COERCIBLE = {
+    ("character varying", "text"),
+    ("text", "character varying"),
+    ("cidr", "inet"),
+    ("xml", "text"),
+    ("xml", "character varying"),
+}
+
+# types whose type modifiers (lengths, precisions) can be relaxed without
+# a rewrite
+RELAXABLE = {
+    "character varying",
+    "bit varying",
+    "numeric",
+    "timestamp without time zone",
+    "timestamp with time zone",
+    "time without time zone",
+    "time with time zone",
+    "interval",
+}
+
+TYPE_MODIFIERS = re.compile(r"\(([^)]*)\)")
+
+TYPE_ALIASES = {
+    "varchar": "character varying",
+    "char": "character",
+    "varbit": "bit varying",
+    "decimal": "numeric",
+    "timestamp": "timestamp without time zone",
+    "timestamptz": "timestamp with time zone",
+    "time": "time without time zone",
+    "timetz": "time with time zone",
+}
+
+
+def parsed_type(dbtypestr):
+    """
+    The base type, list of type modifiers (or None) and array dimensions of
+    a formatted type such as "timestamp(3) without time zone".
+    """
+    s = dbtypestr.strip()
+    dimensions = 0
+
+    while s.endswith("[]"):
+        s = s[:-2]
+        dimensions += 1
+
+    m = TYPE_MODIFIERS.search(s)
+    modifiers = None
+
+    if m:
+        modifiers = [int(x) for x in m.group(1).split(",") if x.strip().isdigit()]
+        s = " ".join(TYPE_MODIFIERS.sub(" ", s, count=1).split())
+    return TYPE_ALIASES.get(s, s), modifiers, dimensions
+
+
+def relaxed(base, old, new):
+    """
+    Whether changing the modifiers of base from old to new only accepts
+    more values, so that existing values needn't be checked or converted.
+    """
+    if new is None:
+        return True
+    if old is None or len(old) != len(new):
+        return False
+
+    if base == "numeric" and len(new) == 2:
+        # the scale can't change without converting every value
+        return new[1] == old[1] and new[0] >= old[0]
+    return all(n >= o for n, o in zip(new, old))
+
+
+def type_change_effect(old, new):
+    """
+    What changing a column's type from old to new (formatted types, like
+    ColumnInfo.dbtypestr) does to its table: CATALOG if every old value is
+    a valid new value as it is, otherwise REWRITE. Changes that are only
+    catalog-only under some settings (timestamp to timestamptz, when the
+    time zone is UTC) count as rewrites.
+    """
+    if old == new:
+        return CATALOG
+
+    old_base, old_modifiers, old_dimensions = parsed_type(old)
+    new_base, new_modifiers, new_dimensions = parsed_type(new)
+
+    # changing the elements of an array type converts every array
+    if old_dimensions or new_dimensions:
+        return REWRITE
+
+    if old_base == new_base:
+        if old_base in RELAXABLE and relaxed(old_base, old_modifiers, new_modifiers):
+            return CATALOG
+        return REWRITE
+
+    if (old_base, new_base) in BINARY_COERCIBLE and new_modifiers is None:
+        return CATALOG
+    return REWRITE
+
+
+# functions (and function-like syntax) known not to be volatile, so that
+# a default calling them has the same value for every existing row
+NONVOLATILE_FUNCTIONS = {
+    "coalesce",
+    "current_setting",
+    "current_timestamp",
+    "greatest",
+    "least",
+    "localtimestamp",
+    "lower",
+    "now",
+    "nullif",
+    "row",
+    "statement_timestamp",
+    "transaction_timestamp",
+    "upper",
+}
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+# the type a value is cast to, with any modifiers, which look like a call
+CAST = re.compile(
+    r"::\s*[\w.\"]+(?:\s+(?:varying|precision|with|without|time|zone))*"
+    r"(?:\(\s*\d+(?:\s*,\s*\d+)?\s*\))?"
+)
+
+FUNCTION_CALL = re.compile(r'(?:([\w$]+|"[^"]+")\.)?([\w$]+|"[^"]+")\s*\(')
+
+
+def is_volatile_default(default):
+    """
+    Whether a default expression might call a volatile function, so that
+    adding a column with it rewrites the table.
+
+    Only used when the catalog hasn't said (the inspector looks up the
+    volatility of the functions a default calls), so any call that isn't
+    to a builtin known to be stable or immutable counts as volatile.
+    """
+    if not default:
+        return False
+
+    expression = CAST.sub("", STRING_LITERAL.sub("''", default))
+
+    for schema, name in FUNCTION_CALL.findall(expression):
+        if schema not in ("", "pg_catalog"):
+            return True
+        if name.lower() not in NONVOLATILE_FUNCTIONS:
+            return True
+    return False
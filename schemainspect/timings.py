@@ -0,0 +1,150 @@
+from collections import namedtuple
+from functools import wraps
+from time import perf_counter
+
+
+class Timing(namedtuple("Timing", "kind name seconds rows bytes construction_seconds")):
+    """
+    One timed catalog query or loader.
+
+    For a query (kind "query"), seconds covers executing it and fetching
+    every row, and bytes is the total size of the text and binary values
+    fetched (other values count as 8 bytes each), as an estimate of the
+    payload.
+
+    For a loader (kind "load"), seconds covers the whole load_* call, and
+    construction_seconds is the part of that spent in Python building
+    inspected objects, rather than waiting on the queries it ran.
+    """
+
+    __slots__ = ()
+
+
+def value_size(x):
+    if isinstance(x, (str, bytes)):
+        return len(x)
+    elif isinstance(x, (list, tuple)):
+        return sum(value_size(v) for v in x)
+    return 8
+
+
+class TimedResult(object):
+    """
+    A query's result (a sqlalchemy result, or the rows from a raw cursor),
+    timing each fetch, and reporting the query to the inspector's hooks
+    once every row has been read. It can be iterated over or fetched from
+    like the result itself, and anything else (rowcount, keys()...) is
+    passed through to it.
+    """
+
+    def __init__(self, result, inspector, name, seconds):
+        self.result = result
+        self.rows = iter(result)
+        self.inspector = inspector
+        self.name = name
+        self.seconds = seconds
+        self.count = 0
+        self.size = 0
+        self.reported = False
+
+    def __getattr__(self, name):
+        return getattr(self.result, name)
+
+    def fetchone(self):
+        started = perf_counter()
+        row = next(self.rows, None)
+        self.seconds += perf_counter() - started
+
+        if row is None:
+            self.report()
+        else:
+            self.count += 1
+            self.size += value_size(tuple(row))
+        return row
+
+    def fetchmany(self, size=1):
+        rows = []
+
+        while len(rows) < size:
+            row = self.fetchone()
+
+            if row is None:
+                break
+            rows.append(row)
+        return rows
+
+    def fetchall(self):
+        return list(self)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+
+            if row is None:
+                return
+            yield row
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+
+        self.inspector.query_seconds += self.seconds
+        self.inspector.notify(
+            Timing("query", self.name, self.seconds, self.count, self.size, None)
+        )
+
+
+def timed_load(f):
+    """
+    Report a load_* method's timings to the inspector's hooks, if it has any.
+    """
+    name = f.__name__
+
+    @wraps(f)
+    def load(self, *args, **kwargs):
+        if not self.hooks:
+            return f(self, *args, **kwargs)
+
+        started = perf_counter()
+        query_seconds = self.query_seconds
+
+        result = f(self, *args, **kwargs)
+
+        seconds = perf_counter() - started
+        construction_seconds = seconds - (self.query_seconds - query_seconds)
+        self.notify(Timing("load", name, seconds, None, None, construction_seconds))
+        return result
+
+    return load
+
+
+class Timings(list):
+    """
+    A hook that collects every Timing reported to it:
+
+        timings = Timings()
+        i = get_inspector(s, hooks=[timings])
+        print(timings.report())
+    """
+
+    def __call__(self, timing):
+        self.append(timing)
+
+    def report(self):
+        from .tableformat import t
+
+        rows = [
+            dict(
+                kind=x.kind,
+                name=x.name,
+                ms="{:.1f}".format(x.seconds * 1000),
+                rows="" if x.rows is None else str(x.rows),
+                bytes="" if x.bytes is None else str(x.bytes),
+                construction_ms=""
+                if x.construction_seconds is None
+                else "{:.1f}".format(x.construction_seconds * 1000),
+            )
+            for x in self
+        ]
+        return t(rows)
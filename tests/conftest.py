@@ -1,6 +1,10 @@
+import os
+
 import pytest
 from sqlbag import temporary_database
 
+PERF_BASELINE = os.path.join(os.path.dirname(__file__), "perf_baseline.json")
+
 
 @pytest.fixture()
 def db():
@@ -12,10 +16,26 @@ def pytest_addoption(parser):
     parser.addoption(
         "--timescale", action="store_true", help="Test with Timescale extension"
     )
+    parser.addoption(
+        "--perf",
+        action="store_true",
+        help="Check performance against the stored baseline",
+    )
+    parser.addoption(
+        "--update-perf-baseline",
+        action="store_true",
+        help="Store the performance measured as the new baseline",
+    )
+    parser.addoption(
+        "--update-replay-catalog",
+        action="store_true",
+        help="Record the catalog replayed without a database again",
+    )
 
 
 def pytest_configure(config):
     config.addinivalue_line("markers", "timescale: mark timescale specific tests")
+    config.addinivalue_line("markers", "perf: mark performance regression checks")
 
 
 def pytest_collection_modifyitems(config, items):
@@ -25,3 +45,45 @@ def pytest_collection_modifyitems(config, items):
         for item in items:
             if "timescale" in item.keywords:
                 item.add_marker(skip_timescale)
+
+    skip_perf = pytest.mark.skip(reason="need --perf option to run")
+    perf = config.getoption("--perf", default=False) or config.getoption(
+        "--update-perf-baseline", default=False
+    )
+    if not perf:
+        for item in items:
+            if "perf" in item.keywords:
+                item.add_marker(skip_perf)
+
+
+@pytest.fixture()
+def perf_baseline(request):
+    """
+    A function checking measurements against the stored baseline for the
+    same parameters, or storing them as the new baseline with
+    --update-perf-baseline.
+    """
+    from benchmarks import baseline
+
+    def check(parameters, measured):
+        # timings are compared relative to this machine's speed right now
+        calibration = baseline.calibration_seconds()
+
+        if request.config.getoption("--update-perf-baseline"):
+            baseline.save(PERF_BASELINE, parameters, measured, calibration)
+            return
+
+        stored = baseline.load(PERF_BASELINE)
+
+        if stored["parameters"] != parameters:
+            pytest.fail(
+                "baseline was measured with different parameters, "
+                "rerun with --update-perf-baseline"
+            )
+
+        problems = list(baseline.regressions(stored, measured, calibration))
+
+        if problems:
+            pytest.fail("performance regressed:\n" + "\n".join(problems))
+
+    return check
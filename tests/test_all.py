@@ -9,19 +9,23 @@ import sqlalchemy.dialects.postgresql
 import sqlalchemy.exc
 from psycopg2.extras import NamedTupleCursor
 from pytest import raises
+from sqlalchemy import create_engine
 from sqlbag import S, temporary_database
 
 import schemainspect
 from schemainspect import NullInspector, get_inspector, to_pytype
 from schemainspect.inspected import ColumnInfo
-from schemainspect.misc import quoted_identifier
+from schemainspect.inspector import PYTYPES
+from schemainspect.misc import COMPARISON_ATTRIBUTES, quoted_identifier
 from schemainspect.pg.obj import (
+    PROPS,
     InspectedConstraint,
     InspectedEnum,
     InspectedExtension,
     InspectedIndex,
     InspectedPrivilege,
     InspectedSequence,
+    serialized_fields,
 )
 
 T_CREATE = """create table "public"."films" (
@@ -123,6 +127,11 @@ def test_inspected():
     x.schema = "a"
     assert x.quoted_full_name == '"a"."b"'
     assert x.unquoted_full_name == "a.b"
+    assert x.quoted_full_name is x.quoted_full_name
+    x.name = "c"
+    assert x.quoted_full_name == '"a"."c"'
+    x.schema = "d"
+    assert x.signature == '"d"."c"'
     x = schemainspect.ColumnInfo(name="a", dbtype="integer", pytype=int)
     assert x.creation_clause == '"a" integer'
     x.default = "5"
@@ -679,3 +688,130 @@ def test_raw_connection(db):
         i2 = get_inspector(c)
 
     assert i1 == i2
+
+
+def test_to_pytype_is_shared_per_dialect():
+    d1 = sqlalchemy.dialects.postgresql.dialect()
+    d2 = sqlalchemy.dialects.postgresql.dialect()
+
+    assert to_pytype(d1, "integer") == int
+    assert (type(d1), "integer") in PYTYPES
+    assert to_pytype(d2, "integer") == int
+    assert to_pytype(d2, "nonexistent") == type(None)  # noqa
+    assert PYTYPES[(type(d1), "nonexistent")] == type(None)  # noqa
+
+
+def test_streamed_results(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+
+    with S(db) as s:
+        i1 = get_inspector(s)
+        i2 = get_inspector(s, stream_results=True, fetch_size=2)
+
+    with transaction_cursor(db) as c:
+        i3 = get_inspector(c, stream_results=True, fetch_size=2)
+
+    assert i1 == i2 == i3
+    assert list(i1.functions) == list(i2.functions) == list(i3.functions)
+
+
+def test_streamed_results_autocommit(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+        i1 = get_inspector(s)
+
+    # server-side cursors on autocommit connections have to be held open
+    # outside of a transaction
+    conn = psycopg2.connect(db, cursor_factory=NamedTupleCursor)
+    conn.autocommit = True
+
+    try:
+        with conn.cursor() as c:
+            i2 = get_inspector(c, stream_results=True, fetch_size=2)
+    finally:
+        conn.close()
+
+    engine = create_engine(db, isolation_level="AUTOCOMMIT")
+
+    with engine.connect() as c:
+        i3 = get_inspector(c, stream_results=True, fetch_size=2)
+
+    engine.dispose()
+
+    assert i1 == i2 == i3
+
+
+def test_lazy_definitions(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+
+    with S(db) as s:
+        i1 = get_inspector(s)
+        i2 = get_inspector(s, lazy_definitions=True)
+
+        assert i2.view_definitions.values is None
+        assert i2.function_definitions.values is None
+
+        v = i2.views[n("v_films")]
+        assert v.create_statement == i1.views[n("v_films")].create_statement
+        assert i2.view_definitions.values is not None
+        assert i2.function_definitions.values is None
+
+        i2.resolve_definitions()
+
+    assert i1 == i2
+
+    f = n("films_f") + "(d date, def_t text, def_d date)"
+    assert i2.functions[f].full_definition == i1.functions[f].full_definition
+    assert i2.functions[f].definition == i1.functions[f].definition
+
+
+def test_lazy_definitions_of_dropped_objects(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+
+    with S(db) as s:
+        i = get_inspector(s, lazy_definitions=True)
+
+        with S(db) as other:
+            other.execute("drop view v_films2")
+
+        # the other definitions are still fetched
+        assert i.views[n("v_films2")].definition is None
+        assert i.views[n("v_films")].definition
+
+
+def test_encodeable_definition(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+        i = get_inspector(s)
+
+    full = i.encodeable_definition()
+    films = full["relations"][n("films")]
+    assert films["create_statement"] == i.tables[n("films")].create_statement
+    assert films["columns"]["code"]["dbtypestr"] == "character(5)"
+    assert "pytype" not in films["columns"]["code"]
+
+    stripped = i.encodeable_definition(include_derived=False)
+    films = stripped["relations"][n("films")]
+    assert "create_statement" not in films
+    assert "drop_statement" not in films
+    assert "creation_clause" not in films["columns"]["code"]
+    assert films["name"] == "films"
+    assert list(stripped) == list(full)
+
+    # fields are worked out once per class, and are the same for every
+    # instance of it
+    def fields(x):
+        names = [k for k in dir(x) if not callable(getattr(type(x), k, None))]
+        return [
+            k for k in names if not k.startswith("_") and k not in COMPARISON_ATTRIBUTES
+        ]
+
+    for prop in PROPS.split():
+        for x in getattr(i, prop).values():
+            assert serialized_fields(x) == fields(x)
+
+            for c in getattr(x, "columns", {}).values():
+                assert serialized_fields(c) == fields(c)
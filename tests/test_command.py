@@ -0,0 +1,80 @@
+import json
+from collections import deque
+from io import StringIO
+
+from sqlbag import S, temporary_database
+
+from benchmarks.run import peak_memory
+from benchmarks.schema import create_schema
+from schemainspect import get_inspector
+from schemainspect.command import do_json, parse_args
+
+from .test_all import setup_pg_schema
+
+
+def test_json_stream(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+
+    out = StringIO()
+    do_json(db, stream=True, out=out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    films = [
+        r
+        for r in records
+        if r["category"] == "tables" and r["key"] == '"public"."films"'
+    ]
+    assert len(films) == 1
+    assert all(set(r) == {"category", "key", "fields"} for r in records)
+
+    privileges = [r for r in records if r["category"] == "privileges"]
+    assert privileges and all(isinstance(r["key"], list) for r in privileges)
+
+    out = StringIO()
+    do_json(db, exclude_ddl=True, out=out)
+    defn = json.loads(out.getvalue())
+    films = defn["relations"]['"public"."films"']
+    assert films["name"] == "films"
+    assert "create_statement" not in films
+
+
+def streamed_peak_memory(tables):
+    with temporary_database(host="localhost") as db:
+        with S(db) as s:
+            create_schema(
+                s,
+                tables=tables,
+                columns=10,
+                view_chains=tables // 2,
+                view_depth=3,
+                functions=tables,
+                overloads=2,
+                partitions=tables,
+            )
+            i = get_inspector(s)
+
+    def stream():
+        deque(i.iter_definitions(), maxlen=0)
+
+    # the first pass fills the per-object caches of quoted names
+    stream()
+    return peak_memory(stream), peak_memory(i._as_dicts)
+
+
+def test_stream_memory_is_flat():
+    small, small_dicts = streamed_peak_memory(10)
+    large, large_dicts = streamed_peak_memory(40)
+
+    # the whole definition grows with the schema, but streaming only holds
+    # one object at a time (and the ids of the objects already written,
+    # whose set grows in steps as it's resized)
+    assert large_dicts > 3 * small_dicts
+    assert large - small < 0.1 * (large_dicts - small_dicts)
+
+
+def test_parse_json_args():
+    args = parse_args(["json", "--stream", "postgresql:///example"])
+    assert args.command == "json"
+    assert args.stream
+    assert not args.exclude_ddl
@@ -0,0 +1,144 @@
+from sqlbag import S
+
+import schemainspect
+import schemainspect.inspected
+from schemainspect import get_inspector
+
+from .test_all import n, setup_pg_schema
+
+
+def test_diff(db, tmp_path):
+    with S(db) as s:
+        setup_pg_schema(s)
+        a = get_inspector(s)
+
+        s.execute(
+            """
+            create table added(id int);
+            drop view v_films2;
+            alter table t_abc add column extra int;
+            create index films_title_added on films(title);
+        """
+        )
+        b = get_inspector(s)
+
+    same = schemainspect.diff(a, a)
+    assert list(same) == schemainspect.pg.obj.PROPS.split()
+    assert not any(same.values())
+
+    d = schemainspect.diff(a, b)
+
+    tables = d["tables"]
+    assert list(tables.added) == [n("added")]
+    assert not tables.removed
+    assert list(tables.changed) == [n("t_abc")]
+
+    old, new = tables.changed[n("t_abc")]
+    assert old is a.tables[n("t_abc")]
+    assert new is b.tables[n("t_abc")]
+    assert "extra" in new.columns
+
+    assert list(d["views"].removed) == [n("v_films2")]
+    assert list(d["indexes"].added) == [n("films_title_added")]
+    assert not d["functions"]
+    assert not d["schemas"]
+
+    # snapshots can be compared with live inspectors
+    path = tmp_path / "a.snapshot"
+    a.dump(path)
+    assert not any(schemainspect.diff(schemainspect.load(path, lazy=True), a).values())
+
+
+def test_warm_diff_doesnt_rehash(db, monkeypatch):
+    with S(db) as s:
+        setup_pg_schema(s)
+        a = get_inspector(s)
+        b = get_inspector(s)
+
+    assert not any(schemainspect.diff(a, b).values())
+
+    calls = []
+    hashable_value = schemainspect.inspected.hashable_value
+
+    def counted(x):
+        calls.append(x)
+        return hashable_value(x)
+
+    # once hashed, objects aren't walked again, or compared field by field
+    monkeypatch.setattr(schemainspect.inspected, "hashable_value", counted)
+    monkeypatch.setattr(type(a.tables[n("films")]), "__eq__", None)
+    assert not any(schemainspect.diff(a, b).values())
+    assert not calls
+
+
+def test_diff_renames(db, tmp_path):
+    with S(db) as s:
+        setup_pg_schema(s)
+        a = get_inspector(s)
+
+        s.execute(
+            """
+            alter table films rename to movies;
+            alter index firstkey rename to movies_pkey;
+            create table films(id int);
+            alter table t_abc rename to t_abcd;
+            alter table t_abcd add column extra int;
+        """
+        )
+        b = get_inspector(s)
+
+    assert a.database_id and a.database_id == b.database_id
+    assert a.tables[n("films")].oid
+
+    d = schemainspect.diff(a, b)
+
+    tables = d["tables"]
+    assert list(tables.renamed) == [n("movies"), n("t_abcd")]
+    old, new = tables.renamed[n("movies")]
+    assert old is a.tables[n("films")]
+    assert new is b.tables[n("movies")]
+    assert list(tables.added) == [n("films")]
+    assert not tables.removed
+
+    # renamed and altered
+    assert list(tables.changed) == [n("t_abcd")]
+    old, new = tables.changed[n("t_abcd")]
+    assert old is a.tables[n("t_abc")]
+    assert "extra" in new.columns
+
+    assert list(d["indexes"].renamed) == [n("movies_pkey")]
+    assert not d["indexes"].removed
+    # only the table it's on has changed
+    assert list(d["indexes"].changed) == [n("films_title_idx")]
+
+    # oids are only unique within a catalog, and functions (from pg_proc)
+    # share selectables with relations (from pg_class)
+    f = b.functions[n("inc_f_noargs") + "()"]
+    f.oid = a.tables[n("emptytable")].oid
+    selectables = schemainspect.diff(a, b)["selectables"]
+    assert f.signature not in selectables.renamed
+    assert not selectables.removed
+
+    # without oids, a rename is a removal and an addition
+    by_key = schemainspect.diff(a, b, match_oids=False)["tables"]
+    assert not by_key.renamed
+    assert list(by_key.added) == [n("movies"), n("t_abcd")]
+    assert list(by_key.changed) == [n("films")]
+    assert list(by_key.removed) == [n("t_abc")]
+
+    # consecutive snapshots of the same database
+    a.dump(tmp_path / "a.snapshot")
+    b.dump(tmp_path / "b.snapshot")
+    loaded = schemainspect.diff(
+        schemainspect.load(tmp_path / "a.snapshot"),
+        schemainspect.load(tmp_path / "b.snapshot"),
+    )
+    assert list(loaded["tables"].renamed) == [n("movies"), n("t_abcd")]
+    assert list(loaded["tables"].changed) == [n("t_abcd")]
+
+    lazy = schemainspect.diff(
+        schemainspect.load(tmp_path / "a.snapshot", lazy=True),
+        schemainspect.load(tmp_path / "b.snapshot", lazy=True),
+    )
+    assert list(lazy["tables"].changed) == [n("t_abcd")]
+    assert list(lazy["indexes"].changed) == [n("films_title_idx")]
@@ -0,0 +1,311 @@
+from io import StringIO
+
+import psycopg2
+from sqlbag import S, temporary_database
+
+from schemainspect import drift, get_inspector
+from schemainspect.command import do_drift, parse_args
+from schemainspect.drift import Template, catalog_fingerprints
+
+TENANT = """
+create schema {0};
+create type {0}.status as enum('active', 'closed');
+create table {0}.account(
+    id serial primary key,
+    name text not null,
+    status {0}.status default 'active'
+);
+create table {0}.invoice(
+    id serial primary key,
+    account_id int references {0}.account(id),
+    total numeric
+);
+create index on {0}.invoice(account_id);
+create view {0}.open_accounts as select * from {0}.account where status = 'active';
+"""
+
+
+def setup_tenants(s):
+    for schema in ["template", "t1", "t2", "t3"]:
+        s.execute(TENANT.format(schema))
+
+    s.execute("alter table t2.invoice add column paid boolean")
+    s.execute("drop index t3.invoice_account_id_idx")
+
+
+def test_schema_drift(db):
+    with S(db) as s:
+        setup_tenants(s)
+        i = get_inspector(s)
+
+    template = Template(i, "template")
+
+    assert template.drift(i, "template") == {}
+    assert template.drift(i, "t1") == {}
+
+    t2 = template.drift(i, "t2")
+    assert list(t2) == ["relations", "tables", "selectables"]
+
+    tables = t2["tables"]
+    assert not tables.added and not tables.removed
+    assert list(tables.changed) == ['{schema}."invoice"']
+
+    expected, actual = tables.changed['{schema}."invoice"']
+    assert expected is i.tables['"template"."invoice"']
+    assert actual is i.tables['"t2"."invoice"']
+    assert template.changed_attributes(expected, actual, "t2") == ["columns"]
+
+    t3 = template.drift(i, "t3")
+    assert list(t3) == ["indexes"]
+    assert list(t3["indexes"].removed) == ['{schema}."invoice_account_id_idx"']
+
+
+def test_database_drift(db):
+    with S(db) as s:
+        setup_tenants(s)
+        a = get_inspector(s)
+        s.execute("create table t1.extra(id int)")
+        b = get_inspector(s)
+
+    template = Template(a)
+    assert template.drift(a) == {}
+
+    drift = template.drift(b)
+    assert list(drift["tables"].added) == ['"t1"."extra"']
+
+
+def test_drift_command(db):
+    with S(db) as s:
+        setup_tenants(s)
+
+    out = StringIO()
+    status = do_drift(db, schema="template", target_schemas=["t1", "t2"], out=out)
+    assert status == 1
+
+    lines = [line.split("\t") for line in out.getvalue().splitlines()]
+    assert {tuple(line[1:]) for line in lines if line[1] == "tables"} == {
+        ("tables", "changed", '{schema}."invoice"', "columns")
+    }
+    assert all(line[0].endswith(":t2") for line in lines)
+
+    out = StringIO()
+    assert do_drift(db, schema="template", target_schemas=["t1"], out=out) == 0
+    assert out.getvalue() == ""
+
+    args = parse_args(["drift", db, "--schema", "template", "--target-schema", "t1"])
+    assert args.target_urls == []
+    assert args.target_schemas == ["t1"]
+
+
+def test_catalog_fingerprints(db):
+    with S(db) as s:
+        setup_tenants(s)
+        s.execute("create view t1.v as select id from t1.invoice")
+        s.execute("create view template.v as select id from template.invoice")
+        i = get_inspector(s)
+        catalog = catalog_fingerprints(s)
+
+    assert catalog["t1"] == catalog["template"]
+    assert catalog["t2"] != catalog["template"]
+    assert catalog["t3"] != catalog["template"]
+
+    template = Template(i, "template", catalog)
+    assert template.unchanged(catalog, "t1")
+    assert not template.unchanged(catalog, "t2")
+    assert not template.unchanged(catalog, "missing")
+    assert not template.unchanged(None, "t1")
+    assert not template.unchanged(catalog)
+
+    whole = Template(i, catalog=catalog)
+    assert whole.unchanged(dict(catalog))
+    assert not whole.unchanged(dict(catalog, t1=catalog["t2"]))
+
+    # anything that drift finds changes the digest
+    for change in [
+        "alter table t1.invoice alter column total type int",
+        "alter table t1.invoice alter column total set default 0",
+        "alter type t1.status add value 'frozen'",
+        "create or replace view t1.v as select id, total from t1.invoice",
+        "alter index t1.invoice_account_id_idx rename to x",
+        "alter table t1.invoice add check (total > 0)",
+        "alter table t1.account enable row level security",
+    ]:
+        with S(db) as s:
+            s.execute(change)
+            changed = catalog_fingerprints(s)
+            assert template.drift(get_inspector(s), "t1"), change
+            s.rollback()
+
+        assert changed["t1"] != catalog["t1"], change
+        assert changed["template"] == catalog["template"]
+
+
+EVERYTHING = """
+create domain {0}.positive as int check (value > 0);
+create collation {0}.c (locale = 'C');
+create function {0}.f(x int) returns int as 'select x' language sql;
+create function {0}.touch() returns trigger as 'begin return new; end'
+    language plpgsql;
+create table {0}.item(
+    id int generated by default as identity,
+    code text collate "C",
+    n {0}.positive,
+    s serial
+);
+create trigger touch before update on {0}.item
+    for each row execute procedure {0}.touch();
+alter table {0}.item enable row level security;
+create policy p on {0}.item using (id > 0);
+create table {0}.parent(id int);
+create table {0}.child() inherits ({0}.parent);
+create table {0}.measure(at date, x int) partition by range (at);
+create table {0}.measure_2020 partition of {0}.measure
+    for values from ('2020-01-01') to ('2021-01-01');
+create materialized view {0}.mv as select id from {0}.item;
+create index item_code on {0}.item(code);
+"""
+
+# a change to each kind of thing the catalog digests cover
+CATALOG_CHANGES = [
+    # relations and their columns
+    "alter table t1.item rename to renamed",
+    "alter table t1.item set unlogged",
+    "alter table t1.item force row level security",
+    "alter table t1.item add column extra int",
+    "alter table t1.item rename column code to label",
+    "alter table t1.item alter column code type varchar",
+    "alter table t1.item alter column code set not null",
+    "alter table t1.item alter column code set default 'x'",
+    "alter table t1.item alter column code type text collate t1.c",
+    "alter table t1.item alter column id set generated always",
+    "alter table t1.item alter column s drop default",
+    "alter sequence t1.item_s_seq owned by none",
+    "grant select on t1.item to public",
+    "alter table t1.child no inherit t1.parent",
+    "alter table t1.measure detach partition t1.measure_2020",
+    "create or replace view t1.open_accounts as "
+    "select * from t1.account where status = 'closed'",
+    "alter materialized view t1.mv rename column id to item_id",
+    # indexes and constraints
+    "drop index t1.item_code",
+    "alter table t1.item add primary key (id)",
+    "alter table t1.item cluster on item_code",
+    "alter table t1.invoice alter constraint invoice_account_id_fkey deferrable",
+    "alter domain t1.positive add check (value < 100)",
+    # functions, types, triggers, policies and collations
+    "create or replace function t1.f(x int) returns int as 'select x + 1' "
+    "language sql",
+    "alter function t1.f(int) stable",
+    "alter function t1.f(int) strict",
+    "alter function t1.f(int) security definer",
+    "alter function t1.f(int) set search_path = public",
+    "alter domain t1.positive set default 1",
+    "alter domain t1.positive set not null",
+    "alter type t1.status add value 'frozen'",
+    "alter table t1.item disable trigger touch",
+    "drop trigger touch on t1.item",
+    "alter policy p on t1.item using (id > 1)",
+    "alter policy p on t1.item with check (id > 1)",
+    "alter policy p on t1.item to current_user",
+    "alter collation t1.c rename to d",
+    "create sequence t1.seq",
+]
+
+
+def test_catalog_fingerprint_categories(db):
+    changes = list(CATALOG_CHANGES)
+
+    with S(db) as s:
+        for schema in ["template", "t1"]:
+            s.execute(TENANT.format(schema))
+            s.execute(EVERYTHING.format(schema))
+
+        available = "select 1 from pg_available_extensions where name = 'pg_trgm'"
+        if s.execute(available).fetchall():
+            s.execute("create extension pg_trgm")
+            changes.append("alter extension pg_trgm set schema t1")
+
+        catalog = catalog_fingerprints(s)
+
+    assert catalog["t1"] == catalog["template"]
+
+    for change in changes:
+        with S(db) as s:
+            s.execute(change)
+            changed = catalog_fingerprints(s)
+            s.rollback()
+
+        assert changed["t1"] != catalog["t1"], change
+        assert changed["template"] == catalog["template"], change
+
+
+def test_catalog_fingerprints_fallback(db, monkeypatch):
+    with S(db) as s:
+        setup_tenants(s)
+        catalog = catalog_fingerprints(s)
+
+    # raw psycopg2 connections and cursors, in or out of a transaction
+    connection = psycopg2.connect(db)
+
+    try:
+        assert catalog_fingerprints(connection) == catalog
+
+        with connection.cursor() as cursor:
+            assert catalog_fingerprints(cursor) == catalog
+        connection.rollback()
+
+        connection.autocommit = True
+        assert catalog_fingerprints(connection) == catalog
+    finally:
+        connection.close()
+
+    # when the query fails there are no fingerprints, so targets are
+    # inspected in full, and the transaction carries on
+    broken = "select 1 / 0 as schema, '' as fingerprint"
+    monkeypatch.setattr(drift, "FINGERPRINTS_QUERY", broken)
+
+    with S(db) as s:
+        assert catalog_fingerprints(s) is None
+        assert s.execute("select 1").scalar() == 1
+
+    connection = psycopg2.connect(db)
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("select 1")
+            assert catalog_fingerprints(cursor) is None
+            cursor.execute("select 2")
+            assert cursor.fetchone() == (2,)
+    finally:
+        connection.close()
+
+    with temporary_database(host="localhost") as db2:
+        with S(db2) as s:
+            setup_tenants(s)
+
+        kwargs = dict(schema="template", target_schemas=["t1"], out=StringIO())
+        timings = []
+        assert do_drift(db, [db2], hooks=[timings.append], **kwargs) == 0
+        assert sum(t.name == "load_all" for t in timings) == 2
+
+
+def test_drift_command_skips_unchanged_databases(db):
+    with temporary_database(host="localhost") as db2:
+        for url in [db, db2]:
+            with S(url) as s:
+                setup_tenants(s)
+
+        def inspections(*args, **kwargs):
+            timings = []
+            status = do_drift(*args, hooks=[timings.append], out=StringIO(), **kwargs)
+            return status, sum(t.name == "load_all" for t in timings)
+
+        # the template database's own tenants are checked from one inspection
+        assert inspections(db, schema="template", target_schemas=["t1", "t2"]) == (1, 1)
+
+        # other databases are only inspected if their catalogs differ
+        kwargs = dict(schema="template", target_schemas=["t1"])
+        assert inspections(db, [db2], **kwargs) == (0, 1)
+
+        kwargs = dict(schema="template", target_schemas=["t1", "t3"])
+        assert inspections(db, [db2], **kwargs) == (1, 2)
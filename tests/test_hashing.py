@@ -0,0 +1,75 @@
+from sqlbag import S
+
+from schemainspect import get_inspector
+
+from .test_all import n, setup_pg_schema
+
+
+def test_content_hashes(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+        a = get_inspector(s)
+        b = get_inspector(s)
+
+        s.execute("create index on films(title)")
+        s.execute("alter table t_abc add column extra int")
+        c = get_inspector(s)
+
+    assert a.category_hashes() == b.category_hashes()
+
+    for name, things in a.category_hashes().items():
+        for k, x in getattr(a, name).items():
+            assert x.content_hash == getattr(b, name)[k].content_hash
+
+    films_a, films_c = a.tables[n("films")], c.tables[n("films")]
+    assert films_a.content_hash == films_c.content_hash
+    assert films_a.subtree_hash != films_c.subtree_hash
+    assert films_a == films_c
+
+    t_abc_a, t_abc_c = a.tables[n("t_abc")], c.tables[n("t_abc")]
+    assert t_abc_a.content_hash != t_abc_c.content_hash
+    assert t_abc_a != t_abc_c
+
+    changed = [
+        name for name, h in a.category_hashes().items() if h != c.category_hash(name)
+    ]
+    assert changed == ["relations", "tables", "selectables", "indexes"]
+
+    # changing an attribute that equality depends on (and invalidating)
+    # changes the hash, and those of the objects it's nested in
+    table = b.tables[n("t_abc")]
+    table_before = table.content_hash
+    column = table.columns["x"]
+    before = column.content_hash
+    column.default = "'x'::text"
+    column.invalidate()
+    assert column.content_hash != before
+    assert table.content_hash != table_before
+    assert column != a.tables[n("t_abc")].columns["x"]
+
+    column.default = a.tables[n("t_abc")].columns["x"].default
+    column.invalidate()
+    assert column.content_hash == before
+    assert table.content_hash == table_before
+
+    # once computed, hashes are looked up rather than recomputed
+    assert table.content_hash is table.content_hash
+    assert table.subtree_hash is table.subtree_hash
+
+    # as do lists and dicts changed in place
+    x = table.columns["x"]
+    table.columns["x"] = b.tables[n("films")].columns["title"]
+    table.invalidate()
+    assert table.content_hash != table_before
+    assert table != a.tables[n("t_abc")]
+
+    table.columns["x"] = x
+    table.invalidate()
+    assert table.content_hash == table_before
+
+    enum = next(iter(b.enums.values()))
+    before = enum.content_hash
+    enum.elements.append("new")
+    enum.invalidate()
+    assert enum.content_hash != before
+    assert enum != a.enums[enum.quoted_full_name]
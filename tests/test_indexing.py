@@ -0,0 +1,292 @@
+from io import StringIO
+
+import psycopg2
+from psycopg2.extras import NamedTupleCursor
+from sqlalchemy import create_engine
+from sqlbag import S
+
+from schemainspect import get_inspector
+from schemainspect.command import do_indexes
+from schemainspect.indexing import index_findings, missing_fk_indexes
+from schemainspect.statements import CATALOG, SCAN
+
+INDEXES = """
+create table t(id int primary key, a int, b int, c int, d text unique);
+
+create index t_a on t(a);
+create index t_a_b on t(a, b);
+create index t_a_b_c on t(a, b, c);
+
+create index t_b on t(b);
+create index t_b_again on t(b);
+
+create index t_c_desc on t(c desc);
+create index t_c_a on t(c, a);
+
+create index t_partial on t(a) where b > 0;
+create index t_lower on t(lower(d));
+
+create unique index t_d_unique on t(d);
+create index t_id on t(id);
+"""
+
+
+def test_index_findings(db):
+    with S(db) as s:
+        s.execute(INDEXES)
+        i = get_inspector(s)
+        stats_i = get_inspector(s)
+        stats_i.load_stats()
+
+    findings = {x.index.name: x for x in index_findings(i)}
+
+    # prefixes are covered by the longest index
+    assert findings["t_a"].kind == "redundant"
+    assert findings["t_a"].covered_by.name == "t_a_b_c"
+    assert findings["t_a_b"].covered_by.name == "t_a_b_c"
+
+    # the first by name of a set of duplicates is kept
+    assert findings["t_b_again"].kind == "duplicate"
+    assert findings["t_b_again"].covered_by.name == "t_b"
+    assert "t_b" not in findings
+
+    # a non-unique index duplicating a unique one, or the primary key
+    assert findings["t_id"].covered_by.name == "t_pkey"
+
+    # unique indexes enforce something, and so are never dropped, except
+    # in favour of a constraint's index
+    assert findings["t_d_unique"].covered_by.name == "t_d_key"
+
+    # different ordering, predicates and expressions aren't covered
+    for name in "t_c_desc t_partial t_lower t_a_b_c t_c_a t_pkey t_d_key".split():
+        assert name not in findings
+
+    assert all(x.kind != "unused" for x in findings.values())
+    assert all(x.size > 0 for x in findings.values())
+    assert (
+        findings["t_a"].drop_statement
+        == 'drop index concurrently if exists "public"."t_a";'
+    )
+
+    unused = [x.index.name for x in index_findings(stats_i) if x.kind == "unused"]
+    assert sorted(unused) == ["t_c_a", "t_c_desc", "t_lower", "t_partial"]
+
+
+def test_indexes_command(db):
+    out = StringIO()
+    do_indexes(db, out=out)
+    assert out.getvalue() == "No droppable or missing indexes found.\n"
+
+    with S(db) as s:
+        s.execute(INDEXES)
+
+    out = StringIO()
+    do_indexes(db, stats=False, out=out)
+    output = out.getvalue()
+    assert "key is a prefix of" in output
+    assert 'drop index concurrently if exists "public"."t_b_again";' in output
+
+    with S(db) as s:
+        s.execute(FKS)
+
+    out = StringIO()
+    do_indexes(db, stats=False, out=out)
+    assert 'on "public"."small" ("parent_id");' in out.getvalue()
+
+
+FKS = """
+create table parent(a int, b int, primary key (a, b));
+
+create table big(id int, pa int, pb int, foreign key (pa, pb) references parent);
+create table small(id int, parent_id int references t(id));
+insert into big select n from generate_series(1, 1000) n;
+analyze big;
+
+create table reversed(id int, pa int, pb int, foreign key (pa, pb) references parent);
+create index on reversed(pb, pa, id);
+
+create table prefixed(id int, pa int, pb int, foreign key (pa, pb) references parent);
+create index on prefixed(id, pa, pb);
+
+create table partial(pa int, pb int, foreign key (pa, pb) references parent);
+create index on partial(pa, pb) where pa > 0;
+
+create table partitioned(pa int, pb int, foreign key (pa, pb) references parent)
+partition by range (pa);
+"""
+
+
+def test_missing_fk_indexes(db):
+    with S(db) as s:
+        s.execute(INDEXES)
+        s.execute(FKS)
+        i = get_inspector(s)
+
+    missing = missing_fk_indexes(i)
+
+    # largest referencing table first, then those never analyzed
+    assert [x.table.name for x in missing] == [
+        "big",
+        "partial",
+        "partitioned",
+        "prefixed",
+        "small",
+    ]
+    assert missing[0].row_count_estimate == 1000
+    assert missing[0].columns == ["pa", "pb"]
+    assert (
+        missing[0].create_statement
+        == 'create index concurrently if not exists "big_pa_pb_idx" on "public"."big" ("pa", "pb");'
+    )
+
+    assert missing[2].create_statement.startswith("create index if not exists")
+
+    # the partial index already has the name postgres would choose
+    assert missing[1].index_name == "partial_pa_pb_idx1"
+
+    # concurrently can't be used inside a transaction
+    engine = create_engine(db, isolation_level="AUTOCOMMIT")
+
+    with engine.connect() as c:
+        for x in missing:
+            c.execute(x.create_statement)
+
+        assert missing_fk_indexes(get_inspector(c)) == []
+
+    engine.dispose()
+
+
+CONCURRENT = """
+create table c(id int primary key, a int, b int);
+create index c_a on c(a) where b > 0;
+
+create table pc(id int) partition by range (id);
+create index pc_id on pc(id);
+"""
+
+
+def test_concurrent_statements(db):
+    with S(db) as s:
+        s.execute(CONCURRENT)
+        i = get_inspector(s)
+
+    index = i.indexes['"public"."c_a"']
+    pk = i.indexes['"public"."c_pkey"']
+
+    assert (
+        index.create_statement_concurrently
+        == "CREATE INDEX CONCURRENTLY c_a ON public.c USING btree (a) WHERE (b > 0);"
+    )
+    assert index.drop_statement_concurrently == (
+        'drop index concurrently if exists "public"."c_a";'
+    )
+    assert pk.create_statement_concurrently.startswith(
+        "CREATE UNIQUE INDEX CONCURRENTLY c_pkey"
+    )
+    assert not index.create_statement_concurrently.blocks_writes
+
+    # indexes on partitioned tables can't be built concurrently
+    partitioned = i.indexes['"public"."pc_id"']
+    assert partitioned.create_statement_concurrently == partitioned.create_statement
+
+    constraint = pk.constraint
+    engine = create_engine(db, isolation_level="AUTOCOMMIT")
+
+    with engine.connect() as c:
+        c.execute(constraint.drop_statement)
+        c.execute(index.drop_statement_concurrently)
+        assert get_inspector(c).indexes.keys() == {'"public"."pc_id"'}
+
+        # a primary key is added using its index, built concurrently first
+        c.execute(index.create_statement_concurrently)
+        c.execute(pk.create_statement_concurrently)
+        c.execute(constraint.create_statement)
+
+        rebuilt = get_inspector(c)
+
+    engine.dispose()
+
+    assert rebuilt.indexes == i.indexes
+    assert rebuilt.constraints == i.constraints
+
+
+CONSTRAINTS = """
+create table k(id int primary key, a int unique deferrable initially deferred);
+create table k_checked(id int, check (id > 0));
+
+create table pk(id int primary key) partition by range (id);
+"""
+
+
+def test_concurrent_constraint_statements(db):
+    with S(db) as s:
+        s.execute(CONSTRAINTS)
+        i = get_inspector(s)
+
+    pkey = i.constraints['"public"."k"."k_pkey"']
+    unique = i.constraints['"public"."k"."k_a_key"']
+
+    build, add = unique.safer_create_statements_concurrently
+    assert (
+        build == "CREATE UNIQUE INDEX CONCURRENTLY k_a_key ON public.k USING btree (a);"
+    )
+    assert add == (
+        'alter table "public"."k" add constraint "k_a_key" '
+        'UNIQUE using index "k_a_key" DEFERRABLE INITIALLY DEFERRED;'
+    )
+    assert not build.blocks_writes
+    assert add.effect == CATALOG
+
+    # making the key's columns not null is proven by a validated check
+    # constraint rather than scanning with the table locked, since 12
+    build, not_valid, validate, add, drop = pkey.safer_create_statements_concurrently
+    assert not_valid == (
+        'alter table "public"."k" add constraint "k_pkey_not_null" '
+        'check ("id" is not null) not valid;'
+    )
+    assert validate.effect == SCAN and not validate.blocks_writes
+    assert add.effect == CATALOG
+    assert drop == 'alter table "public"."k" drop constraint "k_pkey_not_null";'
+
+    pkey.pg_version = 11
+    build, add = pkey.safer_create_statements_concurrently
+    assert add.effect == SCAN
+    pkey.pg_version = i.pg_version
+
+    check = i.constraints['"public"."k_checked"."k_checked_id_check"']
+    assert check.safer_create_statements_concurrently == check.safer_create_statements
+
+    partitioned = i.constraints['"public"."pk"."pk_pkey"']
+    assert (
+        partitioned.safer_create_statements_concurrently
+        == partitioned.safer_create_statements
+    )
+
+    # postgres reports (at debug level) when a check constraint saves
+    # scanning for nulls, which sqlalchemy doesn't pass on
+    connection = psycopg2.connect(db, cursor_factory=NamedTupleCursor)
+    connection.autocommit = True
+
+    try:
+        with connection.cursor() as c:
+            for constraint in (pkey, unique):
+                c.execute(constraint.drop_statement)
+            c.execute("alter table k alter column id drop not null")
+
+            c.execute("set client_min_messages = debug1")
+
+            for constraint in (pkey, unique):
+                for statement in constraint.safer_create_statements_concurrently:
+                    c.execute(statement)
+
+            c.execute("reset client_min_messages")
+            rebuilt = get_inspector(c)
+    finally:
+        connection.close()
+
+    if i.pg_version >= 12:
+        notices = connection.notices
+        assert any("sufficient to prove" in x for x in notices), notices
+
+    assert rebuilt.indexes == i.indexes
+    assert rebuilt.constraints == i.constraints
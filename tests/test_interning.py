@@ -0,0 +1,43 @@
+import sys
+
+from sqlbag import S
+
+from schemainspect import get_inspector
+
+N_TABLES = 20
+N_COLUMNS = 50
+
+
+def wide_schema():
+    columns = ",\n".join(
+        'c{} character varying(255) collate "C"'.format(n) for n in range(N_COLUMNS)
+    )
+
+    return "\n".join(
+        "create table wide{} ({});".format(n, columns) for n in range(N_TABLES)
+    )
+
+
+def test_repeated_strings_are_interned(db):
+    with S(db) as s:
+        s.execute(wide_schema())
+        i = get_inspector(s)
+
+    columns = [c for t in i.tables.values() for c in t.columns.values()]
+    assert len(columns) == N_TABLES * N_COLUMNS
+
+    typestrings = {id(c.dbtypestr) for c in columns}
+    types = {id(c.dbtype) for c in columns}
+    collations = {id(c.collation) for c in columns}
+    schemas = {id(t.schema) for t in i.tables.values()}
+
+    assert len(typestrings) == 1
+    assert len(types) == 1
+    assert len(collations) == 1
+    assert len(schemas) == 1
+
+    strings = [x for c in columns for x in (c.dbtype, c.dbtypestr, c.collation)]
+    held = {id(x): sys.getsizeof(x) for x in strings}
+    uninterned = sum(sys.getsizeof(x) for x in strings)
+
+    assert sum(held.values()) * 100 < uninterned
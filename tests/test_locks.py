@@ -0,0 +1,189 @@
+import re
+
+from sqlbag import S
+
+from schemainspect import get_inspector
+from schemainspect.statements import (
+    ACCESS_EXCLUSIVE,
+    LOCK_MODES,
+    SHARE_ROW_EXCLUSIVE,
+    SHARE_UPDATE_EXCLUSIVE,
+    Statement,
+    strongest_lock,
+)
+
+SCHEMA = """
+create table parent(id int primary key, code text unique, n int check (n > 0));
+create table child(id int primary key, parent_id int references parent(id));
+create index on child(parent_id);
+
+create table measurements(d date, v int) partition by range (d);
+create table m2020 partition of measurements
+    for values from ('2020-01-01') to ('2021-01-01');
+
+create table base(x int);
+create table derived(y int) inherits (base);
+
+create view v as select * from parent;
+create sequence seq owned by parent.n;
+
+create function f() returns trigger language plpgsql as $$
+begin return new; end
+$$;
+create trigger tr before insert on child for each row execute function f();
+create policy p on parent using (true);
+"""
+
+HELD_LOCKS = """
+select l.relation, l.mode, c.relkind
+from pg_locks l
+left join pg_class c on c.oid = l.relation
+where l.pid = pg_backend_pid() and l.locktype = 'relation'
+"""
+
+
+def mode_name(mode):
+    # pg_locks calls ACCESS EXCLUSIVE AccessExclusiveLock
+    return " ".join(re.findall("[A-Z][a-z]+", mode[: -len("Lock")])).upper()
+
+
+def oids(s, relations):
+    q = "select to_regclass(:r)::oid"
+    return {r: s.execute(q, dict(r=r)).scalar() for r in relations}
+
+
+def check_locks(s, statement):
+    """
+    Run statement, and check the strongest lock it takes on each of its
+    relations is the one it's annotated with, and that it takes no lock
+    that blocks writes on any other table. Commits only if the statement
+    recreates something that's been dropped.
+    """
+    before = oids(s, statement.relations)
+    s.execute(statement)
+    after = oids(s, statement.relations)
+
+    held = s.execute(HELD_LOCKS).fetchall()
+
+    for r in statement.relations:
+        oid = before[r] or after[r]
+        taken = strongest_lock(mode_name(m) for x, m, _ in held if x == oid)
+        assert taken == statement.lock_on(r), (statement, r)
+
+    annotated = set(before.values()) | set(after.values())
+
+    for x, m, relkind in held:
+        if relkind in ("r", "p") and x not in annotated:
+            strength = LOCK_MODES.index(mode_name(m))
+            assert strength < LOCK_MODES.index(SHARE_UPDATE_EXCLUSIVE), statement
+
+
+def check_drop_and_create(s, x, *recreated_first):
+    check_locks(s, x.drop_statement)
+    s.rollback()
+
+    s.execute(x.drop_statement)
+    s.commit()
+
+    for y in recreated_first:
+        check_locks(s, y.create_statement)
+        s.commit()
+
+    check_locks(s, x.create_statement)
+    s.commit()
+
+
+def test_statement_locks():
+    s = Statement("x").locking(SHARE_ROW_EXCLUSIVE, "a", "b")
+    s = s.locking(ACCESS_EXCLUSIVE, "a")
+
+    assert s.relations == ["a", "b"]
+    assert s.lock == ACCESS_EXCLUSIVE
+    assert s.lock_on("b") == SHARE_ROW_EXCLUSIVE
+    assert s.blocks_reads and s.blocks_writes
+    assert s.annotated("y").locks == s.locks
+
+    assert Statement("x").lock is None
+    assert not Statement("x").blocks_writes
+
+
+def test_locks_match_postgres(db):
+    with S(db) as s:
+        s.execute(SCHEMA)
+        s.commit()
+        i = get_inspector(s)
+
+        def t(name):
+            return i.relations['"public"."{}"'.format(name)]
+
+        def c(table, name):
+            return i.constraints['"public"."{}"."{}"'.format(table, name)]
+
+        for x in [
+            i.indexes['"public"."child_parent_id_idx"'],
+            i.triggers['"public"."child"."tr"'],
+            i.rlspolicies['"public"."parent"."p"'],
+            c("parent", "parent_n_check"),
+            c("child", "child_parent_id_fkey"),
+            t("m2020"),
+            t("derived"),
+        ]:
+            check_drop_and_create(s, x)
+
+        # constraints with an index are added using the index, created first
+        unique = c("parent", "parent_code_key")
+        check_drop_and_create(s, unique, i.indexes['"public"."parent_code_key"'])
+
+        fk = c("child", "child_parent_id_fkey")
+        assert fk.drop_statement.relations == ['"public"."child"', '"public"."parent"']
+
+        not_valid, validate = fk.safer_create_statements
+        assert not_valid.lock == SHARE_ROW_EXCLUSIVE
+        assert validate.lock == SHARE_UPDATE_EXCLUSIVE
+        assert not validate.blocks_writes
+
+        s.execute(fk.drop_statement)
+        s.execute(not_valid)
+        s.commit()
+        check_locks(s, validate)
+        s.rollback()
+
+        for x in [t("m2020"), t("derived")]:
+            check_locks(s, x.detach_statement)
+            s.commit()
+            check_locks(s, x.attach_statement)
+            s.commit()
+
+        m2020 = t("m2020")
+        attach = m2020.attach_statement
+        assert attach.lock_on('"public"."measurements"') == SHARE_UPDATE_EXCLUSIVE
+
+        # before 12, attaching a partition locks the parent exclusively
+        m2020.pg_version = 11
+        attach = m2020.attach_statement
+        assert attach.lock_on('"public"."measurements"') == ACCESS_EXCLUSIVE
+        m2020.pg_version = 12
+        attach = m2020.attach_statement
+        assert attach.lock_on('"public"."measurements"') == SHARE_UPDATE_EXCLUSIVE
+
+        # inheritance is the same either way
+        derived = t("derived")
+        derived.pg_version = 11
+        assert derived.attach_statement.lock_on(derived.parent_table) == (
+            SHARE_UPDATE_EXCLUSIVE
+        )
+
+        check_locks(s, t("parent").alter_rls_statement)
+        s.rollback()
+
+        seq = i.sequences['"public"."seq"']
+        check_locks(s, seq.alter_ownership_statement)
+        s.rollback()
+        check_locks(s, seq.drop_statement)
+        s.rollback()
+
+        check_locks(s, t("v").drop_statement)
+        s.rollback()
+
+        f = i.functions['"public"."f"()']
+        assert f.create_statement.lock is None and f.drop_statement.lock is None
@@ -54,6 +54,11 @@ CREATE TABLE measurement_y2006 PARTITION OF measurement
 """
     )
 
+    assert (
+        m2006.attach_statement
+        == """alter table "public"."measurement" attach partition "public"."measurement_y2006" FOR VALUES FROM ('2006-01-01') TO ('2007-01-01');"""
+    )
+
     assert m.is_partitioning_child_table is False
     assert m.is_inheritance_child_table is False
     assert m.contains_data is False
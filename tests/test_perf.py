@@ -0,0 +1,94 @@
+import os
+from collections import OrderedDict as od
+
+import pytest
+from sqlbag import S, temporary_database
+
+from benchmarks.baseline import regressions
+from benchmarks.replay import Catalog, measure_key_paths, record, replayed
+from benchmarks.schema import DEFAULTS, create_schema
+from schemainspect import get_inspector
+from schemainspect.misc import connection_from_s_or_c
+
+from .test_all import n, setup_pg_schema
+
+# the catalog of setup_pg_schema, recorded by test_replayed_catalog with
+# --update-replay-catalog (needed whenever a catalog query changes)
+REPLAY_CATALOG = os.path.join(os.path.dirname(__file__), "replay_catalog.json")
+
+PARAMETERS = od(DEFAULTS)
+PARAMETERS.update(tables=100, view_chains=10, functions=10, partitions=10)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    with temporary_database(host="localhost") as db:
+        with S(db) as s:
+            create_schema(s, **PARAMETERS)
+
+        with S(db) as s:
+            return record(connection_from_s_or_c(s))
+
+
+@pytest.mark.perf
+def test_key_paths(catalog, perf_baseline):
+    perf_baseline(PARAMETERS, measure_key_paths(catalog))
+
+
+def test_baseline_regressions():
+    stored = od(
+        calibration_seconds=0.02,
+        measurements=od(slow_seconds=1.0, quick_seconds=0.0005, peak_bytes=1000),
+    )
+
+    def regressed(calibration=None, **measured):
+        return [x.split(":")[0] for x in regressions(stored, measured, calibration)]
+
+    assert regressed(slow_seconds=1.4, peak_bytes=1100) == []
+    assert regressed(slow_seconds=1.6, peak_bytes=1300) == [
+        "slow_seconds",
+        "peak_bytes",
+    ]
+
+    # timings are scaled by how fast the machine is compared to when the
+    # baseline was stored, and allocations aren't
+    assert regressed(0.04, slow_seconds=2.5, peak_bytes=1100) == []
+    assert regressed(0.01, slow_seconds=1.0) == ["slow_seconds"]
+    assert regressed(0.04, peak_bytes=1300) == ["peak_bytes"]
+
+    # nothing quicker than the floor counts, however much slower
+    assert regressed(quick_seconds=0.004) == []
+    assert regressed(quick_seconds=0.006) == ["quick_seconds"]
+
+
+def test_replayed_catalog(db, request, tmp_path):
+    with S(db) as s:
+        setup_pg_schema(s)
+        i = get_inspector(s)
+        c = record(connection_from_s_or_c(s))
+
+    assert replayed(c) == i
+
+    path = tmp_path / "catalog.json"
+    c.dump(path)
+    assert replayed(Catalog.load(path)) == i
+
+    if request.config.getoption("--update-replay-catalog"):
+        c.dump(REPLAY_CATALOG)
+
+
+def test_replayed_fixture_catalog():
+    i = replayed(Catalog.load(REPLAY_CATALOG))
+
+    films = i.tables[n("films")]
+    assert list(films.columns)[:3] == ["code", "title", "did"]
+    assert n("firstkey") in films.indexes
+    assert i.views[n("v_films2")].dependent_on == [n("v_films")]
+    assert i.enums[n("abc")].elements == ["a", "b", "c"]
+    assert n("inc_f") + "(integer)" in i.functions
+
+    order = i.dependency_order()
+    assert order.index(n("films")) < order.index(n("v_films"))
+
+    assert i._as_dicts()["relations"][n("films")]["name"] == "films"
+    assert replayed(Catalog.load(REPLAY_CATALOG)) == i
@@ -0,0 +1,32 @@
+from sqlbag import S
+
+from schemainspect import get_inspector
+
+
+def test_relation_sizes(db):
+    with S(db) as s:
+        s.execute(
+            """
+create table t(id int primary key, body text);
+insert into t select n, repeat(md5(n::text), 100) from generate_series(1, 1000) n;
+create table never_analyzed(id int);
+create view v as select * from t;
+analyze t;
+"""
+        )
+
+        i = get_inspector(s)
+        t = i.tables['"public"."t"']
+        assert t.row_count_estimate == 1000
+        assert t.page_size_estimate > 0
+        assert t.total_size is None and t.toast_size is None
+
+        if i.pg_version >= 14:
+            assert i.views['"public"."v"'].row_count_estimate is None
+            assert i.tables['"public"."never_analyzed"'].row_count_estimate is None
+
+        i = get_inspector(s, relation_sizes=True)
+        t = i.tables['"public"."t"']
+        assert t.total_size > t.page_size_estimate * 8192
+        assert t.toast_size > 0
+        assert i.views['"public"."v"'].total_size is None
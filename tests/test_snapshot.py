@@ -0,0 +1,143 @@
+from pytest import raises
+from sqlbag import S
+
+import schemainspect
+import schemainspect.snapshot
+from schemainspect import get_inspector
+from schemainspect.pg.obj import InspectedSelectable
+from schemainspect.snapshot import checked_type
+
+from .test_all import n, setup_pg_schema
+
+FKS = """
+create table parent(id int primary key);
+create table child(id int primary key, parent_id int references parent(id));
+create unique index on child(parent_id) where id > 0;
+"""
+
+
+def test_snapshot_roundtrip(db, tmp_path):
+    with S(db) as s:
+        setup_pg_schema(s)
+        s.execute(FKS)
+        i = get_inspector(s)
+
+    path = tmp_path / "schema.snapshot"
+    i.dump(path)
+    loaded = schemainspect.load(path)
+
+    assert loaded == i
+    assert loaded.indexes == i.indexes
+    assert loaded.types == i.types
+    assert loaded.domains == i.domains
+    assert loaded.pg_version == i.pg_version
+    assert list(loaded.relations) == list(i.relations)
+    assert loaded.dependency_order() == i.dependency_order()
+    assert loaded.as_yaml() == i.as_yaml()
+    assert loaded.deps == [tuple(d) for d in i.deps]
+
+    # object identity is preserved across categories
+    films = loaded.tables[n("films")]
+    assert loaded.relations[n("films")] is films
+    assert loaded.selectables[n("films")] is films
+
+    pk = loaded.constraints['"public"."films"."firstkey"']
+    assert pk.index is loaded.indexes[n("firstkey")]
+    assert pk.index.constraint is pk
+    assert films.constraints['"public"."films"."firstkey"'] is pk
+
+    t_abc = loaded.tables[n("t_abc")]
+    assert t_abc.columns["x"].enum is loaded.enums[n("abc")]
+    assert t_abc.dependent_on == [n("abc")]
+
+    fk = loaded.constraints['"public"."child"."child_parent_id_fkey"']
+    assert fk.fk_columns_local == ["parent_id"]
+
+
+def test_snapshot_inspector_attributes(db, tmp_path):
+    with S(db) as s:
+        setup_pg_schema(s)
+        i = get_inspector(s, relation_sizes=True)
+
+    path = tmp_path / "schema.snapshot"
+    i.dump(path)
+    loaded = schemainspect.load(path)
+
+    # a loaded inspector has everything a live one has, apart from the
+    # connection
+    assert set(vars(i)) <= set(vars(loaded))
+    assert loaded.c is None
+    assert loaded.fetch_size == i.fetch_size
+    assert loaded.relation_sizes
+    assert str(loaded.INDEXES_QUERY) == str(i.INDEXES_QUERY)
+    assert str(loaded.processed("select 1")) == "select 1"
+    assert sorted(loaded.query_names.values()) == sorted(i.query_names.values())
+
+    # and anything that would need to query the database says why it can't
+    with raises(ValueError, match="snapshot"):
+        loaded.load_stats()
+
+
+def test_snapshot_bad_header(tmp_path):
+    path = tmp_path / "not.snapshot"
+    path.write_bytes(b"nope")
+
+    with raises(ValueError):
+        schemainspect.load(path)
+
+
+def test_snapshot_types(db, tmp_path, monkeypatch):
+    # column types are looked up rather than imported by name
+    assert checked_type("builtins:int") is int
+    assert checked_type("builtins:NoneType") is type(None)
+    for name in ["os:system", "subprocess:Popen", "sqlalchemy.engine:create_engine"]:
+        with raises(ValueError):
+            checked_type(name)
+
+    with S(db) as s:
+        s.execute("create table t(id int);")
+        i = get_inspector(s)
+
+    column = i.tables['"public"."t"'].columns["id"]
+    column.pytype = Exception
+    path = tmp_path / "schema.snapshot"
+    with raises(ValueError):
+        i.dump(path)
+
+    # and a snapshot naming any other type doesn't load
+    monkeypatch.setattr(schemainspect.snapshot, "checked_type", lambda name: None)
+    i.dump(path)
+    monkeypatch.undo()
+    with raises(ValueError, match="unexpected type"):
+        schemainspect.load(path)
+
+
+def test_snapshot_lazy(db, tmp_path):
+    with S(db) as s:
+        setup_pg_schema(s)
+        s.execute(FKS)
+        i = get_inspector(s)
+
+    path = tmp_path / "schema.snapshot"
+    i.dump(path)
+    loaded = schemainspect.load(path, lazy=True)
+
+    films = loaded.tables[n("films")]
+    assert type(films) is not InspectedSelectable
+    assert isinstance(films, InspectedSelectable)
+
+    assert films.name == "films"
+    assert type(films) is InspectedSelectable
+    assert loaded.relations[n("films")] is films
+
+    # decoded and not-yet-decoded objects compare equal either way round
+    other = schemainspect.load(path, lazy=True)
+    assert i.tables[n("films")] == other.tables[n("films")]
+    assert other.indexes[n("firstkey")] == i.indexes[n("firstkey")]
+    assert not (other.tables[n("t_abc")] != i.tables[n("t_abc")])
+
+    assert loaded == i
+    assert loaded.as_yaml() == i.as_yaml()
+
+    pk = loaded.constraints['"public"."films"."firstkey"']
+    assert pk.index.constraint is pk
@@ -0,0 +1,160 @@
+from sqlbag import S
+
+from schemainspect import get_inspector
+from schemainspect.inspected import ColumnInfo
+from schemainspect.statements import (
+    CATALOG,
+    REWRITE,
+    SCAN,
+    Statement,
+    type_change_effect,
+    worst_effect,
+)
+
+TYPE_CHANGES = [
+    ("character varying(10)", "character varying(20)", CATALOG),
+    ("character varying(20)", "character varying(10)", REWRITE),
+    ("character varying(10)", "character varying", CATALOG),
+    ("character varying(10)", "text", CATALOG),
+    ("text", "character varying", CATALOG),
+    ("text", "character varying(10)", REWRITE),
+    ("numeric(10,2)", "numeric(12,2)", CATALOG),
+    ("numeric(10,2)", "numeric(12,3)", REWRITE),
+    ("numeric(10,2)", "numeric", CATALOG),
+    ("timestamp(3) without time zone", "timestamp(6) without time zone", CATALOG),
+    ("timestamp without time zone", "timestamp with time zone", REWRITE),
+    ("integer", "bigint", REWRITE),
+    ("cidr", "inet", CATALOG),
+    ("text[]", "character varying[]", REWRITE),
+]
+
+
+def test_type_change_effect():
+    for old, new, effect in TYPE_CHANGES:
+        assert type_change_effect(old, new) == effect, (old, new)
+
+    assert type_change_effect("varchar(10)", "varchar(20)") == CATALOG
+    assert type_change_effect("timestamptz", "timestamp with time zone") == CATALOG
+
+
+def test_type_change_effect_matches_postgres(db):
+    # a rewritten table gets a new data file
+    with S(db) as s:
+        # timestamp to timestamptz is only catalog-only in UTC
+        s.execute("set timezone = 'America/New_York'")
+
+        for n, (old, new, effect) in enumerate(TYPE_CHANGES):
+            table = "t{}".format(n)
+            s.execute("create table {}(x {})".format(table, old))
+            before = s.execute("select pg_relation_filenode('{}')".format(table))
+            before = before.scalar()
+            s.execute(
+                "alter table {0} alter column x set data type {1} using x::{1}".format(
+                    table, new
+                )
+            )
+            after = s.execute("select pg_relation_filenode('{}')".format(table))
+            assert (after.scalar() != before) == (effect == REWRITE), (old, new)
+
+
+def test_annotated_statements():
+    old = ColumnInfo("b", "varchar", str, dbtypestr="varchar(10)")
+    new = ColumnInfo("b", "varchar", str, dbtypestr="varchar(20)", not_null=True)
+
+    alter = new.alter_table_statements(old, "t")
+    assert alter == [
+        'alter table t alter column "b" set not null;',
+        'alter table t alter column "b" set data type varchar(20) using "b"::varchar(20);',
+    ]
+    assert [x.effect for x in alter] == [SCAN, CATALOG]
+    assert worst_effect(x.effect for x in alter) == SCAN
+
+    collated = ColumnInfo("b", "varchar", str, dbtypestr="varchar(10)", collation="C")
+    assert collated.alter_table_statements(old, "t")[0].effect == SCAN
+
+    assert new.add_column_clause.effect == CATALOG
+    serial = ColumnInfo("id", "integer", int, default="nextval('t_id_seq'::regclass)")
+    assert serial.add_column_clause.effect == REWRITE
+
+    # before postgres 11, any default is written to every existing row
+    constant = dict(dbtypestr="integer", default="0")
+    old_server = ColumnInfo("x", "integer", int, **constant)
+    assert old_server.add_column_clause.effect == REWRITE
+    new_server = ColumnInfo("x", "integer", int, fast_default=True, **constant)
+    assert new_server.add_column_clause.effect == CATALOG
+
+    # without the catalog's word for it, any call that isn't to a builtin
+    # known not to be volatile is taken to be
+    def effect(default, **kwargs):
+        column = ColumnInfo("x", "integer", int, default=default, fast_default=True)
+        column.__dict__.update(kwargs)
+        return column.add_column_clause.effect
+
+    assert effect("now()") == CATALOG
+    assert effect("lower('a(b)'::text)") == CATALOG
+    assert effect("0.00::numeric(10,2)") == CATALOG
+    assert effect("my_counter()") == REWRITE
+    assert effect("public.now()") == REWRITE
+    assert effect("(random() * 10)") == REWRITE
+    assert effect("my_counter()", volatile_default=False) == CATALOG
+    assert effect("now()", volatile_default=True) == REWRITE
+
+    s = Statement("x", REWRITE)
+    assert s.annotated("y").effect == REWRITE
+    assert "{};".format(s) == "x;"
+    assert worst_effect([CATALOG, None]) is None
+
+
+def test_table_estimates(db):
+    with S(db) as s:
+        s.execute(
+            """
+create table t(id int);
+insert into t select generate_series(1, 100);
+analyze t;
+"""
+        )
+        i = get_inspector(s)
+
+    t = i.tables['"public"."t"']
+    x = ColumnInfo("x", "integer", int, default="random()")
+
+    alter = t.alter_table_statement(x.add_column_clause)
+    assert alter == 'alter table "public"."t" add column "x" integer default random();'
+    assert alter.effect == REWRITE
+    assert alter.table == '"public"."t"'
+    assert alter.rows == 100 and alter.pages == 1
+
+    assert t.columns["id"].fast_default == (i.pg_version >= 11)
+
+    with S(db) as s:
+        s.execute(
+            """
+create function stable_f() returns int as 'select 1' language sql stable;
+create function volatile_f() returns int as 'select 1' language sql volatile;
+create table defaults(
+    a int default stable_f(),
+    b int default volatile_f(),
+    c int default 1 + stable_f(),
+    d text default 'volatile_f()',
+    e int
+);
+"""
+        )
+        i = get_inspector(s)
+
+    # the volatility of what a default calls is looked up in the catalog
+    columns = i.tables['"public"."defaults"'].columns
+    assert [columns[k].volatile_default for k in "abcde"] == [
+        False,
+        True,
+        False,
+        False,
+        False,
+    ]
+    if i.pg_version >= 11:
+        assert columns["a"].add_column_clause.effect == CATALOG
+    assert columns["b"].add_column_clause.effect == REWRITE
+
+    assert t.alter_rls_statement.effect == CATALOG
+    assert t.alter_unlogged_statement.rewrites
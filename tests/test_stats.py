@@ -0,0 +1,53 @@
+from collections import OrderedDict as od
+from datetime import datetime, timezone
+
+from sqlbag import S
+
+import schemainspect
+from schemainspect import get_inspector
+
+
+def test_stats(db, tmp_path):
+    with S(db) as s:
+        s.execute(
+            """
+create table t(id int primary key, x text);
+create index on t(x);
+insert into t select n, n::text from generate_series(1, 100) n;
+create view v as select * from t;
+"""
+        )
+
+    with S(db) as s:
+        i = get_inspector(s)
+        t = i.tables['"public"."t"']
+        index = i.indexes['"public"."t_x_idx"']
+        assert t.stats is None and index.stats is None
+        assert i.stats_reset is None
+
+        i.load_stats()
+
+    assert "oid" not in t.stats
+    assert t.stats["seq_scan"] >= 0
+    assert t.stats["n_dead_tup"] >= 0
+    assert "last_autovacuum" in t.stats and "last_analyze" in t.stats
+
+    assert index.stats["idx_scan"] >= 0
+    assert index.stats["size"] > 0
+
+    assert i.views['"public"."v"'].stats is None
+
+    # stats aren't part of the schema
+    with S(db) as s:
+        assert get_inspector(s) == i
+
+    i.stats_reset = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    t.stats = od(t.stats, last_vacuum=datetime(2020, 1, 2, tzinfo=timezone.utc))
+
+    path = tmp_path / "stats.snapshot"
+    i.dump(path)
+    loaded = schemainspect.load(path)
+
+    assert loaded.stats_reset == i.stats_reset
+    assert loaded.tables['"public"."t"'].stats == t.stats
+    assert loaded.indexes['"public"."t_x_idx"'].stats == index.stats
@@ -0,0 +1,76 @@
+from sqlbag import S
+
+from schemainspect import get_inspector
+from schemainspect.command import parse_args, run
+from schemainspect.timings import Timings
+
+from .test_all import setup_pg_schema
+
+
+def test_timings(db):
+    with S(db) as s:
+        setup_pg_schema(s)
+
+    for options in [{}, dict(stream_results=True, lazy_definitions=True)]:
+        timings = Timings()
+
+        with S(db) as s:
+            i = get_inspector(s, hooks=[timings], **options)
+            i.resolve_definitions()
+
+        queries = {x.name: x for x in timings if x.kind == "query"}
+        loads = {x.name: x for x in timings if x.kind == "load"}
+
+        assert "ALL_RELATIONS_QUERY" in queries
+        assert "ATTRIBUTES_QUERY" in queries
+
+        if options:
+            assert "VIEW_DEFINITIONS_QUERY" in queries
+
+        films = queries["ALL_RELATIONS_QUERY"]
+        assert films.rows > 0 and films.bytes > 0 and films.seconds > 0
+
+        assert set(loads) >= {"load_all", "load_all_relations", "load_deps_all"}
+        assert loads["load_all"].seconds >= loads["load_all_relations"].seconds
+        assert all(0 <= x.construction_seconds <= x.seconds for x in loads.values())
+
+        # the loader that runs no queries spends all its time on construction
+        assert loads["load_deps_all"].construction_seconds == (
+            loads["load_deps_all"].seconds
+        )
+
+        assert "ALL_RELATIONS_QUERY" in timings.report()
+
+
+def test_timings_command(db, capsys):
+    args = parse_args(["--timings", "deps", db])
+    run(args)
+    assert "load_all" in capsys.readouterr().err
+
+    run(parse_args(["deps", db]))
+    assert capsys.readouterr().err == ""
+
+
+def test_timed_results(db):
+    # with hooks, queries still return results that work like the
+    # connection's own
+    timings = Timings()
+
+    with S(db) as s:
+        i = get_inspector(s, hooks=[timings])
+        del timings[:]
+
+        q = "select generate_series(1, 3) as n"
+        result = i.execute(q, query_name="series")
+        assert result.keys() == ["n"]
+        assert result.rowcount == 3
+        assert result.fetchone() == (1,)
+        assert not timings
+
+        assert [tuple(x) for x in result.fetchall()] == [(2,), (3,)]
+        assert result.fetchone() is None
+        assert [(x.name, x.rows) for x in timings] == [("series", 3)]
+
+        assert [x.n for x in i.execute(q)] == [1, 2, 3]
+        assert len(i.execute(q).fetchmany(2)) == 2
+        assert [x.name for x in timings] == ["series", "query"]